@@ -368,6 +368,8 @@ export class ChartEngineService {
         timeout: 60000, // 60 second timeout
         headers: {
           "Content-Type": "application/json",
+          // Ask for raw PNG bytes instead of base64 wrapped in JSON
+          Accept: "image/png",
         },
         // Handle both binary and JSON responses
         responseType: "arraybuffer",
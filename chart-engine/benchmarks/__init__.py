@@ -0,0 +1 @@
+"""Benchmarks for the chart engine. Run modules with `python -m benchmarks.<name>` from chart-engine/."""
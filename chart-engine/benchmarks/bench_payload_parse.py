@@ -0,0 +1,60 @@
+"""
+Parse-time benchmark for the two /generate-chart payload shapes.
+Measures JSON decode + Pydantic validation + DataFrame construction for the
+row format (List[OHLCVData]) and the columnar format (ColumnarOHLCV).
+
+Usage: python -m benchmarks.bench_payload_parse [--repeat N]
+"""
+import argparse
+import json
+import logging
+import statistics
+import time
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from benchmarks.synthetic import random_walk_ohlcv, row_payload, columnar_payload
+from chart_renderer import convert_to_dataframe
+from main import OHLCVData, ColumnarOHLCV
+
+SIZES = (400, 5_000)
+
+def median_ms(fn: Callable[[], object], repeat: int) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement (median is reported)')
+    args = parser.parse_args()
+
+    # convert_to_dataframe logs every call
+    logging.disable(logging.INFO)
+
+    rows_adapter = TypeAdapter(List[OHLCVData])
+
+    print(f"{'candles':>8} {'format':>9} {'validate ms':>12} {'dataframe ms':>13} {'total ms':>9}")
+    for n in SIZES:
+        df = random_walk_ohlcv(n)
+        bodies = {
+            'rows': json.dumps(row_payload(df)),
+            'columnar': json.dumps(columnar_payload(df)),
+        }
+        parsers = {
+            'rows': lambda body: [d.model_dump() for d in rows_adapter.validate_python(json.loads(body))],
+            'columnar': lambda body: ColumnarOHLCV.model_validate(json.loads(body)).model_dump(),
+        }
+        for fmt, body in bodies.items():
+            parse = parsers[fmt]
+            parsed = parse(body)
+            validate_ms = median_ms(lambda: parse(body), args.repeat)
+            frame_ms = median_ms(lambda: convert_to_dataframe(parsed), args.repeat)
+            print(f"{n:>8} {fmt:>9} {validate_ms:>12.2f} {frame_ms:>13.2f} {validate_ms + frame_ms:>9.2f}")
+
+if __name__ == '__main__':
+    main()
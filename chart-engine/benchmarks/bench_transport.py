@@ -0,0 +1,89 @@
+"""
+Transport benchmark: JSON vs MessagePack vs Arrow IPC.
+Parse: request body bytes -> validated IndicatorRequest -> NumPy candle
+columns. Serialize: computed indicator columns -> response body.
+Transports whose optional dependency (msgpack, pyarrow) is missing are skipped.
+
+Usage: python -m benchmarks.bench_transport [--repeat N]
+"""
+import argparse
+import json
+import logging
+
+import numpy as np
+
+import transport
+from benchmarks.bench_payload_parse import median_ms
+from benchmarks.synthetic import random_walk_ohlcv, columnar_payload
+from indicator_values import compute_columns, encode_arrow, encode_json, encode_msgpack, encode_raw, OHLCV_NAMES
+from main import IndicatorRequest
+
+SIZES = (400, 5_000, 50_000)
+
+INDICATORS = {'sma': {}, 'ema': {'period': 50}, 'rsi': {}, 'macd': {}}
+
+def numpy_columns(df):
+    return {'t': df.index.as_unit('ms').asi8, 'o': df['open'].to_numpy(), 'h': df['high'].to_numpy(),
+            'l': df['low'].to_numpy(), 'c': df['close'].to_numpy(), 'v': df['volume'].to_numpy()}
+
+def request_bodies(df):
+    """Body bytes per transport for the same indicator request"""
+    bodies = {'json': json.dumps({'data': columnar_payload(df), 'indicators': INDICATORS}).encode()}
+    columns = numpy_columns(df)
+    if transport.msgpack is not None:
+        bodies['msgpack'] = transport.msgpack.packb({
+            'data': {key: transport.typed_array(values) for key, values in columns.items()},
+            'indicators': INDICATORS})
+    if transport.pa is not None:
+        pa = transport.pa
+        batch = pa.record_batch([pa.array(columns[key]) for key in 'tohlcv'], names=list('tohlcv'))
+        batch = batch.replace_schema_metadata({transport.ARROW_REQUEST_KEY: json.dumps({'indicators': INDICATORS})})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        bodies['arrow'] = sink.getvalue().to_pybytes()
+    return bodies
+
+def parse(body: bytes, name: str):
+    """What the API does with a request body before computing anything"""
+    if name == 'json':
+        return IndicatorRequest.model_validate_json(body).columns()
+    fields, columns = transport.decode_request(body, name)
+    return IndicatorRequest.model_validate(fields, context={'columns': columns}).columns()
+
+def serializers():
+    encoders = {'json': encode_json, 'raw': lambda t, values, computed: encode_raw(t, values)}
+    if transport.msgpack is not None:
+        encoders['msgpack'] = encode_msgpack
+    if transport.pa is not None:
+        encoders['arrow'] = lambda t, values, computed: encode_arrow(t, values)
+    return encoders
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement (median is reported)')
+    args = parser.parse_args()
+
+    # Indicator computation logs every call
+    logging.disable(logging.INFO)
+
+    print(f"{'candles':>8} {'transport':>9} {'request KB':>11} {'parse ms':>9} {'response KB':>12} {'serialize ms':>13}")
+    for n in SIZES:
+        df = random_walk_ohlcv(n)
+        columns = numpy_columns(df)
+        values, computed = compute_columns({name: columns[key] for key, name in OHLCV_NAMES.items()}, INDICATORS)
+        bodies = request_bodies(df)
+        for name, encoder in serializers().items():
+            if name in bodies:
+                body = bodies[name]
+                np.testing.assert_array_equal(parse(body, name)['c'], columns['c'])
+                request_kb = f"{len(body) / 1024:>11.1f}"
+                parse_ms = f"{median_ms(lambda: parse(body, name), args.repeat):>9.2f}"
+            else:
+                request_kb, parse_ms = f"{'-':>11}", f"{'-':>9}"
+            response = encoder(columns['t'], values, computed)
+            serialize_ms = median_ms(lambda: encoder(columns['t'], values, computed), args.repeat)
+            print(f"{n:>8} {name:>9} {request_kb} {parse_ms} {len(response) / 1024:>12.1f} {serialize_ms:>13.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+Benchmark suite: indicator kernels, DataFrame conversion and full chart renders.
+Groups:
+- kernels: every calculate_* function in utils.py at 100, 400, 5k and 100k bars
+- dataframe: convert_to_dataframe on the row and the columnar payload shapes
+- render: POST /generate-chart through the app and its render pool (one
+  worker, render cache off) with representative indicator mixes; the worker
+  keeps its per-render logging (part of the real cost), which goes to stderr
+
+All data is seeded random-walk OHLCV (benchmarks/synthetic.py). Results are
+written as JSON; with --baseline, every benchmark is compared against a saved
+result file and the run exits with status 1 if any got slower than the
+threshold allows.
+
+Usage: python -m benchmarks.run_benchmarks [--group kernels] [--output FILE]
+                                            [--baseline FILE] [--threshold 0.2]
+"""
+import os
+
+# One render worker and no render cache, so every render request really renders
+os.environ.setdefault("CHART_ENGINE_WORKERS", "1")
+os.environ["CHART_ENGINE_CACHE_MAX_BYTES"] = "0"
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+import utils
+from benchmarks.synthetic import random_walk_ohlcv, row_payload, columnar_payload
+from chart_renderer import convert_to_dataframe
+from indicator_kernels import KERNEL_BACKEND
+
+GROUPS = ('kernels', 'dataframe', 'render')
+KERNEL_SIZES = (100, 400, 5_000, 100_000)
+DATAFRAME_SIZES = (400, 5_000)
+RENDER_SIZE = 400  # the /generate-chart candle cap
+
+RENDER_MIXES = {
+    'candles': {},
+    'overlays': {'sma': {'period': 20}, 'ema': {'period': 50}, 'bb': {}},
+    'oscillators': {'macd': {}, 'rsi': {}, 'stochastic': {}},
+    # As many as a request may ask for (MAX_INDICATORS), spread over overlays and panels
+    'full': {'sma': {'period': 20}, 'bb': {}, 'psar': {}, 'vwap': {}, 'macd': {}, 'rsi': {}, 'stochastic': {}, 'adx': {}},
+}
+
+# calculate_* parameter names -> OHLCV column
+KERNEL_INPUTS = {'prices': 'close', 'high': 'high', 'low': 'low', 'close': 'close', 'volume': 'volume',
+                 'volumes': 'volume'}
+KERNEL_PERIOD = 14
+
+def measure(fn: Callable[[], object], repeat: int, budget: float, min_runs: int = 3) -> Dict[str, Any]:
+    """Time fn after one warm-up call: up to repeat runs, fewer once budget seconds are spent"""
+    fn()
+    timings: List[float] = []
+    spent = 0.0
+    while len(timings) < repeat and (len(timings) < min_runs or spent < budget):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+        spent += timings[-1]
+    return {
+        'median_ms': statistics.median(timings) * 1000,
+        'min_ms': min(timings) * 1000,
+        'runs': len(timings),
+    }
+
+def kernel_call(fn: Callable, df: pd.DataFrame) -> Callable[[], object]:
+    """Call a calculate_* function with its required arguments from the OHLCV frame"""
+    args = []
+    for name, param in inspect.signature(fn).parameters.items():
+        if param.default is not inspect.Parameter.empty:
+            break
+        if name == 'period':
+            args.append(KERNEL_PERIOD)
+        elif name in KERNEL_INPUTS:
+            args.append(df[KERNEL_INPUTS[name]].to_numpy())
+        else:
+            raise ValueError(f"{fn.__name__}: no benchmark input for parameter {name!r}")
+    return lambda: fn(*args)
+
+def bench_kernels(repeat: int, budget: float) -> Dict[str, Dict[str, Any]]:
+    kernels = {name: fn for name, fn in inspect.getmembers(utils, inspect.isfunction)
+               if name.startswith('calculate_') and fn.__module__ == utils.__name__}
+    results = {}
+    for n in KERNEL_SIZES:
+        df = random_walk_ohlcv(n)
+        for name, fn in kernels.items():
+            results[f"kernels/{name}/{n}"] = measure(kernel_call(fn, df), repeat, budget)
+    return results
+
+def bench_dataframe(repeat: int, budget: float) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for n in DATAFRAME_SIZES:
+        df = random_walk_ohlcv(n)
+        for shape, payload in (('rows', row_payload(df)), ('columnar', columnar_payload(df))):
+            results[f"dataframe/{shape}/{n}"] = measure(lambda: convert_to_dataframe(payload), repeat, budget)
+    return results
+
+async def post(app, path: str, body: bytes) -> int:
+    """Send one request straight to the ASGI app; returns the status code"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'',
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+        'client': ('127.0.0.1', 0), 'server': ('127.0.0.1', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+def bench_render(repeat: int, budget: float) -> Dict[str, Dict[str, Any]]:
+    import main
+
+    payload = columnar_payload(random_walk_ohlcv(RENDER_SIZE))
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(main.render_pool.start())
+    try:
+        results = {}
+        for mix, indicators in RENDER_MIXES.items():
+            body = json.dumps({'data': payload, 'indicators': indicators}).encode()
+
+            def render():
+                status = loop.run_until_complete(post(main.app, '/generate-chart', body))
+                if status != 200:
+                    raise RuntimeError(f"/generate-chart returned {status} for the {mix} mix")
+
+            # Renders take around a second, so a budget of a few runs is too noisy
+            results[f"render/{mix}/{RENDER_SIZE}"] = measure(render, repeat, budget, min_runs=min(repeat, 7))
+        return results
+    finally:
+        main.render_pool.shutdown()
+        loop.run_until_complete(asyncio.sleep(0))  # let the cancelled watchdog finish
+        loop.close()
+
+def environment() -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+        'kernel_backend': KERNEL_BACKEND,
+        'cpu_count': os.cpu_count(),
+    }
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float, min_delta_ms: float) -> List[str]:
+    """Print each benchmark against the baseline; returns the regressed names"""
+    regressions = []
+    print(f"\n{'benchmark':<48} {'baseline ms':>12} {'now ms':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<48} {'-':>12} {result['median_ms']:>10.3f} {'new':>8}")
+            continue
+        change = result['median_ms'] / before['median_ms'] - 1 if before['median_ms'] else 0.0
+        # Sub-threshold deltas in absolute terms are timer noise, whatever the ratio
+        regressed = change > threshold and result['median_ms'] - before['median_ms'] > min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<48} {before['median_ms']:>12.3f} {result['median_ms']:>10.3f} {change:>+8.1%}"
+              f"{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--group', action='append', choices=GROUPS, help='Benchmark group to run (repeatable; default all)')
+    parser.add_argument('--repeat', type=int, default=20, help='Maximum runs per benchmark (median is reported)')
+    parser.add_argument('--budget', type=float, default=1.0, help='Seconds per benchmark before stopping early (min 3 runs)')
+    parser.add_argument('--output', default='benchmark_results.json', help='Where to write the JSON results')
+    parser.add_argument('--baseline', help='Saved results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Fail if a median is more than this fraction slower than the baseline')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help='Ignore slowdowns smaller than this many milliseconds')
+    args = parser.parse_args()
+
+    baseline: Optional[Dict[str, Any]] = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    # Indicator computation and rendering log every call
+    logging.disable(logging.INFO)
+
+    benches = {'kernels': bench_kernels, 'dataframe': bench_dataframe, 'render': bench_render}
+    results: Dict[str, Dict[str, Any]] = {}
+    for group in args.group or GROUPS:
+        group_results = benches[group](args.repeat, args.budget)
+        for name, result in group_results.items():
+            print(f"{name:<48} {result['median_ms']:>10.3f} ms  (min {result['min_ms']:.3f}, {result['runs']} runs)")
+        results.update(group_results)
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'created': time.time(), 'results': results}, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+if __name__ == '__main__':
+    main()
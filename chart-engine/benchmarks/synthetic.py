@@ -0,0 +1,39 @@
+"""
+Synthetic OHLCV data for benchmarks.
+Candles follow a seeded geometric random walk so runs are reproducible.
+"""
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+
+def random_walk_ohlcv(n: int, seed: int = 42, start_price: float = 100.0, freq: str = '15min') -> pd.DataFrame:
+    """Return an OHLCV DataFrame with n candles indexed by datetime"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.002, n)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.001, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(100, 10_000, n).astype(np.float64)
+    index = pd.date_range('2024-01-01', periods=n, freq=freq, name='datetime')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+def row_payload(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Candles in the row format accepted by ChartRequest.data"""
+    return [
+        {'datetime': ts.isoformat(), 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+        for ts, o, h, l, c, v in zip(df.index, df['open'].tolist(), df['high'].tolist(),
+                                     df['low'].tolist(), df['close'].tolist(), df['volume'].tolist())
+    ]
+
+def columnar_payload(df: pd.DataFrame) -> Dict[str, List[float]]:
+    """Candles in the columnar format accepted by ChartRequest.data"""
+    return {
+        't': df.index.as_unit('ms').asi8.tolist(),
+        'o': df['open'].tolist(),
+        'h': df['high'].tolist(),
+        'l': df['low'].tolist(),
+        'c': df['close'].tolist(),
+        'v': df['volume'].tolist(),
+    }
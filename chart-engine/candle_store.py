@@ -0,0 +1,186 @@
+"""
+In-memory candle store.
+Each (symbol, timeframe) owns preallocated NumPy ring buffers, so a client
+sends only the bars that changed since its last call (usually the forming
+bar and maybe the one just closed) and chart requests reference the stored
+series by key and window length instead of carrying 400 candles.
+
+Rings are bounded by a total byte budget; the least recently used
+(symbol, timeframe) is evicted first.
+"""
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from resampling import Columns
+
+FIELDS = 'tohlcv'
+
+class UnknownCandles(LookupError):
+    """No candles stored for this symbol and timeframe (never sent, or evicted)"""
+
+class CandleRing:
+    """Fixed-capacity ring of OHLCV bars in time order; the oldest bars fall off"""
+
+    def __init__(self, capacity: int, revisions: Optional[Iterator[int]] = None):
+        self.capacity = capacity
+        self._arrays = {key: np.empty(capacity, dtype=np.int64 if key == 't' else np.float64) for key in FIELDS}
+        self._start = 0  # slot of the oldest bar
+        self.size = 0
+        # Taken from revisions on every change; part of the render cache key. A
+        # store shares one counter across its rings, so a deleted or evicted
+        # series sent again never repeats a revision (and a cached chart)
+        self._revisions = revisions if revisions is not None else itertools.count(1)
+        self.revision = 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self._arrays.values())
+
+    @property
+    def last_time(self) -> Optional[int]:
+        if not self.size:
+            return None
+        return int(self._arrays['t'][(self._start + self.size - 1) % self.capacity])
+
+    def window(self, n: Optional[int] = None) -> Columns:
+        """Copy of the newest n bars (all if None), oldest first"""
+        n = self.size if n is None else min(n, self.size)
+        first = (self._start + self.size - n) % self.capacity
+        if first + n <= self.capacity:
+            return {key: values[first:first + n].copy() for key, values in self._arrays.items()}
+        split = self.capacity - first
+        return {key: np.concatenate((values[first:], values[:n - split])) for key, values in self._arrays.items()}
+
+    def upsert(self, bars: Columns) -> Tuple[int, int]:
+        """Append new bars and overwrite bars with a stored timestamp; returns (appended, overwritten).
+
+        bars must be sorted by time without duplicates (see resampling.to_columns).
+        The usual update, bars at or after the newest stored bar, is written in
+        place; anything older is merged and the ring rewritten.
+        """
+        t = bars['t']
+        if not len(t):
+            return 0, 0
+        last = self.last_time
+        if last is not None and t[0] < last:
+            return self._merge(bars)
+
+        overwritten = 0
+        if last is not None and t[0] == last:
+            slot = (self._start + self.size - 1) % self.capacity
+            for key in FIELDS:
+                self._arrays[key][slot] = bars[key][0]
+            bars = {key: values[1:] for key, values in bars.items()}
+            overwritten = 1
+        appended = len(bars['t'])
+        if appended:
+            self._append(bars)
+        self.revision = next(self._revisions)
+        return appended, overwritten
+
+    def _append(self, bars: Columns):
+        n = len(bars['t'])
+        if n >= self.capacity:
+            # Only the newest capacity bars survive
+            bars = {key: values[-self.capacity:] for key, values in bars.items()}
+            for key in FIELDS:
+                self._arrays[key][:] = bars[key]
+            self._start, self.size = 0, self.capacity
+            return
+        end = (self._start + self.size) % self.capacity
+        slots = (end + np.arange(n)) % self.capacity
+        for key in FIELDS:
+            self._arrays[key][slots] = bars[key]
+        dropped = max(self.size + n - self.capacity, 0)
+        self._start = (self._start + dropped) % self.capacity
+        self.size += n - dropped
+
+    def _merge(self, bars: Columns) -> Tuple[int, int]:
+        stored = self.window()
+        combined_t = np.concatenate((stored['t'], bars['t']))
+        # Stable sort with the incoming bars last, then keep the last bar per timestamp
+        order = np.argsort(combined_t, kind='stable')
+        sorted_t = combined_t[order]
+        keep = order[np.append(sorted_t[1:] != sorted_t[:-1], True)]
+        merged = {key: np.concatenate((stored[key], bars[key]))[keep] for key in FIELDS}
+        overwritten = len(combined_t) - len(keep)
+        appended = len(bars['t']) - overwritten
+
+        self._start = self.size = 0
+        self._append(merged)
+        self.revision = next(self._revisions)
+        return appended, overwritten
+
+class CandleStore:
+    """Candle rings per (symbol, timeframe), LRU-evicted to stay within a byte budget"""
+
+    def __init__(self, max_bytes: Optional[int] = None, capacity: Optional[int] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("CHART_ENGINE_CANDLE_STORE_MAX_BYTES", 128 * 1024 * 1024))
+        self.capacity = capacity if capacity is not None else int(os.getenv("CHART_ENGINE_CANDLE_CAPACITY", 1000))
+        if self.capacity < 1:
+            raise ValueError(f"Invalid candle ring capacity {self.capacity}")
+        self._rings: "OrderedDict[Tuple[str, str], CandleRing]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._revisions = itertools.count(1)
+        self.evictions = 0
+
+    def upsert(self, symbol: str, timeframe: str, bars: Columns) -> Dict[str, Any]:
+        """Write bars for (symbol, timeframe), creating its ring on first use"""
+        key = (symbol, timeframe)
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                ring = CandleRing(self.capacity, self._revisions)
+                self._rings[key] = ring
+                self._bytes += ring.nbytes
+                self._evict(keep=key)
+            self._rings.move_to_end(key)
+            appended, overwritten = ring.upsert(bars)
+            return {"appended": appended, "overwritten": overwritten, "candles": ring.size,
+                    "last": ring.last_time, "revision": ring.revision}
+
+    def _ring(self, symbol: str, timeframe: str) -> CandleRing:
+        ring = self._rings.get((symbol, timeframe))
+        if ring is None:
+            raise UnknownCandles(f"No candles stored for {symbol} {timeframe}")
+        self._rings.move_to_end((symbol, timeframe))
+        return ring
+
+    def revision(self, symbol: str, timeframe: str) -> int:
+        with self._lock:
+            return self._ring(symbol, timeframe).revision
+
+    def window(self, symbol: str, timeframe: str, n: Optional[int] = None) -> Columns:
+        """Newest n stored bars of (symbol, timeframe), oldest first"""
+        with self._lock:
+            return self._ring(symbol, timeframe).window(n)
+
+    def delete(self, symbol: str, timeframe: str) -> bool:
+        with self._lock:
+            ring = self._rings.pop((symbol, timeframe), None)
+            if ring is None:
+                return False
+            self._bytes -= ring.nbytes
+            return True
+
+    def _evict(self, keep: Tuple[str, str]):
+        while self._bytes > self.max_bytes and len(self._rings) > 1:
+            oldest = next(key for key in self._rings if key != keep)
+            self._bytes -= self._rings.pop(oldest).nbytes
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "series": len(self._rings),
+                "capacity": self.capacity,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
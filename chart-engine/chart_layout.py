@@ -0,0 +1,234 @@
+"""
+Fixed chart layout for mplfinance.
+Panel geometry and margins are computed up front from the panel count, the
+panel ratios and the pixel size, and mplfinance draws into those axes
+(external axes mode). The figure is then saved without bbox_inches='tight'
+or tight_layout, so it is drawn exactly once and the PNG is exactly
+width x height pixels.
+
+Charts are drawn to RGBA pixels and PNG-encoded as a separate step (see
+png_bytes), so the two can be timed apart; draw_tight does the same for the
+default tight-layout figures mplfinance creates itself.
+"""
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Any, List, Optional, Sequence, Tuple
+
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib import image as mimage
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import mplfinance as mpf
+import numpy as np
+from PIL import Image
+
+import chart_styles
+
+# Figure templates kept per render worker (one per size/dpi/style/panel layout)
+FIGURE_POOL_SIZE = int(os.getenv("CHART_ENGINE_FIGURE_POOL", 8))
+
+# Margins in pixels at 100 dpi, sized for the default tick label fonts;
+# fonts are sized in points, so the margins scale with the dpi
+LABEL_MARGIN = 80  # side with the tick labels and panel labels
+EDGE_MARGIN = 12  # side without labels
+TOP_MARGIN = 12
+TITLE_MARGIN = 28
+BOTTOM_MARGIN = 48  # date labels under the last panel
+
+def panel_rects(panel_ratios: Sequence[float], width: int, height: int, y_on_right: bool = True,
+                title: bool = False, dpi: int = 100) -> List[Tuple[float, float, float, float]]:
+    """[left, bottom, width, height] in figure fractions for each panel, top to bottom"""
+    scale = dpi / 100
+    left = (EDGE_MARGIN if y_on_right else LABEL_MARGIN) * scale
+    right = (LABEL_MARGIN if y_on_right else EDGE_MARGIN) * scale
+    top = (TOP_MARGIN + (TITLE_MARGIN if title else 0)) * scale
+    plot_width = max(width - left - right, 1)
+    plot_height = max(height - top - BOTTOM_MARGIN * scale, 1)
+
+    rects = []
+    total = float(sum(panel_ratios))
+    y = height - top
+    for ratio in panel_ratios:
+        panel_height = plot_height * ratio / total
+        y -= panel_height
+        rects.append((left / width, y / height, plot_width / width, panel_height / height))
+    return rects
+
+class FigureTemplate:
+    """A figure with its panel axes laid out, reused across charts of the same layout"""
+
+    def __init__(self, key: tuple, width: int, height: int, dpi: int, style: dict,
+                 panel_ratios: Sequence[float], title: bool):
+        self.key = key
+        self.style = style
+        self.y_on_right = style.get('y_on_right', True)
+        self.fig = mpf.figure(style=style, figsize=(width / dpi, height / dpi), dpi=dpi)
+        # Keep pooled figures out of pyplot's figure manager, so plt.close('all')
+        # elsewhere in the worker does not tear them down; the figure then
+        # needs its own Agg canvas
+        plt.close(self.fig)
+        FigureCanvasAgg(self.fig)
+        rects = panel_rects(panel_ratios, width, height, y_on_right=self.y_on_right, title=title, dpi=dpi)
+        self.axes = [self.fig.add_axes(rects[0])]
+        for rect in rects[1:]:
+            self.axes.append(self.fig.add_axes(rect, sharex=self.axes[0]))
+
+    def clear(self):
+        """Drop the previous chart's artists; the axes come back styled as when created"""
+        # cla() resets axes colors, grid and ticks from rcParams, so re-apply
+        # the style around it the way mpf.figure did when the axes were added
+        with style_context(self.style):
+            for ax in self.axes:
+                ax.cla()
+
+def style_rcparams(style: dict) -> dict:
+    """rcParams an mplfinance style (as built by mpf.make_mpf_style) sets on top of its base style"""
+    rc = dict(style.get('rc') or {})
+    if style.get('facecolor') is not None:
+        rc['axes.facecolor'] = style['facecolor']
+    if style.get('edgecolor') is not None:
+        rc['axes.edgecolor'] = style['edgecolor']
+    if style.get('figcolor') is not None:
+        rc['figure.facecolor'] = rc['savefig.facecolor'] = style['figcolor']
+    explicit_grid = False
+    if style.get('gridcolor') is not None:
+        explicit_grid = True
+        rc['grid.color'] = style['gridcolor']
+    if style.get('gridstyle') is not None:
+        explicit_grid = True
+        rc['grid.linestyle'] = style['gridstyle']
+    rc['axes.grid.axis'] = 'both'
+    gridaxis = style.get('gridaxis')
+    if gridaxis is not None:
+        explicit_grid = True
+        # Any prefix of 'horizontal' / 'vertical', as make_mpf_style accepts
+        if gridaxis == 'horizontal'[:len(gridaxis)]:
+            rc['axes.grid.axis'] = 'y'
+        elif gridaxis == 'vertical'[:len(gridaxis)]:
+            rc['axes.grid.axis'] = 'x'
+    if explicit_grid:
+        rc['axes.grid'] = True
+    return rc
+
+@contextmanager
+def style_context(style: dict):
+    """Temporarily set the rcParams mpf.figure applies for style: matplotlib defaults,
+    the style's base matplotlib style, then its own settings"""
+    base = style.get('base_mpl_style')
+    with plt.style.context(['default'] + ([base] if base else [])), plt.rc_context(style_rcparams(style)):
+        yield
+
+# Pooled templates of this process, most recently used last
+_templates: 'OrderedDict[tuple, FigureTemplate]' = OrderedDict()
+
+def get_template(width: int, height: int, dpi: int, style: Any, panel_ratios: Sequence[float],
+                 title: bool = False) -> FigureTemplate:
+    """Pooled figure for this layout, cleared and ready to plot into.
+
+    Styles are keyed by identity, which is stable because chart_styles builds
+    each style once per process (and the template keeps it alive).
+    """
+    mpf_style = chart_styles.get_style(style) if isinstance(style, str) else style
+    key = (width, height, dpi, id(mpf_style), tuple(panel_ratios), title)
+    template = _templates.pop(key, None)
+    if template is None:
+        template = FigureTemplate(key, width, height, dpi, mpf_style, panel_ratios, title)
+    else:
+        template.clear()
+    _templates[key] = template
+    while len(_templates) > FIGURE_POOL_SIZE:
+        _templates.popitem(last=False)
+    return template
+
+def pooled_figures() -> int:
+    """Number of figures held by the template pool"""
+    return len(_templates)
+
+@contextmanager
+def _plotted(df, width: int, height: int, dpi: int, style: Any, panel_ratios: Sequence[float],
+             addplots: List[dict], volume_panel: Optional[int], title: str, title_color: Optional[str],
+             plot_kwargs: dict):
+    """Plot into a pooled template and yield its figure, ready to save or draw"""
+    template = get_template(width, height, dpi, style, panel_ratios, title=bool(title))
+    fig, axes = template.fig, template.axes
+    # Plot and draw under the template's style: the process-wide rcParams may
+    # be another style's, left behind by the last figure mpf.figure made
+    with style_context(template.style):
+        try:
+            for addplot in addplots:
+                addplot['ax'] = axes[addplot.get('panel') or 0]
+
+            if addplots:
+                plot_kwargs = dict(plot_kwargs, addplot=addplots)
+            mpf.plot(df, ax=axes[0], volume=axes[volume_panel] if volume_panel is not None else False, **plot_kwargs)
+
+            # mplfinance only styles the axes it plots into, so put tick labels
+            # and panel labels of the remaining panels on the style's side
+            panel_labels = {addplot['panel']: addplot['ylabel'] for addplot in addplots
+                            if addplot.get('panel') and addplot.get('ylabel')}
+            if volume_panel is not None:
+                panel_labels.setdefault(volume_panel, 'Volume')
+            for number, ax in enumerate(axes):
+                if template.y_on_right:
+                    ax.yaxis.tick_right()
+                    ax.yaxis.set_label_position('right')
+                if number in panel_labels:
+                    ax.set_ylabel(panel_labels[number])
+                # Only the bottom panel keeps its date labels
+                if number < len(axes) - 1:
+                    ax.tick_params(labelbottom=False)
+            if title:
+                fig.suptitle(title, fontsize=12, color=title_color, y=1 - TOP_MARGIN * dpi / 200 / height,
+                             va='top')
+            yield fig
+        except Exception:
+            # Don't hand a half-drawn figure to the next chart
+            _templates.pop(template.key, None)
+            raise
+
+def plot_fixed(df, width: int, height: int, dpi: int, style: Any, panel_ratios: Sequence[float],
+               addplots: List[dict], volume_panel: Optional[int] = None, title: str = '',
+               title_color: Optional[str] = None, **plot_kwargs) -> bytes:
+    """Plot df with its addplots into precomputed panels and return PNG bytes.
+
+    addplots are the usual panel-numbered make_addplot dicts; each is bound to
+    the axes of its panel. volume_panel is the panel for volume bars, or None.
+    The figure comes from the per-process template pool.
+    """
+    return png_bytes(draw_fixed(df, width, height, dpi, style, panel_ratios, addplots, volume_panel, title,
+                                title_color, **plot_kwargs), dpi)
+
+def draw_fixed(df, width: int, height: int, dpi: int, style: Any, panel_ratios: Sequence[float],
+               addplots: List[dict], volume_panel: Optional[int] = None, title: str = '',
+               title_color: Optional[str] = None, **plot_kwargs) -> Image.Image:
+    """Like plot_fixed, but return the drawn RGBA image unencoded.
+
+    The pixels are copied out, so the pooled figure is free again before the
+    caller spends any time encoding.
+    """
+    with _plotted(df, width, height, dpi, style, panel_ratios, addplots, volume_panel, title, title_color,
+                  plot_kwargs) as fig:
+        fig.canvas.draw()
+        return Image.fromarray(np.array(fig.canvas.buffer_rgba()), mode='RGBA')
+
+def draw_tight(fig, dpi: int) -> Image.Image:
+    """Draw a figure cropped to its tight bounding box, as savefig(bbox_inches='tight') does, unencoded.
+
+    The bounding box may reach past the figure (labels overhanging its edge),
+    so the figure is drawn at the padded box rather than cropped afterwards.
+    """
+    fig.set_dpi(dpi)
+    bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(matplotlib.rcParams['savefig.pad_inches'])
+    buf = BytesIO()
+    fig.savefig(buf, format='rgba', dpi=dpi, bbox_inches=bbox)
+    # Agg truncates the box to whole pixels the same way
+    size = int(bbox.width * dpi), int(bbox.height * dpi)
+    return Image.frombuffer('RGBA', size, buf.getbuffer(), 'raw', 'RGBA', 0, 1)
+
+def png_bytes(image: Image.Image, dpi: int) -> bytes:
+    """PNG-encode drawn RGBA pixels, byte for byte as savefig(format='png') would"""
+    buf = BytesIO()
+    mimage.imsave(buf, np.asarray(image), format='png', dpi=dpi)
+    return buf.getvalue()
@@ -0,0 +1,313 @@
+"""
+Chart rendering for the chart engine render pool.
+Everything in this module runs inside a render worker process, so each worker
+owns its own matplotlib/pyplot state and the API event loop never blocks on
+mplfinance.
+"""
+import os
+import time
+import logging
+import matplotlib
+# Use the Agg backend which is non-interactive and doesn't require GUI
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import mplfinance as mpf
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any, Callable, Optional, Tuple, Union
+
+import chart_styles
+import indicator_kernels
+import profiling
+from indicator_registry import IndicatorSpec
+from indicator_values import compute_columns
+from indicator_plots import build_addplots
+from raster_renderer import draw_raster, encode_raster
+from chart_layout import draw_fixed, draw_tight, png_bytes, pooled_figures
+from output_profiles import OutputProfile, encode, get_profile
+
+# Chart types the renderers draw; anything else is drawn as candles
+CHART_TYPES = ('candle', 'line', 'ohlc', 'hollow_and_filled')
+
+def init_worker():
+    """Initializer for render worker processes"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+def warm_up() -> int:
+    """Job used to make a fresh worker import its rendering stack and compile its kernels; returns its pid"""
+    indicator_kernels.warm_up()
+    chart_styles.warm_up()
+    return os.getpid()
+
+def columns_to_dataframe(columns: Dict[str, Any]) -> pd.DataFrame:
+    """Build the OHLCV DataFrame from columnar arrays (t, o, h, l, c, v) without per-row objects"""
+    timestamps = np.asarray(columns['t'])
+    if timestamps.dtype.kind in 'iuf':
+        # Timestamps in milliseconds
+        index = pd.to_datetime(timestamps.astype(np.int64), unit='ms')
+    else:
+        # ISO format strings
+        index = pd.to_datetime(timestamps)
+    index.name = 'datetime'
+
+    return pd.DataFrame({
+        'open': np.asarray(columns['o'], dtype=np.float64),
+        'high': np.asarray(columns['h'], dtype=np.float64),
+        'low': np.asarray(columns['l'], dtype=np.float64),
+        'close': np.asarray(columns['c'], dtype=np.float64),
+        'volume': np.asarray(columns['v'], dtype=np.float64),
+    }, index=index)
+
+# Helper function to convert data to pandas DataFrame with error handling
+def convert_to_dataframe(data: Union[List[Dict[str, Any]], Dict[str, Any]]) -> pd.DataFrame:
+    try:
+        # Columnar payloads map straight onto NumPy arrays
+        if isinstance(data, dict):
+            df = columns_to_dataframe(data)
+            logging.info(f"Successfully created DataFrame with {len(df)} rows from columnar data")
+            return df
+
+        # Create dataframe from candle dictionaries
+        df = pd.DataFrame(data)
+
+        # Convert datetime strings to pandas datetime objects
+        # Handle both timestamp integers and date strings
+        if df['datetime'].dtype == 'int64' or df['datetime'].dtype == 'float64':
+            # Timestamps in milliseconds need to be converted to seconds for pandas
+            df['datetime'] = pd.to_datetime(df['datetime'], unit='ms')
+        else:
+            # Handle ISO format strings
+            df['datetime'] = pd.to_datetime(df['datetime'])
+
+        # Set datetime as index
+        df.set_index('datetime', inplace=True)
+
+        logging.info(f"Successfully created DataFrame with {len(df)} rows")
+        return df
+    except Exception as e:
+        logging.error(f"Error converting data to DataFrame: {str(e)}")
+        raise ValueError(f"Failed to process candle data: {str(e)}")
+
+# Helper function to compute technical indicators for any renderer
+def compute_indicators(df: pd.DataFrame, indicators: Dict[str, Dict[str, Any]]) -> List[Tuple[IndicatorSpec, Dict[str, str], Dict[str, Any]]]:
+    """Compute the requested indicators through the indicator registry.
+
+    Adds the indicator columns to df and returns (spec, columns, raw params)
+    for every indicator that was computed, ready for any renderer.
+    """
+    values, computed = compute_columns({column: df[column].to_numpy(dtype=np.float64)
+                                        for column in ('open', 'high', 'low', 'close', 'volume')}, indicators)
+    for column, column_values in values.items():
+        df[column] = column_values
+    return computed
+
+# Helper function to add technical indicators with performance optimizations
+def add_indicators(df: pd.DataFrame, indicators: Dict[str, Dict[str, Any]],
+                   separate_oscillators: bool = True) -> Tuple[List[dict], int]:
+    """Compute the requested indicators and build their mplfinance addplots.
+
+    Returns the addplots and the number of panels the chart needs. Volume takes
+    panel 1, so oscillators start at panel 2; with separate_oscillators off
+    they all share panel 2.
+    """
+    computed = compute_indicators(df, indicators)
+    return build_addplots(df, computed, first_panel=2, separate_panels=separate_oscillators)
+
+def open_figures() -> int:
+    """Figures alive in this worker: pyplot's plus the pooled fixed-layout figures"""
+    return len(plt.get_fignums()) + pooled_figures()
+
+def cleanup_resources():
+    """Close any pyplot figures left behind (e.g. by a failed mpf.plot).
+
+    Pooled fixed-layout figures are not registered with pyplot, so they
+    survive this. No forced gc.collect(): charts no longer leave figure
+    cycles behind per request, and the collector's own thresholds suffice.
+    """
+    plt.close('all')
+
+
+def encode_chart(image, profile: OutputProfile, image_format: Optional[str]) -> Tuple[bytes, float]:
+    """Encode a drawn chart with its output profile; returns the bytes and the encode time"""
+    encode_start = time.time()
+    encoded = encode(image, profile, image_format)
+    encode_time = time.time() - encode_start
+    logging.info(f"Encoded {image_format or profile.format} ({profile.name}): {len(encoded)} bytes "
+                 f"in {encode_time:.3f} seconds")
+    return encoded, encode_time
+
+def encode_default(encoder: Callable[[Any], bytes], drawn: Any) -> Tuple[bytes, float]:
+    """PNG-encode a drawn chart that has no output profile; returns the bytes and the encode time"""
+    encode_start = time.time()
+    encoded = encoder(drawn)
+    return encoded, time.time() - encode_start
+
+def render_raster_chart(df: pd.DataFrame, indicators: Optional[Dict[str, Dict[str, Any]]], width: int, height: int,
+                        chart_type: str, volume: bool, separate_oscillators: bool, data_time: float,
+                        profile: Optional[OutputProfile] = None, image_format: Optional[str] = None) -> Dict[str, Any]:
+    """Render with the direct raster backend instead of mplfinance"""
+    indicator_start = time.time()
+    computed = compute_indicators(df, indicators) if indicators else []
+    indicator_time = time.time() - indicator_start
+
+    render_start = time.time()
+    if profile is not None:
+        # The raster renderer has no DPI; only the pixel budget applies
+        width, height = profile.size(width * 100 // profile.dpi, height * 100 // profile.dpi)
+    drawn = draw_raster(df, computed, width, height, chart_type, volume, separate_oscillators)
+    render_time = time.time() - render_start
+    if profile is not None:
+        image, encode_time = encode_chart(drawn, profile, image_format)
+    else:
+        image, encode_time = encode_default(encode_raster, drawn)
+    logging.info(f"Raster chart rendering completed in {render_time:.3f} seconds")
+
+    return {
+        "image": image,
+        "image_format": image_format or (profile.format if profile else 'png'),
+        "chart_type": chart_type,
+        "width": width,
+        "height": height,
+        "timings": {
+            "data": data_time,
+            "indicators": indicator_time,
+            "render": render_time,
+            "encode": encode_time,
+        },
+    }
+
+def render_chart(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Render a chart request (as a plain dict) into image bytes.
+
+    Returns the image bytes together with the effective chart settings, the
+    per-stage timings and this worker's pid and live figure count, so the API
+    process can build its response and metrics. Every path draws the chart
+    first and encodes it after, so the render and encode timings are apart;
+    without an output profile the image is a PNG. A job with a 'profiling'
+    spec is rendered under the profiler and the report is returned with it.
+    """
+    spec = job.get('profiling')
+    if spec is None:
+        result = _render_chart(job)
+    else:
+        result, report = profiling.profile_call(lambda: _render_chart(job), spec['mode'], spec['top'])
+        result["profiling"] = report
+    # Counted after the render's pyplot cleanup: what is left are pooled layouts, or leaks
+    result["worker"] = {"pid": os.getpid(), "figures": open_figures()}
+    return result
+
+def _render_chart(job: Dict[str, Any]) -> Dict[str, Any]:
+    start_time = time.time()
+    data = job['data']
+    indicators = job.get('indicators')
+    separate_oscillators = job.get('separate_oscillators', True)
+
+    try:
+        # Convert data to pandas DataFrame
+        df = convert_to_dataframe(data)
+
+        # Check if DataFrame is not empty
+        if df.empty:
+            raise ValueError("Empty data provided")
+
+        data_time = time.time() - start_time
+        logging.info(f"Data processing completed in {data_time:.2f} seconds")
+
+        # Controlled dimensions
+        width = min(job.get('width', 1200), 1600)  # Cap width
+        height = min(job.get('height', 800), 1200)  # Cap height
+
+        # Prepare chart style and kwargs
+        chart_style = chart_styles.get_style(job.get('style') or 'yahoo', job.get('style_definition'))
+        chart_type = job.get('chart_type', 'candle')
+        volume = True
+
+        # Ensure supported chart type
+        if chart_type not in CHART_TYPES:
+            chart_type = 'candle'
+
+        # An image format without a profile uses the dashboard profile
+        image_format = job.get('image_format')
+        profile = get_profile(job.get('profile') or 'dashboard') if job.get('profile') or image_format else None
+
+        if job.get('renderer') == 'raster':
+            return render_raster_chart(df, indicators, width, height, chart_type, volume,
+                                       separate_oscillators, data_time, profile, image_format)
+
+        # Measure indicator processing time
+        indicator_start = time.time()
+
+        # Add technical indicators if specified
+        addplots, panel_count = add_indicators(df, indicators, separate_oscillators) if indicators else ([], 2)
+
+        indicator_time = time.time() - indicator_start
+        logging.info(f"Indicator processing completed in {indicator_time:.2f} seconds")
+
+        # Measure chart rendering time
+        plot_start = time.time()
+
+        # Main price panel gets 4x height, every other panel 1x
+        panel_ratios = tuple([4] + [1] * (panel_count - 1))
+
+        if profile is not None:
+            # Output profiles need the exact pixel budget, so they always use
+            # the fixed layout; the figure is drawn unencoded and encoded after
+            width, height = profile.size(width, height)
+            drawn = draw_fixed(df, width, height, profile.dpi, chart_style, panel_ratios, addplots,
+                               volume_panel=1 if volume else None, type=chart_type)
+        elif job.get('layout') == 'fixed':
+            # Precomputed panel geometry: drawn once, exactly width x height pixels
+            drawn = draw_fixed(df, width, height, 100, chart_style, panel_ratios, addplots,
+                               volume_panel=1 if volume else None, type=chart_type)
+        else:
+            # Set up plot kwargs
+            plot_kwargs = {
+                'type': chart_type,
+                'style': chart_style,
+                'volume': volume,
+                'addplot': addplots,
+                'returnfig': True,
+                'tight_layout': True,  # Optimize layout
+                'figsize': (width/100, height/100),
+                'panel_ratios': panel_ratios,
+            }
+
+            # Volume sits in panel 1, between the price panel and the oscillators
+            if volume:
+                plot_kwargs['volume_panel'] = 1
+
+            # Generate the chart with controlled parameters, drawn as
+            # savefig(bbox_inches='tight') would but left unencoded
+            fig, _ = mpf.plot(df, **plot_kwargs)
+            drawn = draw_tight(fig, 100)
+            plt.close(fig)
+
+        render_time = time.time() - plot_start
+        logging.info(f"Chart rendering completed in {render_time:.2f} seconds")
+
+        if profile is not None:
+            image, encode_time = encode_chart(drawn, profile, image_format)
+        else:
+            image, encode_time = encode_default(lambda drawn: png_bytes(drawn, 100), drawn)
+
+        return {
+            "image": image,
+            "image_format": image_format or (profile.format if profile else 'png'),
+            "chart_type": chart_type,
+            "width": width,
+            "height": height,
+            "timings": {
+                "data": data_time,
+                "indicators": indicator_time,
+                "render": render_time,
+                "encode": encode_time,
+            },
+        }
+    finally:
+        # Always release pyplot state owned by this worker, also on errors
+        # (the raster renderer never touches pyplot)
+        if job.get('renderer') != 'raster':
+            cleanup_resources()
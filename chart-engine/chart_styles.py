@@ -0,0 +1,162 @@
+"""
+Chart style registry.
+Named themes are built into mplfinance style dicts once per process and the
+same read-only object is handed to every chart, so style construction stays
+out of the per-chart path (and pooled figure templates, keyed by style
+identity, keep matching).
+
+Custom themes are plain definitions (make_mpf_style arguments) registered
+under an ID. The API process keeps the definitions and ships the definition
+along with each job, so every render worker builds a custom theme only the
+first time it sees its ID.
+"""
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+import mplfinance as mpf
+
+# Registered custom themes per process (named builtins don't count)
+MAX_CUSTOM_STYLES = int(os.getenv("CHART_ENGINE_MAX_STYLES", 256))
+
+# make_mpf_style arguments a custom theme may set
+DEFINITION_KEYS = {'base_mpf_style', 'marketcolors', 'mavcolors', 'facecolor', 'edgecolor', 'figcolor',
+                   'gridcolor', 'gridstyle', 'gridaxis', 'y_on_right', 'rc'}
+# make_marketcolors arguments for a custom theme's 'marketcolors'
+MARKETCOLOR_KEYS = {'up', 'down', 'edge', 'wick', 'ohlc', 'volume', 'alpha', 'inherit'}
+
+# The generate_candlestick.py themes
+BUILTIN_DEFINITIONS = {
+    'dark': {
+        'base_mpf_style': 'nightclouds',
+        'marketcolors': {'up': '#00ff00', 'down': '#ff0000', 'edge': 'inherit', 'wick': 'inherit',
+                         'volume': '#0000ff'},
+        'gridstyle': ':',
+        'rc': {'axes.labelcolor': 'white', 'axes.edgecolor': 'white', 'ytick.color': 'white',
+               'xtick.color': 'white', 'figure.facecolor': '#121212', 'axes.facecolor': '#121212'},
+    },
+    'light': {
+        'base_mpf_style': 'yahoo',
+        'marketcolors': {'up': 'g', 'down': 'r', 'edge': 'inherit', 'wick': 'inherit', 'volume': 'b'},
+        'gridstyle': ':',
+    },
+}
+
+class StyleError(ValueError):
+    """Unknown style ID or invalid theme definition"""
+
+class FrozenStyle(dict):
+    """A built style shared by all charts of a process; mutating it raises TypeError.
+
+    Copies (dict(style), copy.copy, deepcopy, pickling) are plain dicts.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Registered chart styles are read-only; copy the style to change it")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return FrozenStyle({key: _freeze(item) for key, item in value.items()})
+    return value
+
+def _check_definition(definition: Dict[str, Any]):
+    unknown = set(definition) - DEFINITION_KEYS
+    if unknown:
+        raise StyleError(f"Unknown style settings: {', '.join(sorted(unknown))}")
+    base = definition.get('base_mpf_style')
+    if base is not None and base not in mpf.available_styles():
+        raise StyleError(f"Unknown base style: {base}")
+    unknown = set(definition.get('marketcolors') or {}) - MARKETCOLOR_KEYS
+    if unknown:
+        raise StyleError(f"Unknown market color settings: {', '.join(sorted(unknown))}")
+
+def build_style(definition: Dict[str, Any]) -> FrozenStyle:
+    """Build a theme definition into a read-only mplfinance style"""
+    _check_definition(definition)
+    kwargs = {key: value for key, value in definition.items() if value is not None}
+    try:
+        if kwargs.get('marketcolors') is not None:
+            kwargs['marketcolors'] = mpf.make_marketcolors(**kwargs['marketcolors'])
+        style = mpf.make_mpf_style(**kwargs)
+    except (TypeError, ValueError, KeyError) as e:
+        raise StyleError(f"Invalid style definition: {e}") from e
+    # mplfinance renames this deprecated base style while applying it; do it
+    # here so applying a frozen style never has to write to it
+    if style.get('base_mpl_style') == 'seaborn-darkgrid':
+        style['base_mpl_style'] = 'seaborn-v0_8-darkgrid'
+    return _freeze(style)
+
+def style_id(definition: Dict[str, Any]) -> str:
+    """Content-derived ID for a definition registered without one"""
+    payload = json.dumps(definition, sort_keys=True, separators=(',', ':'))
+    return 'custom-' + hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+# Built styles of this process, and the definitions of registered custom themes
+_styles: Dict[str, FrozenStyle] = {}
+_definitions: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+def register_style(definition: Dict[str, Any], name: Optional[str] = None) -> str:
+    """Register a custom theme and return its ID.
+
+    Registering the same definition again is a no-op; reusing an ID (or a
+    builtin name) for a different definition raises StyleError, since charts
+    already rendered and cached with that ID must keep meaning the same theme.
+    """
+    name = name or style_id(definition)
+    with _lock:
+        if name in _definitions:
+            if _definitions[name] != definition:
+                raise StyleError(f"Style '{name}' is already registered with a different definition")
+            return name
+        if name in BUILTIN_DEFINITIONS or name in mpf.available_styles():
+            raise StyleError(f"'{name}' is a builtin style")
+        if len(_definitions) >= MAX_CUSTOM_STYLES:
+            raise StyleError(f"Too many registered styles (limit {MAX_CUSTOM_STYLES})")
+        style = build_style(definition)
+        _definitions[name] = definition
+        _styles[name] = style
+    return name
+
+def get_definition(name: str) -> Optional[Dict[str, Any]]:
+    """Definition of a registered custom theme, None for builtins and unknown IDs"""
+    return _definitions.get(name)
+
+def get_style(name: str, definition: Optional[Dict[str, Any]] = None) -> FrozenStyle:
+    """The built style for a builtin name or registered ID.
+
+    definition registers an ID this process hasn't seen yet (how render
+    workers learn the custom themes registered with the API).
+    """
+    style = _styles.get(name)
+    if style is not None:
+        return style
+    if definition is not None:
+        register_style(definition, name)
+        return _styles[name]
+    with _lock:
+        if name not in _styles:
+            if name in BUILTIN_DEFINITIONS:
+                _styles[name] = build_style(BUILTIN_DEFINITIONS[name])
+            elif name in mpf.available_styles():
+                _styles[name] = build_style({'base_mpf_style': name})
+            else:
+                raise StyleError(f"Unknown style: {name}")
+        return _styles[name]
+
+def list_styles() -> List[str]:
+    """Builtin names followed by registered custom IDs"""
+    return sorted(set(BUILTIN_DEFINITIONS) | set(mpf.available_styles())) + sorted(_definitions)
+
+def warm_up():
+    """Build the builtin themes, so the first chart of a process doesn't pay for them"""
+    for name in ('yahoo', *BUILTIN_DEFINITIONS):
+        get_style(name)
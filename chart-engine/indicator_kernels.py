@@ -0,0 +1,127 @@
+"""
+Native loop kernels for the recursive indicators (Wilder RSI, ATR, ADX, Parabolic SAR).
+These indicators carry state from one bar to the next, so NumPy cannot vectorize
+them. When Numba is installed the kernels are compiled to native code at first
+use; otherwise the same functions run as plain Python loops.
+Set CHART_ENGINE_KERNELS=python to force the pure-Python backend.
+"""
+import os
+import logging
+import numpy as np
+
+if os.getenv("CHART_ENGINE_KERNELS", "").lower() == "python":
+    njit = None
+else:
+    try:
+        from numba import njit
+    except ImportError:
+        njit = None
+
+if njit is None:
+    KERNEL_BACKEND = 'python'
+
+    def njit(*args, **kwargs):
+        """Pure-Python stand-in for numba.njit"""
+        def decorator(fn):
+            fn.py_func = fn
+            return fn
+        return decorator
+else:
+    KERNEL_BACKEND = 'numba'
+
+@njit(cache=True)
+def wilder_average(values: np.ndarray, period: int, seed_index: int, seed_value: float) -> np.ndarray:
+    """Wilder's running average: out[i] = (out[i-1] * (period-1) + values[i]) / period.
+    out[seed_index] is seed_value and everything before it is 0.
+    """
+    if seed_index >= values.shape[0]:
+        raise IndexError("seed index is out of bounds for the series")
+    out = np.zeros(values.shape[0])
+    out[seed_index] = seed_value
+    for i in range(seed_index + 1, values.shape[0]):
+        out[i] = (out[i-1] * (period-1) + values[i]) / period
+    return out
+
+@njit(cache=True)
+def wilder_sum(values: np.ndarray, period: int, seed_index: int, seed_value: float) -> np.ndarray:
+    """Wilder's running sum: out[i] = out[i-1] - out[i-1] / period + values[i].
+    out[seed_index] is seed_value and everything before it is 0.
+    """
+    if seed_index >= values.shape[0]:
+        raise IndexError("seed index is out of bounds for the series")
+    out = np.zeros(values.shape[0])
+    out[seed_index] = seed_value
+    for i in range(seed_index + 1, values.shape[0]):
+        out[i] = out[i-1] - (out[i-1] / period) + values[i]
+    return out
+
+@njit(cache=True)
+def parabolic_sar(high: np.ndarray, low: np.ndarray, af_start: float, af_increment: float, af_max: float) -> np.ndarray:
+    """Parabolic SAR recursion (see utils.calculate_parabolic_sar)"""
+    n = high.shape[0]
+    sar = np.zeros(n)
+
+    # Need at least 2 bars
+    if n < 2:
+        return sar
+
+    # Initialize
+    trend = 1  # 1 for uptrend, -1 for downtrend
+    extreme_point = high[0]
+    sar[0] = low[0]
+    af = af_start
+
+    for i in range(1, n):
+        # Previous SAR
+        sar[i] = sar[i-1] + af * (extreme_point - sar[i-1])
+
+        # Make sure SAR doesn't go beyond the previous two candles' lows in an uptrend
+        # or the previous two candles' highs in a downtrend
+        if trend == 1:
+            if i >= 2:
+                sar[i] = min(sar[i], min(low[i-1], low[i-2]))
+            else:
+                sar[i] = min(sar[i], low[i-1])
+
+            # Trend switch check
+            if low[i] < sar[i]:
+                trend = -1
+                sar[i] = extreme_point
+                extreme_point = low[i]
+                af = af_start
+            else:
+                # Update extreme point and acceleration factor in current trend
+                if high[i] > extreme_point:
+                    extreme_point = high[i]
+                    af = min(af + af_increment, af_max)
+        else:  # trend == -1
+            if i >= 2:
+                sar[i] = max(sar[i], max(high[i-1], high[i-2]))
+            else:
+                sar[i] = max(sar[i], high[i-1])
+
+            # Trend switch check
+            if high[i] > sar[i]:
+                trend = 1
+                sar[i] = extreme_point
+                extreme_point = high[i]
+                af = af_start
+            else:
+                # Update extreme point and acceleration factor in current trend
+                if low[i] < extreme_point:
+                    extreme_point = low[i]
+                    af = min(af + af_increment, af_max)
+
+    return sar
+
+def as_float_array(values) -> np.ndarray:
+    """Contiguous float64 view of the input, as the compiled kernels expect"""
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+def warm_up():
+    """Compile (or load from cache) every kernel so the first chart does not pay for it"""
+    sample = np.linspace(1.0, 2.0, 8)
+    wilder_average(sample, 3, 2, 1.0)
+    wilder_sum(sample, 3, 2, 1.0)
+    parabolic_sar(sample + 0.5, sample, 0.02, 0.02, 0.2)
+    logging.info(f"Indicator kernels ready (backend: {KERNEL_BACKEND})")
@@ -0,0 +1,54 @@
+"""
+mplfinance addplots for indicators computed through the indicator registry.
+Overlays go on the price panel (0); each oscillator panel gets the next free
+panel number, in registry order.
+"""
+from typing import Any, Dict, List, Tuple
+
+import mplfinance as mpf
+import numpy as np
+import pandas as pd
+
+from indicator_registry import IndicatorSpec, assign_panels
+
+def build_addplots(df: pd.DataFrame, computed: List[Tuple[IndicatorSpec, Dict[str, str], Dict[str, Any]]],
+                   first_panel: int, separate_panels: bool = True) -> Tuple[List[dict], int]:
+    """Turn computed indicators into addplots.
+
+    computed holds (spec, columns, raw request params) per indicator, with the
+    columns already present in df. A 'color' request param overrides the
+    colour of the indicator's first line.
+    Returns the addplots and the total number of panels used.
+    """
+    specs = [spec for spec, _, _ in computed]
+    panels = assign_panels(specs, first_panel, separate_panels)
+    addplots = []
+
+    for spec, columns, raw_params in computed:
+        panel = 0 if spec.is_overlay else panels[spec.panel]
+        for position, line in enumerate(spec.plots):
+            series = df[columns[line.output]]
+            if not series.notna().any():
+                continue
+            color = raw_params.get('color', line.color) if position == 0 else line.color
+            kwargs = {'panel': panel, 'secondary_y': False}
+            if line.ylabel:
+                kwargs['ylabel'] = line.ylabel
+
+            if line.kind == 'histogram':
+                # Positive and negative bars in different colours
+                positive = series.where(series > 0)
+                negative = series.where(series <= 0)
+                addplots.append(mpf.make_addplot(positive, type='bar', width=line.width, color='green', alpha=0.5, **kwargs))
+                addplots.append(mpf.make_addplot(negative, type='bar', width=line.width, color='red', alpha=0.5, **kwargs))
+            elif line.kind == 'scatter':
+                addplots.append(mpf.make_addplot(series, type='scatter', markersize=3, marker='o', color=color, **kwargs))
+            else:
+                addplots.append(mpf.make_addplot(series, width=line.width, color=color, linestyle=line.linestyle, **kwargs))
+
+        for level, color in spec.levels:
+            addplots.append(mpf.make_addplot(np.full(len(df), level, dtype=float), width=0.8, color=color,
+                                             panel=panel, linestyle='--', secondary_y=False))
+
+    panel_count = max(list(panels.values()) + [first_panel - 1]) + 1
+    return addplots, panel_count
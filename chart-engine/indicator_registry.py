@@ -0,0 +1,330 @@
+"""
+Single registry of the technical indicators the chart engine supports.
+Each entry declares how to compute the indicator (through the functions in
+utils.py), which inputs it reads, the columns it produces, where it is drawn
+(price panel or its own oscillator panel) and how many bars it needs.
+The API renderer, generate_candlestick.py and utils.add_indicators all compute
+through this registry so every caller gets the same numbers.
+
+Indicators of one request are computed against a shared ComputeContext, which
+memoizes the intermediates several indicators depend on (true range, typical
+price, price deltas, SMAs and EMAs by period). The request's indicators form a
+small dependency graph over those nodes and each node is evaluated once.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+import utils
+
+PRICE_PANEL = 'price'
+
+@dataclass(frozen=True)
+class Param:
+    """An indicator parameter with its default and accepted alternative names"""
+    default: Any
+    aliases: Tuple[str, ...] = ()
+
+@dataclass(frozen=True)
+class PlotLine:
+    """How one output column is drawn"""
+    output: str
+    color: str
+    width: float = 1.5
+    kind: str = 'line'  # 'line', 'scatter' or 'histogram' (positive/negative bars)
+    linestyle: str = '-'
+    ylabel: Optional[str] = None
+
+class ComputeContext(Mapping):
+    """OHLCV columns of one request plus memoized shared intermediates.
+
+    Reads like the plain column mapping (ctx['close']); intermediates are built
+    on first use and reused afterwards. computed/reused count node evaluations
+    and cache hits per node kind.
+    """
+
+    def __init__(self, columns: Mapping[str, np.ndarray]):
+        self._columns = dict(columns)
+        self._nodes: Dict[Hashable, np.ndarray] = {}
+        self.computed: Counter = Counter()
+        self.reused: Counter = Counter()
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self._columns[column]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def _node(self, key: Tuple, build: Callable[[], np.ndarray]) -> np.ndarray:
+        if key in self._nodes:
+            self.reused[key[0]] += 1
+        else:
+            self.computed[key[0]] += 1
+            self._nodes[key] = build()
+        return self._nodes[key]
+
+    def true_range(self) -> np.ndarray:
+        return self._node(('true_range',), lambda: utils.true_range(self['high'], self['low'], self['close']))
+
+    def typical_price(self) -> np.ndarray:
+        return self._node(('typical_price',), lambda: utils.typical_price(self['high'], self['low'], self['close']))
+
+    def deltas(self, column: str = 'close') -> np.ndarray:
+        return self._node(('deltas', column), lambda: utils.price_deltas(self[column]))
+
+    def sma(self, column: str, period: int) -> np.ndarray:
+        return self._node(('sma', column, period), lambda: utils.calculate_sma(self[column], period))
+
+    def ema(self, column: str, period: int) -> np.ndarray:
+        return self._node(('ema', column, period), lambda: utils.calculate_ema(self[column], period))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Evaluations and reuses per intermediate kind"""
+        return {kind: {'computed': self.computed[kind], 'reused': self.reused[kind]}
+                for kind in sorted(set(self.computed) | set(self.reused))}
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    name: str
+    aliases: Tuple[str, ...]
+    compute: Callable[[ComputeContext, Dict[str, Any]], Dict[str, np.ndarray]]
+    inputs: Tuple[str, ...]
+    outputs: Dict[str, str]  # output key -> column name template
+    params: Dict[str, Param]
+    panel: str  # PRICE_PANEL or the name of the oscillator panel
+    min_bars: Callable[[Dict[str, Any]], int]  # bars needed before computing at all
+    warmup: Callable[[Dict[str, Any]], int]  # leading bars without a meaningful value
+    plots: Tuple[PlotLine, ...] = ()
+    levels: Tuple[Tuple[float, str], ...] = ()  # horizontal reference lines (value, color)
+
+    @property
+    def is_overlay(self) -> bool:
+        return self.panel == PRICE_PANEL
+
+    def resolve_params(self, raw: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+        """Canonical parameters from request params, accepting any alias and ignoring unknown keys"""
+        raw = raw or {}
+        resolved = {}
+        for name, param in self.params.items():
+            value = param.default
+            for key in (name,) + param.aliases:
+                if key in raw:
+                    value = raw[key]
+                    break
+            resolved[name] = value
+        return resolved
+
+    def columns(self, params: Dict[str, Any]) -> Dict[str, str]:
+        """Output key -> DataFrame column name for these parameters"""
+        return {key: template.format(**params) for key, template in self.outputs.items()}
+
+INDICATORS: Dict[str, IndicatorSpec] = {}
+_ALIASES: Dict[str, str] = {}
+
+def register(spec: IndicatorSpec):
+    INDICATORS[spec.name] = spec
+    for alias in (spec.name,) + spec.aliases:
+        _ALIASES[alias] = spec.name
+
+def get_indicator(name: str) -> Optional[IndicatorSpec]:
+    """Look up an indicator by name or alias (case-insensitive)"""
+    canonical = _ALIASES.get(name.lower())
+    return INDICATORS[canonical] if canonical else None
+
+def oscillator_panels() -> List[str]:
+    """Oscillator panel names in the order they are stacked below the price chart"""
+    panels = []
+    for spec in INDICATORS.values():
+        if not spec.is_overlay and spec.panel not in panels:
+            panels.append(spec.panel)
+    return panels
+
+def assign_panels(specs: List[IndicatorSpec], first_panel: int, separate_panels: bool = True) -> Dict[str, int]:
+    """Panel number for every panel name used by specs (price panel is always 0)"""
+    used = {spec.panel for spec in specs if not spec.is_overlay}
+    panels = {}
+    next_panel = first_panel
+    for name in oscillator_panels():
+        if name in used:
+            panels[name] = next_panel
+            if separate_panels:
+                next_panel += 1
+    return panels
+
+def compute_indicator(spec: IndicatorSpec, data: Mapping[str, np.ndarray], params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Compute an indicator and return its values keyed by column name.
+    Pass the same ComputeContext for every indicator of a request to share intermediates.
+    """
+    if not isinstance(data, ComputeContext):
+        data = ComputeContext(data)
+    values = spec.compute(data, params)
+    return {spec.columns(params)[key]: values[key] for key in spec.outputs}
+
+# Overlays on the price panel
+
+register(IndicatorSpec(
+    name='sma', aliases=('ma',),
+    compute=lambda ctx, p: {'sma': ctx.sma('close', p['period'])},
+    inputs=('close',), outputs={'sma': 'sma_{period}'},
+    params={'period': Param(20)}, panel=PRICE_PANEL,
+    min_bars=lambda p: p['period'], warmup=lambda p: p['period'] - 1,
+    plots=(PlotLine('sma', 'blue', ylabel='Price'),),
+))
+
+register(IndicatorSpec(
+    name='ema', aliases=(),
+    compute=lambda ctx, p: {'ema': ctx.ema('close', p['period'])},
+    inputs=('close',), outputs={'ema': 'ema_{period}'},
+    params={'period': Param(20)}, panel=PRICE_PANEL,
+    min_bars=lambda p: p['period'], warmup=lambda p: 0,
+    plots=(PlotLine('ema', 'orange'),),
+))
+
+register(IndicatorSpec(
+    name='wma', aliases=(),
+    compute=lambda ctx, p: {'wma': utils.calculate_wma(ctx['close'], p['period'])},
+    inputs=('close',), outputs={'wma': 'wma_{period}'},
+    params={'period': Param(20)}, panel=PRICE_PANEL,
+    min_bars=lambda p: p['period'], warmup=lambda p: p['period'] - 1,
+    plots=(PlotLine('wma', 'teal'),),
+))
+
+register(IndicatorSpec(
+    name='bb', aliases=('bollinger', 'bollingerbands'),
+    compute=lambda ctx, p: utils.calculate_bollinger_bands(
+        ctx['close'], p['period'], p['std_dev'], sma=ctx.sma('close', p['period'])),
+    inputs=('close',),
+    outputs={'middle': 'bb_middle_{period}', 'upper': 'bb_upper_{period}', 'lower': 'bb_lower_{period}'},
+    params={'period': Param(20), 'std_dev': Param(2.0, ('stdDev',))}, panel=PRICE_PANEL,
+    min_bars=lambda p: p['period'], warmup=lambda p: p['period'] - 1,
+    plots=(PlotLine('middle', 'green', width=1),
+           PlotLine('upper', 'green', width=0.8, linestyle='--'),
+           PlotLine('lower', 'green', width=0.8, linestyle='--')),
+))
+
+register(IndicatorSpec(
+    name='vwap', aliases=(),
+    compute=lambda ctx, p: {'vwap': utils.calculate_vwap(ctx['close'], ctx['volume'], p['period'])},
+    inputs=('close', 'volume'), outputs={'vwap': 'vwap'},
+    params={'period': Param(None)}, panel=PRICE_PANEL,
+    min_bars=lambda p: 1, warmup=lambda p: (p['period'] or 1) - 1,
+    plots=(PlotLine('vwap', 'magenta'),),
+))
+
+register(IndicatorSpec(
+    name='psar', aliases=('parabolicsar',),
+    compute=lambda ctx, p: {'psar': utils.calculate_parabolic_sar(
+        ctx['high'], ctx['low'], ctx['close'], p['af_start'], p['af_increment'], p['af_max'])},
+    inputs=('high', 'low', 'close'), outputs={'psar': 'psar'},
+    params={'af_start': Param(0.02, ('afStart',)), 'af_increment': Param(0.02, ('afIncrement',)),
+            'af_max': Param(0.2, ('afMax',))},
+    panel=PRICE_PANEL, min_bars=lambda p: 2, warmup=lambda p: 0,
+    plots=(PlotLine('psar', 'cyan', width=0, kind='scatter'),),
+))
+
+# Oscillators, each in its own panel (stacked in registration order)
+
+register(IndicatorSpec(
+    name='macd', aliases=('macdline', 'macdsignal', 'macdhistogram'),
+    compute=lambda ctx, p: utils.calculate_macd(
+        ctx['close'], p['fast_period'], p['slow_period'], p['signal_period'],
+        fast_ema=ctx.ema('close', p['fast_period']), slow_ema=ctx.ema('close', p['slow_period'])),
+    inputs=('close',),
+    outputs={'macd': 'macd_line', 'signal': 'macd_signal', 'histogram': 'macd_histogram'},
+    params={'fast_period': Param(12, ('fastPeriod', 'fast')), 'slow_period': Param(26, ('slowPeriod', 'slow')),
+            'signal_period': Param(9, ('signalPeriod', 'signal'))},
+    panel='macd', min_bars=lambda p: p['slow_period'] + p['signal_period'], warmup=lambda p: 0,
+    plots=(PlotLine('macd', 'blue', ylabel='MACD'),
+           PlotLine('signal', 'orange', width=1),
+           PlotLine('histogram', 'green', width=0.7, kind='histogram')),
+))
+
+register(IndicatorSpec(
+    name='rsi', aliases=(),
+    compute=lambda ctx, p: {'rsi': utils.calculate_rsi(ctx['close'], p['period'], deltas=ctx.deltas('close'))},
+    inputs=('close',), outputs={'rsi': 'rsi'},
+    params={'period': Param(14)}, panel='rsi',
+    min_bars=lambda p: p['period'] + 1, warmup=lambda p: p['period'],
+    plots=(PlotLine('rsi', 'purple', ylabel='RSI'),),
+    levels=((70, 'red'), (30, 'green')),
+))
+
+register(IndicatorSpec(
+    name='atr', aliases=(),
+    compute=lambda ctx, p: {'atr': utils.calculate_atr(
+        ctx['high'], ctx['low'], ctx['close'], p['period'], tr=ctx.true_range())},
+    inputs=('high', 'low', 'close'), outputs={'atr': 'atr'},
+    params={'period': Param(14)}, panel='atr',
+    min_bars=lambda p: p['period'] + 1, warmup=lambda p: p['period'] - 1,
+    plots=(PlotLine('atr', 'brown', ylabel='ATR'),),
+))
+
+register(IndicatorSpec(
+    name='stochastic', aliases=('stoch', 'stochasticoscillator'),
+    compute=lambda ctx, p: utils.calculate_stochastic(
+        ctx['high'], ctx['low'], ctx['close'], p['k_period'], p['d_period'], p['slowing']),
+    inputs=('high', 'low', 'close'), outputs={'k': 'stoch_k', 'd': 'stoch_d'},
+    params={'k_period': Param(14, ('kPeriod',)), 'd_period': Param(3, ('dPeriod',)), 'slowing': Param(1)},
+    panel='stochastic', min_bars=lambda p: p['k_period'] + p['d_period'],
+    warmup=lambda p: p['k_period'] + max(p['slowing'], 1) - 2,
+    plots=(PlotLine('k', 'blue', ylabel='Stoch'), PlotLine('d', 'red', width=1)),
+    levels=((80, 'red'), (20, 'green')),
+))
+
+register(IndicatorSpec(
+    name='williamsr', aliases=('williams%r', 'percentr', 'williams_r'),
+    compute=lambda ctx, p: {'williams_r': utils.calculate_williams_r(ctx['high'], ctx['low'], ctx['close'], p['period'])},
+    inputs=('high', 'low', 'close'), outputs={'williams_r': 'williams_r'},
+    params={'period': Param(14)}, panel='williams_r',
+    min_bars=lambda p: p['period'], warmup=lambda p: p['period'] - 1,
+    plots=(PlotLine('williams_r', 'purple', ylabel='%R'),),
+    levels=((-20, 'red'), (-80, 'green')),
+))
+
+register(IndicatorSpec(
+    name='cci', aliases=(),
+    compute=lambda ctx, p: {'cci': utils.calculate_cci(
+        ctx['high'], ctx['low'], ctx['close'], p['period'], tp=ctx.typical_price())},
+    inputs=('high', 'low', 'close'), outputs={'cci': 'cci'},
+    params={'period': Param(20)}, panel='cci',
+    min_bars=lambda p: p['period'], warmup=lambda p: p['period'] - 1,
+    plots=(PlotLine('cci', 'blue', ylabel='CCI'),),
+    levels=((100, 'red'), (-100, 'green')),
+))
+
+register(IndicatorSpec(
+    name='mfi', aliases=(),
+    compute=lambda ctx, p: {'mfi': utils.calculate_mfi(
+        ctx['high'], ctx['low'], ctx['close'], ctx['volume'], p['period'], tp=ctx.typical_price())},
+    inputs=('high', 'low', 'close', 'volume'), outputs={'mfi': 'mfi'},
+    params={'period': Param(14)}, panel='mfi',
+    min_bars=lambda p: p['period'] + 1, warmup=lambda p: p['period'],
+    plots=(PlotLine('mfi', 'orange', ylabel='MFI'),),
+    levels=((80, 'red'), (20, 'green')),
+))
+
+register(IndicatorSpec(
+    name='obv', aliases=(),
+    compute=lambda ctx, p: {'obv': utils.calculate_obv(ctx['close'], ctx['volume'], deltas=ctx.deltas('close'))},
+    inputs=('close', 'volume'), outputs={'obv': 'obv'},
+    params={}, panel='obv', min_bars=lambda p: 2, warmup=lambda p: 0,
+    plots=(PlotLine('obv', 'teal', ylabel='OBV'),),
+))
+
+register(IndicatorSpec(
+    name='adx', aliases=(),
+    compute=lambda ctx, p: utils.calculate_adx(ctx['high'], ctx['low'], ctx['close'], p['period'], tr=ctx.true_range()),
+    inputs=('high', 'low', 'close'),
+    outputs={'adx': 'adx', 'plus_di': 'plus_di', 'minus_di': 'minus_di'},
+    params={'period': Param(14)}, panel='adx',
+    min_bars=lambda p: 2 * p['period'], warmup=lambda p: 2 * p['period'] - 1,
+    plots=(PlotLine('adx', 'black', ylabel='ADX'),
+           PlotLine('plus_di', 'green', width=1),
+           PlotLine('minus_di', 'red', width=1)),
+    levels=((25, 'gray'),),
+))
@@ -0,0 +1,175 @@
+"""
+Indicator values without a chart.
+compute_columns runs a request's indicators through the registry on plain
+NumPy columns; the renderer adds the results to its DataFrame, and the
+/indicators endpoint returns them directly (no pandas frame, no matplotlib).
+
+Results are encoded as columnar JSON, as MessagePack typed arrays (needs
+msgpack), as an Arrow IPC stream (needs pyarrow) or as raw little-endian
+float64 arrays.
+"""
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from indicator_registry import ComputeContext, IndicatorSpec, get_indicator, compute_indicator
+from transport import msgpack, pa, typed_array
+
+# Extra diagnostics (e.g. shared intermediate reuse counters) in the logs
+DEBUG = bool(os.getenv("CHART_ENGINE_DEBUG"))
+
+# Most indicators computed for one request
+MAX_INDICATORS = 8
+
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'msgpack': 'application/msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'raw': 'application/octet-stream',
+}
+
+Computed = List[Tuple[IndicatorSpec, Dict[str, str], Dict[str, Any]]]
+
+def compute_columns(columns: Mapping[str, np.ndarray],
+                    indicators: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, np.ndarray], Computed]:
+    """Compute the requested indicators from OHLCV columns (open, high, low, close, volume).
+
+    Returns the indicator columns by name, with warm-up bars set to NaN, and
+    (spec, columns, raw params) for every indicator that was computed.
+    Unknown indicators and ones without enough bars are skipped.
+    """
+    values: Dict[str, np.ndarray] = {}
+    computed: Computed = []
+    if not indicators:
+        return values, computed
+
+    # Check if we have sufficient data points
+    data_points = len(columns['close'])
+    if data_points < 5:
+        logging.warning(f"Insufficient data points ({data_points}) for indicator calculations. Skipping indicators.")
+        return values, computed
+
+    start_time = time.time()
+
+    # Limit total indicators to prevent performance issues
+    if len(indicators) > MAX_INDICATORS:
+        logging.warning(f"Too many indicators requested ({len(indicators)}). Limiting to {MAX_INDICATORS}.")
+        indicators = dict(list(indicators.items())[:MAX_INDICATORS])
+
+    # One context for the whole request so shared intermediates are computed once
+    context = ComputeContext({column: np.asarray(columns[column], dtype=np.float64)
+                              for column in ('open', 'high', 'low', 'close', 'volume')})
+
+    for processed, (indicator_name, raw_params) in enumerate(indicators.items(), start=1):
+        try:
+            logging.info(f"Processing indicator {processed}/{len(indicators)}: {indicator_name}")
+
+            spec = get_indicator(indicator_name)
+            if spec is None:
+                logging.warning(f"Unknown indicator {indicator_name}, skipping")
+                continue
+
+            raw_params = raw_params or {}
+            params = spec.resolve_params(raw_params)
+            min_bars = spec.min_bars(params)
+            if data_points < min_bars:
+                logging.warning(f"Insufficient data for {spec.name}: need {min_bars}, have {data_points}")
+                continue
+
+            # Hide the warm-up bars so lines start where the indicator is meaningful
+            warmup = min(spec.warmup(params), data_points)
+            for column, result in compute_indicator(spec, context, params).items():
+                result = np.array(result, dtype=np.float64)
+                result[:warmup] = np.nan
+                values[column] = result
+
+            computed.append((spec, spec.columns(params), raw_params))
+        except Exception as e:
+            logging.error(f"Error calculating indicator {indicator_name}: {str(e)}")
+            # Continue processing other indicators instead of failing completely
+
+    if DEBUG:
+        logging.info(f"Shared intermediate reuse: {context.stats()}")
+    logging.info(f"Computed {len(computed)} indicators in {time.time() - start_time:.2f} seconds")
+    return values, computed
+
+def describe(computed: Computed) -> List[Dict[str, Any]]:
+    """Which columns each computed indicator produced, and where it is drawn"""
+    return [{"name": spec.name, "params": raw_params, "columns": list(columns.values()), "panel": spec.panel}
+            for spec, columns, raw_params in computed]
+
+def _json_column(values: np.ndarray) -> List[Optional[float]]:
+    # JSON has no NaN; warm-up bars become null
+    return [None if value != value else value for value in values.tolist()]
+
+def encode_json(t: np.ndarray, values: Dict[str, np.ndarray], computed: Computed) -> bytes:
+    """Columnar JSON: epoch-ms timestamps plus one array per indicator column"""
+    return json.dumps({
+        "t": t.tolist(),
+        "columns": {name: _json_column(column) for name, column in values.items()},
+        "indicators": describe(computed),
+    }, separators=(',', ':')).encode()
+
+def encode_msgpack(t: np.ndarray, values: Dict[str, np.ndarray], computed: Computed) -> bytes:
+    """The JSON layout with typed arrays (see transport.py) in place of number lists; NaN kept"""
+    if msgpack is None:
+        raise ValueError("MessagePack output needs msgpack installed")
+    return msgpack.packb({
+        "t": typed_array(np.asarray(t, dtype=np.int64)),
+        "columns": {name: typed_array(column) for name, column in values.items()},
+        "indicators": describe(computed),
+    })
+
+def encode_arrow(t: np.ndarray, values: Dict[str, np.ndarray]) -> bytes:
+    """Arrow IPC stream with one record batch: t (timestamp[ms]) and float64 columns (NaN kept)"""
+    if pa is None:
+        raise ValueError("Arrow output needs pyarrow installed")
+    batch = pa.record_batch([pa.array(t, type=pa.timestamp('ms'))] + [pa.array(column) for column in values.values()],
+                            names=['t'] + list(values))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+def encode_raw(t: np.ndarray, values: Dict[str, np.ndarray]) -> bytes:
+    """Columns back to back as little-endian float64, t first (epoch ms, exact below 2**53)"""
+    block = np.empty((len(values) + 1, len(t)), dtype='<f8')
+    block[0] = t
+    for row, column in enumerate(values.values(), start=1):
+        block[row] = column
+    return block.tobytes()
+
+def unavailable(output_format: str) -> Optional[str]:
+    """Why an output format can't be produced here (a missing optional dependency), or None"""
+    if output_format == 'arrow' and pa is None:
+        return "Arrow output needs pyarrow installed"
+    if output_format == 'msgpack' and msgpack is None:
+        return "MessagePack output needs msgpack installed"
+    return None
+
+OHLCV_NAMES = {'o': 'open', 'h': 'high', 'l': 'low', 'c': 'close', 'v': 'volume'}
+
+def indicator_output(columns: Mapping[str, np.ndarray], indicators: Dict[str, Dict[str, Any]],
+                     output_format: str = 'json') -> Tuple[bytes, List[str], Dict[str, float]]:
+    """Compute indicators for normalized columns (t, o, h, l, c, v) and encode them.
+
+    Returns the encoded body, its column names (t first) and the indicator
+    and encode times.
+    """
+    start_time = time.time()
+    values, computed = compute_columns({name: columns[key] for key, name in OHLCV_NAMES.items()}, indicators)
+    indicator_time = time.time() - start_time
+    t = columns['t']
+    if output_format == 'arrow':
+        body = encode_arrow(t, values)
+    elif output_format == 'msgpack':
+        body = encode_msgpack(t, values, computed)
+    elif output_format == 'raw':
+        body = encode_raw(t, values)
+    else:
+        body = encode_json(t, values, computed)
+    return body, ['t'] + list(values), {"indicators": indicator_time, "encode": time.time() - start_time - indicator_time}
@@ -1,25 +1,37 @@
 import os
 import json
+import asyncio
 import base64
-import gc
 import time
 import traceback
-from io import BytesIO
+from contextlib import asynccontextmanager
 import matplotlib
 # Use the Agg backend which is non-interactive and doesn't require GUI
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import mplfinance as mpf
-import pandas as pd
-import numpy as np
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, ValidationError, ValidationInfo, model_validator
+from typing import Annotated, List, Dict, Any, Literal, Optional, Tuple, Union
 import uvicorn
 import logging
 from dotenv import load_dotenv
+import chart_styles
+from chart_renderer import CHART_TYPES, render_chart
+from output_profiles import MEDIA_TYPES
+from render_pool import RenderPool, RenderQueueFull
+from render_cache import RenderCache, request_key
+from resampling import Columns, ResampleError, SeriesStore, UnknownSeries, interval, series_id, timeframe_ms, to_columns
+from candle_store import CandleStore, UnknownCandles
+import indicator_values
+import transport
+from single_flight import SingleFlight
+from indicator_registry import get_indicator
+import metrics
+import profiling
 
 # Configure logging
 logging.basicConfig(
@@ -30,8 +42,68 @@ logging.basicConfig(
 # Load environment variables
 load_dotenv()
 
+# Render worker pool, started and stopped with the app
+render_pool = RenderPool()
+
+# Cache of rendered charts keyed by the normalized request
+render_cache = RenderCache()
+
+# Concurrent identical chart requests share one render
+render_flights = SingleFlight()
+
+# Uploaded base series and their resampled timeframes
+series_store = SeriesStore()
+
+# Live candles per (symbol, timeframe), updated incrementally with PUT /candles
+candle_store = CandleStore()
+
+# Metrics exposed by /metrics
+STAGE_SECONDS = metrics.histogram(
+    "chart_engine_stage_seconds", "Time per request stage (parse, data, indicators, render, encode, total)",
+    ("endpoint", "stage"))
+CHART_REQUESTS = metrics.counter(
+    "chart_engine_chart_requests_total", "Chart requests by chart type, indicator set and outcome",
+    ("chart_type", "indicators", "outcome"))
+INDICATOR_REQUESTS = metrics.counter(
+    "chart_engine_indicator_requests_total", "/indicators requests by indicator set and output format",
+    ("indicators", "format"))
+metrics.gauge("chart_engine_render_queue_depth", "Render jobs waiting for a free worker",
+              callback=lambda: render_pool.queue_depth)
+metrics.gauge("chart_engine_renders_in_flight", "Render jobs running in the workers",
+              callback=lambda: render_pool.in_flight)
+metrics.counter("chart_engine_render_coalesced_total", "Chart requests that awaited an identical render in flight",
+                callback=lambda: render_flights.coalesced)
+metrics.counter("chart_engine_render_cache_hits_total", "Chart requests served from the render cache",
+                callback=lambda: render_cache.hits)
+metrics.gauge("chart_engine_resident_memory_bytes", "Resident set size of the API process and each render worker",
+              ("process",), callback=lambda: resident_memory())
+metrics.gauge("chart_engine_worker_figures", "Matplotlib figures alive in a render worker after its latest render",
+              ("worker",), callback=lambda: live_worker_figures())
+metrics.counter("chart_engine_workers_recycled_total", "Render workers replaced after their job, RSS or figure limit",
+                callback=lambda: render_pool.recycled)
+
+def resident_memory() -> Dict[tuple, Optional[int]]:
+    memory = {("api",): metrics.process_rss()}
+    for pid in render_pool.worker_pids():
+        memory[(f"worker-{pid}",)] = metrics.process_rss(pid)
+    return memory
+
+def live_worker_figures() -> Dict[tuple, int]:
+    return {(f"worker-{pid}",): figures for pid, figures in render_pool.worker_figures().items()}
+
+def indicator_set(indicators: Optional[Dict[str, Any]]) -> str:
+    """Metric label for a request's indicators: canonical names, sorted (unknown names are dropped)"""
+    names = sorted({spec.name for spec in map(get_indicator, indicators or ()) if spec is not None})
+    return ",".join(names) or "none"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await render_pool.start()
+    yield
+    render_pool.shutdown()
+
 # Initialize FastAPI app
-app = FastAPI(title="Trade Tracker Chart Engine")
+app = FastAPI(title="Trade Tracker Chart Engine", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -42,6 +114,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Columnar payloads skip per-candle validation, so they may carry longer histories
+MAX_COLUMNAR_CANDLES = 100_000
+
+# Most chart requests accepted by one /generate-charts call
+MAX_BATCH_JOBS = 64
+
 # Pydantic models with validation
 class OHLCVData(BaseModel):
     datetime: str
@@ -51,389 +129,632 @@ class OHLCVData(BaseModel):
     close: float
     volume: float
 
-class ChartRequest(BaseModel):
-    data: List[OHLCVData] = Field(..., description="OHLCV data points", max_items=500)
+# Candle lists keep the original 500-candle request limit
+CandleList = Annotated[List[OHLCVData], Field(max_length=500)]
+
+class ColumnarOHLCV(BaseModel):
+    """OHLCV candles as parallel arrays, converted straight to NumPy without per-candle models"""
+    t: Union[List[float], List[str]] = Field(..., description="Timestamps (epoch milliseconds or ISO strings)", max_length=MAX_COLUMNAR_CANDLES)
+    o: List[float] = Field(..., description="Open prices", max_length=MAX_COLUMNAR_CANDLES)
+    h: List[float] = Field(..., description="High prices", max_length=MAX_COLUMNAR_CANDLES)
+    l: List[float] = Field(..., description="Low prices", max_length=MAX_COLUMNAR_CANDLES)
+    c: List[float] = Field(..., description="Close prices", max_length=MAX_COLUMNAR_CANDLES)
+    v: List[float] = Field(..., description="Volumes", max_length=MAX_COLUMNAR_CANDLES)
+
+    @model_validator(mode='after')
+    def check_lengths(self):
+        lengths = {len(self.t), len(self.o), len(self.h), len(self.l), len(self.c), len(self.v)}
+        if len(lengths) != 1:
+            raise ValueError("Columnar OHLCV arrays must all have the same length")
+        return self
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def tail(self, n: int) -> "ColumnarOHLCV":
+        """Keep only the most recent n candles"""
+        return ColumnarOHLCV(t=self.t[-n:], o=self.o[-n:], h=self.h[-n:],
+                             l=self.l[-n:], c=self.c[-n:], v=self.v[-n:])
+
+class MarketColors(BaseModel):
+    """make_marketcolors settings of a custom theme"""
+    model_config = ConfigDict(extra='forbid')
+
+    up: Optional[str] = None
+    down: Optional[str] = None
+    edge: Optional[Union[str, Dict[str, str]]] = None
+    wick: Optional[Union[str, Dict[str, str]]] = None
+    ohlc: Optional[Union[str, Dict[str, str]]] = None
+    volume: Optional[Union[str, Dict[str, str]]] = None
+    alpha: Optional[float] = None
+    inherit: Optional[bool] = None
+
+class StyleDefinition(BaseModel):
+    """A custom chart theme: make_mpf_style settings on top of an mplfinance base style"""
+    model_config = ConfigDict(extra='forbid')
+
+    base_mpf_style: Optional[str] = Field(None, description="mplfinance style to start from, e.g. yahoo or nightclouds")
+    marketcolors: Optional[MarketColors] = None
+    mavcolors: Optional[List[str]] = None
+    facecolor: Optional[str] = None
+    edgecolor: Optional[str] = None
+    figcolor: Optional[str] = None
+    gridcolor: Optional[str] = None
+    gridstyle: Optional[str] = None
+    gridaxis: Optional[str] = None
+    y_on_right: Optional[bool] = None
+    rc: Optional[Dict[str, Union[str, float, bool]]] = Field(None, description="matplotlib rcParams overrides")
+
+class StyleRegistration(BaseModel):
+    id: Optional[str] = Field(None, description="ID to register the theme under (derived from the definition if omitted)",
+                              pattern=r'^[A-Za-z0-9_.-]{1,64}$')
+    definition: StyleDefinition
+
+class CandleSource(BaseModel):
+    """Where a request's candles come from: sent inline, an uploaded series, or a symbol's stored candles"""
+    data: Optional[Union[CandleList, ColumnarOHLCV]] = Field(None, description="OHLCV data points, as a list of candles or as columnar arrays")
+    series_id: Optional[str] = Field(None, description="Use a series uploaded with POST /series instead of sending data")
+    symbol: Optional[str] = Field(None, description="Use candles stored with PUT /candles/{symbol}/{timeframe} instead of sending data")
+    timeframe: Optional[str] = Field(None, description="Timeframe to resample series_id to, or of the stored symbol (1m, 5m, 15m, 1h, 4h, 1d, ...)")
+    window: Optional[int] = Field(None, description="Newest candles of series_id or symbol to use (default all)", gt=0, le=MAX_COLUMNAR_CANDLES)
+
+    # Candles decoded from an Arrow or MessagePack body (see parse_body); stand in for data
+    _columns: Optional[Columns] = PrivateAttr(None)
+
+    @model_validator(mode='after')
+    def check_source(self, info: ValidationInfo):
+        if info.context and info.context.get('columns') is not None:
+            self._columns = info.context['columns']
+        inline = self.data is not None or self._columns is not None
+        if sum(source is not None for source in (self.data, self._columns, self.series_id, self.symbol)) != 1:
+            raise ValueError("Send exactly one of data, series_id or symbol")
+        if self.timeframe is not None and self.series_id is None and self.symbol is None:
+            raise ValueError("timeframe needs a series_id or symbol")
+        if self.symbol is not None and self.timeframe is None:
+            raise ValueError("symbol needs a timeframe")
+        if self.window is not None and inline:
+            raise ValueError("window applies to series_id or symbol; trim data before sending it")
+        return self
+
+    @property
+    def binary_columns(self) -> Optional[Columns]:
+        return self._columns
+
+    def describe(self) -> str:
+        if self.series_id is not None:
+            return f"series {self.series_id} at {self.timeframe or 'its own timeframe'}"
+        if self.symbol is not None:
+            return f"stored candles {self.symbol} {self.timeframe}"
+        if self._columns is not None:
+            return f"{len(self._columns['t'])} data points (binary)"
+        return f"{len(self.data)} data points"
+
+    def stored_columns(self, window: Optional[int]) -> Columns:
+        """The newest window candles of the referenced series or symbol (all if window is None)"""
+        if self.series_id is not None:
+            columns = series_store.get(self.series_id, self.timeframe)
+            return {key: values[-window:] for key, values in columns.items()} if window else columns
+        return candle_store.window(self.symbol, self.timeframe, window)
+
+    def columns(self) -> Columns:
+        """The request's candles as normalized columns (see resampling.to_columns)"""
+        if self._columns is not None:
+            return self._columns
+        if self.data is None:
+            return self.stored_columns(self.window)
+        if isinstance(self.data, ColumnarOHLCV):
+            return to_columns(self.data.t, self.data.o, self.data.h, self.data.l, self.data.c, self.data.v)
+        return to_columns([candle.datetime for candle in self.data], [candle.open for candle in self.data],
+                          [candle.high for candle in self.data], [candle.low for candle in self.data],
+                          [candle.close for candle in self.data], [candle.volume for candle in self.data])
+
+class ChartRequest(CandleSource):
+    window: Optional[int] = Field(None, description="Newest candles of series_id or symbol to chart (default 400)", gt=0, le=400)
     chart_type: str = Field("candle", description="Chart type (candle, line, ohlc)")
     width: int = Field(1200, description="Chart width in pixels", gt=0, le=2000)
     height: int = Field(800, description="Chart height in pixels", gt=0, le=2000)
     indicators: Optional[Dict[str, Dict[str, Any]]] = Field(None, description="Technical indicators")
     separate_oscillators: bool = Field(True, description="Whether to place oscillators in separate panels")
-
-# Helper function to convert data to pandas DataFrame with error handling
-def convert_to_dataframe(data: List[OHLCVData]) -> pd.DataFrame:
+    layout: Literal["tight", "fixed"] = Field("tight", description="mplfinance layout: tight cropping, or fixed geometry drawn once at exactly width x height")
+    renderer: Literal["mplfinance", "raster"] = Field("mplfinance", description="Render backend: mplfinance, or the faster direct raster renderer")
+    style: Optional[str] = Field(None, description="mplfinance renderer theme: a builtin name (default yahoo) or an ID from POST /styles")
+    style_definition: Optional[StyleDefinition] = Field(None, description="Custom theme for this chart; registered under `style` if given, like POST /styles")
+    profile: Optional[Literal["llm-compact", "dashboard", "archive"]] = Field(None, description="Output profile: pixel budget, DPI, palette and compression (implies the fixed layout)")
+    image_format: Optional[Literal["png", "webp", "jpeg"]] = Field(None, description="Image format, overriding the profile's (dashboard profile if no profile is given)")
+
+class IndicatorRequest(CandleSource):
+    indicators: Dict[str, Dict[str, Any]] = Field(..., description="Technical indicators, as for /generate-chart")
+
+class BatchChartRequest(ChartRequest):
+    id: Optional[str] = Field(None, description="Caller's label for this job, echoed in its result line")
+
+class BatchRequest(BaseModel):
+    # Validated one by one (as BatchChartRequest), so an invalid job fails its own line only
+    jobs: List[Dict[str, Any]] = Field(..., description="Chart requests to render (ChartRequest fields plus an optional id)",
+                                       min_length=1, max_length=MAX_BATCH_JOBS)
+
+def resolve_style(request: ChartRequest, job: Dict[str, Any]):
+    """Register an inline theme and attach a registered theme's definition to the job.
+
+    Render workers build custom themes from the definition the first time
+    they see an ID, so only the API process has to keep the registry.
+    """
+    if request.style_definition is not None:
+        definition = request.style_definition.model_dump(exclude_none=True)
+        job['style'] = chart_styles.register_style(definition, job['style'])
+    elif job['style'] is not None:
+        chart_styles.get_style(job['style'])  # raises StyleError for unknown IDs
+    job['style_definition'] = chart_styles.get_definition(job['style']) if job['style'] else None
+
+def parse_accept(accept: str) -> List[Tuple[str, str, float]]:
+    """Media ranges of an Accept header as (type, subtype, q) tuples"""
+    ranges = []
+    for part in accept.split(','):
+        media_range, *params = [item.strip() for item in part.split(';')]
+        kind, _, subtype = media_range.lower().partition('/')
+        if not kind or not subtype:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        ranges.append((kind, subtype, q))
+    return ranges
+
+def accept_quality(ranges: List[Tuple[str, str, float]], media_type: str) -> float:
+    """q-value the parsed Accept ranges give a media type; the most specific matching range wins"""
+    kind, _, subtype = media_type.partition('/')
+    best, specificity = 0.0, -1
+    for range_kind, range_subtype, q in ranges:
+        if range_kind == kind and range_subtype == subtype:
+            rank = 2
+        elif range_kind == kind and range_subtype == '*':
+            rank = 1
+        elif range_kind == '*' and range_subtype == '*':
+            rank = 0
+        else:
+            continue
+        if rank > specificity:
+            best, specificity = q, rank
+    return best
+
+def wants_image(http_request: Request, format: Optional[str]) -> bool:
+    """Content negotiation for /generate-chart: raw image bytes or the default JSON.
+
+    ?format= wins over the Accept header. From Accept, raw bytes are only
+    returned when some image type is preferred over application/json by
+    q-value, so */* or a tie keeps JSON. This picks the response shape only;
+    the image format comes from the request's profile / image_format.
+    """
+    if format:
+        format = format.lower()
+        return format in MEDIA_TYPES or format in MEDIA_TYPES.values()
+    ranges = parse_accept(http_request.headers.get('accept', ''))
+    image_q = max(accept_quality(ranges, media_type) for media_type in MEDIA_TYPES.values())
+    return image_q > 0 and image_q > accept_quality(ranges, 'application/json')
+
+def profiling_flag(http_request: Request) -> Optional[Dict[str, Any]]:
+    """Profiling spec from ?profiling= / X-Chart-Profiling, or None (see profiling.py)"""
+    mode = http_request.query_params.get('profiling') or http_request.headers.get('x-chart-profiling')
+    return profiling.profiling_spec(mode, http_request.query_params.get('profiling_top'))
+
+async def produce_chart(request: ChartRequest, with_base64: bool, endpoint: str = "/generate-chart",
+                        profiling_spec: Optional[Dict[str, Any]] = None):
+    """Render a chart request (or take it from the render cache).
+
+    Returns the cached chart entry and whether it was a cache hit. A profiled
+    request always renders, bypassing the cache and in-flight renders; its
+    chart carries the profiling report and is not cached.
+    """
+    # Labelled like the renderer draws it, so arbitrary chart_type strings can't grow the label set
+    chart_type = request.chart_type if request.chart_type in CHART_TYPES else "candle"
+    outcome = "error"
     try:
-        # Create dataframe from model dictionaries
-        df = pd.DataFrame([d.dict() for d in data])
-
-        # Convert datetime strings to pandas datetime objects
-        # Handle both timestamp integers and date strings
-        if df['datetime'].dtype == 'int64' or df['datetime'].dtype == 'float64':
-            # Timestamps in milliseconds need to be converted to seconds for pandas
-            df['datetime'] = pd.to_datetime(df['datetime'], unit='ms')
+        chart, cached, coalesced = await _produce_chart(request, with_base64, endpoint, profiling_spec)
+        outcome = "cached" if cached else "coalesced" if coalesced else "rendered"
+        return chart, cached
+    finally:
+        CHART_REQUESTS.inc(chart_type=chart_type, indicators=indicator_set(request.indicators), outcome=outcome)
+
+async def _produce_chart(request: ChartRequest, with_base64: bool, endpoint: str,
+                         profiling_spec: Optional[Dict[str, Any]]):
+    # Limit data points to prevent performance issues
+    if request.data is not None and len(request.data) > 400:  # Increased cap to 400 candles for better analysis
+        logging.warning(f"Limiting request from {len(request.data)} to 400 data points")
+        if isinstance(request.data, ColumnarOHLCV):
+            request.data = request.data.tail(400)
         else:
-            # Handle ISO format strings
-            df['datetime'] = pd.to_datetime(df['datetime'])
-
-        # Set datetime as index
-        df.set_index('datetime', inplace=True)
-
-        logging.info(f"Successfully created DataFrame with {len(df)} rows")
-        return df
-    except Exception as e:
-        logging.error(f"Error converting data to DataFrame: {str(e)}")
-        raise ValueError(f"Failed to process candle data: {str(e)}")
+            request.data = request.data[-400:]  # Use most recent 400 points
+    binary = request.binary_columns
+    if binary is not None and len(binary['t']) > 400:
+        logging.warning(f"Limiting request from {len(binary['t'])} to 400 data points")
+        binary = {key: values[-400:] for key, values in binary.items()}
+
+    job = request.model_dump(exclude={'id'})
+    resolve_style(request, job)
+    if request.symbol is not None:
+        # Stored candles change in place; their revision keys the cache instead of the candles
+        job['revision'] = candle_store.revision(request.symbol, request.timeframe)
+    elif binary is not None:
+        # Binary candles are keyed by their content hash, like an uploaded series
+        job['data_hash'] = series_id(binary)
+    # A stored series is keyed by its content hash, so the key is computed
+    # before its candles are attached
+    cache_key = request_key(job)
+
+    # Serve identical requests from the render cache
+    chart = render_cache.get(cache_key) if render_cache.enabled and profiling_spec is None else None
+    cached = chart is not None
+
+    coalesced = False
+    if not cached:
+        async def render() -> Dict[str, Any]:
+            if binary is not None:
+                job['data'] = binary
+            elif request.data is None:
+                job['data'] = request.stored_columns(request.window or 400)
+
+            # Render in the worker pool so the event loop stays responsive
+            result = await render_pool.submit(render_chart, job)
+            for stage, seconds in result["timings"].items():
+                if seconds is not None:
+                    STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=stage)
+
+            rendered = {
+                "image": result["image"],
+                "chart_image": None,
+                "image_format": result["image_format"],
+                "encode_time": result["timings"]["encode"],
+                "chart_type": result["chart_type"],
+                "width": result["width"],
+                "height": result["height"],
+            }
+            if profiling_spec is not None:
+                # The report belongs to this request only
+                rendered["profiling"] = {**result["profiling"], "timings": result["timings"]}
+                return rendered
+            # Budget for the image plus its base64 form (4/3 of the image size)
+            image_size = len(rendered["image"])
+            render_cache.put(cache_key, rendered, image_size + (image_size * 4 + 2) // 3)
+            return rendered
+
+        if profiling_spec is not None:
+            job['profiling'] = profiling_spec
+            chart = await render()
+        else:
+            # Identical requests arriving before the render reaches the cache await the same render
+            chart, coalesced = await render_flights.do(cache_key, render)
+        if coalesced:
+            logging.info("Coalesced with an identical chart request in flight")
+
+    # Base64 is only needed for the JSON shape; encode it once per cached chart
+    if chart["chart_image"] is None and with_base64:
+        encode_start = time.time()
+        chart["chart_image"] = base64.b64encode(chart["image"]).decode()
+        STAGE_SECONDS.observe(time.time() - encode_start, endpoint=endpoint, stage="encode")
+
+    return chart, cached, coalesced
+
+def chart_body(chart: Dict[str, Any], cached: bool, total_time: float) -> Dict[str, Any]:
+    """JSON response for a rendered chart"""
+    body = {
+        "success": True,
+        "chart_image": chart["chart_image"],
+        "image_format": chart["image_format"],
+        "image_bytes": len(chart["image"]),
+        "encode_time": chart["encode_time"],
+        "chart_type": chart["chart_type"],
+        "width": chart["width"],
+        "height": chart["height"],
+        "processing_time": round(total_time, 2),
+        "cached": cached
+    }
+    if "profiling" in chart:
+        body["profiling"] = chart["profiling"]
+    return body
+
+def error_body(e: Exception):
+    """Status code and JSON response for a failed chart"""
+    if isinstance(e, chart_styles.StyleError):
+        return 400, {"success": False, "error": str(e), "detail": "Invalid chart style"}
+    if isinstance(e, UnknownSeries):
+        return 404, {"success": False, "error": str(e), "detail": "Upload the series again with POST /series"}
+    if isinstance(e, UnknownCandles):
+        return 404, {"success": False, "error": str(e), "detail": "Send the candles again with PUT /candles/{symbol}/{timeframe}"}
+    if isinstance(e, ResampleError):
+        return 400, {"success": False, "error": str(e), "detail": "Invalid timeframe"}
+    if isinstance(e, profiling.ProfilingError):
+        return 400, {"success": False, "error": str(e), "detail": "Invalid profiling flag"}
+    if isinstance(e, RenderQueueFull):
+        logging.warning(f"Rejecting chart request: {str(e)}")
+        return 503, {"success": False, "error": str(e), "detail": "Chart engine is busy"}
+
+    # Log the full exception with traceback
+    logging.error(f"Error generating chart: {str(e)}")
+    logging.error(traceback.format_exc())
+    return 500, {"success": False, "error": str(e), "detail": "Chart generation failed"}
+
+def body_error(e: ValidationError) -> RequestValidationError:
+    # Located under "body" like FastAPI's own body validation errors; inputs may be large arrays
+    return RequestValidationError([{**error, 'loc': ('body',) + tuple(error['loc'])}
+                                   for error in e.errors(include_input=False)])
+
+def request_transport(http_request: Request) -> str:
+    try:
+        return transport.transport(http_request.headers.get('content-type'))
+    except transport.UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
 
-# Helper function to add technical indicators with performance optimizations
-def add_indicators(df: pd.DataFrame, indicators: Dict[str, Dict[str, Any]]) -> List[mpf.make_addplot]:
-    """Add technical indicators to the dataframe with improved performance"""
-    addplots = []
+def route_path(http_request: Request) -> str:
+    """The matched route's path template, e.g. /candles/{symbol}/{timeframe}, for metric labels"""
+    route = http_request.scope.get('route')
+    return route.path if route is not None else http_request.url.path
 
-    if not indicators:
-        return addplots
+def check_candle_count(columns: Columns):
+    if len(columns['t']) > MAX_COLUMNAR_CANDLES:
+        raise ValueError(f"At most {MAX_COLUMNAR_CANDLES} candles per request")
 
-    # Check if we have sufficient data points
-    data_points = len(df)
-    if data_points < 5:
-        logging.warning(f"Insufficient data points ({data_points}) for indicator calculations. Skipping indicators.")
-        return addplots
+async def parse_body(http_request: Request, model):
+    """Validate a JSON, Arrow or MessagePack request body as model.
 
+    Binary candles are decoded straight to NumPy columns and handed to the
+    model through the validation context, so they never become Python floats.
+    """
     start_time = time.time()
-    total_indicators = len(indicators)
-    processed = 0
-
-    # Track which oscillator types we've seen to assign proper panels
-    oscillator_types = ['macd', 'rsi', 'atr', 'stochastic']
-    panel_assignments = {}
-    next_panel = 2  # Start at panel 2 (panel 1 reserved for volume)
-
-    # Limit total indicators to prevent performance issues
-    if total_indicators > 8:
-        logging.warning(f"Too many indicators requested ({total_indicators}). Limiting to 8.")
-        # Take only the first 8 indicator keys
-        indicator_keys = list(indicators.keys())[:8]
-        indicators = {k: indicators[k] for k in indicator_keys}
-
-    for indicator_name, params in indicators.items():
-        try:
-            processed += 1
-            logging.info(f"Processing indicator {processed}/{len(indicators)}: {indicator_name}")
-
-            # Each indicator calculation is wrapped with error handling
-            if indicator_name.lower() == 'sma':
-                period = params.get('period', 20)
-                color = params.get('color', 'blue')
-                # Ensure we have enough data for SMA calculation
-                effective_period = min(period, max(1, len(df) - 1))
-                if effective_period >= 1:
-                    sma_values = df['close'].rolling(window=effective_period).mean()
-                    # Only add if we have valid values
-                    if not sma_values.dropna().empty:
-                        df[f'SMA_{period}'] = sma_values
-                        addplots.append(mpf.make_addplot(df[f'SMA_{period}'], color=color))
-
-            # ATR indicator
-            if indicator_name.lower() == 'atr':
-                period = params.get('period', 14)
-                color = params.get('color', 'brown')
-                # Ensure we have enough data for ATR calculation
-                effective_period = min(period, max(2, len(df) - 1))
-                if len(df) >= effective_period + 1:  # Need at least period+1 for ATR
-                    # Calculate ATR
-                    tr1 = abs(df['high'] - df['low'])
-                    tr2 = abs(df['high'] - df['close'].shift())
-                    tr3 = abs(df['low'] - df['close'].shift())
-                    tr = pd.DataFrame({'tr1': tr1, 'tr2': tr2, 'tr3': tr3}).max(axis=1)
-                    atr_values = tr.rolling(window=effective_period).mean()
-                    # Only add if we have valid values
-                    if not atr_values.dropna().empty:
-                        df['ATR'] = atr_values
-                        # Use a separate panel for ATR
-                        addplots.append(mpf.make_addplot(df['ATR'], panel=3, color=color, ylabel='ATR'))
-            elif indicator_name.lower() == 'rsi':
-                period = params.get('period', 14)
-                color = params.get('color', 'purple')
-                # Ensure we have enough data for RSI calculation
-                effective_period = min(period, max(2, len(df) - 1))
-                if len(df) >= effective_period + 1:  # Need at least period+1 for RSI
-                    # Calculate RSI directly
-                    delta = df['close'].diff()
-                    gain = delta.where(delta > 0, 0)
-                    loss = -delta.where(delta < 0, 0)
-                    avg_gain = gain.rolling(window=effective_period).mean()
-                    avg_loss = loss.rolling(window=effective_period).mean()
-                    # Avoid division by zero
-                    rs = avg_gain / avg_loss.replace(0, 1e-10)
-                    rsi_values = 100 - (100 / (1 + rs))
-                    # Only add if we have valid values
-                    if not rsi_values.dropna().empty:
-                        df['RSI'] = rsi_values
-                        # Use a separate panel for RSI
-                        addplots.append(mpf.make_addplot(df['RSI'], panel=2, color=color, ylabel='RSI'))
-
-            elif indicator_name.lower() == 'ema':
-                period = params.get('period', 20)
-                color = params.get('color', 'red')
-                # Ensure we have enough data for EMA calculation
-                effective_period = min(period, max(1, len(df) - 1))
-                if effective_period >= 1:
-                    ema_values = df['close'].ewm(span=effective_period, adjust=False).mean()
-                    # Only add if we have valid values
-                    if not ema_values.dropna().empty:
-                        df[f'EMA_{period}'] = ema_values
-                        addplots.append(mpf.make_addplot(df[f'EMA_{period}'], color=color))
-
-            elif indicator_name.lower() in ['bollinger', 'bb', 'bollingerbands']:
-                period = params.get('period', 20)
-                std_dev = params.get('stdDev', params.get('std_dev', 2))
-
-                logging.info(f"🎯 Processing Bollinger Bands: period={period}, stdDev={std_dev}")
-
-                # Use smaller window if dataset is small, but ensure minimum of 2
-                window = min(period, max(2, len(df) - 1))
-
-                logging.info(f"🎯 BB window size: {window}, DataFrame length: {len(df)}")
-
-                if len(df) >= window:
-                    bb_middle = df['close'].rolling(window=window).mean()
-                    bb_std = df['close'].rolling(window=window).std()
-                    bb_upper = bb_middle + std_dev * bb_std
-                    bb_lower = bb_middle - std_dev * bb_std
-
-                    # Only add if we have valid values
-                    if not bb_middle.dropna().empty and not bb_std.dropna().empty:
-                        df[f'BB_middle_{period}'] = bb_middle
-                        df[f'BB_upper_{period}'] = bb_upper
-                        df[f'BB_lower_{period}'] = bb_lower
-
-                        addplots.append(mpf.make_addplot(df[f'BB_upper_{period}'], color='green', linestyle='--'))
-                        addplots.append(mpf.make_addplot(df[f'BB_middle_{period}'], color='blue'))
-                        addplots.append(mpf.make_addplot(df[f'BB_lower_{period}'], color='green', linestyle='--'))
-
-                        logging.info(f"✅ Successfully added Bollinger Bands to chart: {len([x for x in [bb_middle, bb_upper, bb_lower] if not x.dropna().empty])} bands")
-                    else:
-                        logging.warning(f"❌ BB calculation failed - empty values. Middle empty: {bb_middle.dropna().empty}, Std empty: {bb_std.dropna().empty}")
-                else:
-                    logging.warning(f"❌ Insufficient data for BB: need {window}, have {len(df)}")
-
-            elif indicator_name.lower() == 'macd':
-                fast = min(params.get('fast', 12), len(df)//4)
-                slow = min(params.get('slow', 26), len(df)//3)
-                signal = min(params.get('signal', 9), len(df)//5)
-
-                # Ensure we have enough data for MACD calculation
-                if len(df) >= max(fast, slow, signal) + 1:
-                    # Calculate MACD components more efficiently
-                    df[f'EMA_fast'] = df['close'].ewm(span=fast, adjust=False).mean()
-                    df[f'EMA_slow'] = df['close'].ewm(span=slow, adjust=False).mean()
-                    df['MACD_line'] = df[f'EMA_fast'] - df[f'EMA_slow']
-                    df['MACD_signal'] = df['MACD_line'].ewm(span=signal, adjust=False).mean()
-                    df['MACD_histogram'] = df['MACD_line'] - df['MACD_signal']
-
-                    # Only add if we have valid values
-                    if not df['MACD_line'].dropna().empty:
-                        # Create panel for MACD
-                        addplots.append(mpf.make_addplot(df['MACD_line'], panel=1, color='blue'))
-                        addplots.append(mpf.make_addplot(df['MACD_signal'], panel=1, color='red'))
-                        addplots.append(mpf.make_addplot(df['MACD_histogram'], panel=1, type='bar', color='green'))
-        except Exception as e:
-            logging.error(f"Error calculating indicator {indicator_name}: {str(e)}")
-            # Continue processing other indicators instead of failing completely
-
-    logging.info(f"Added {len(addplots)} indicator components to chart in {time.time() - start_time:.2f} seconds")
-    return addplots
-
-def cleanup_resources():
-    """Clean up matplotlib resources to prevent memory leaks"""
-    plt.close('all')
-    gc.collect()
-
-@app.post("/generate-chart")
-async def generate_chart(request: ChartRequest, background_tasks: BackgroundTasks):
+    name = request_transport(http_request)
+    body = await http_request.body()
+    try:
+        if name == 'json':
+            request = model.model_validate_json(body)
+        else:
+            fields, columns = transport.decode_request(body, name)
+            if columns is not None:
+                check_candle_count(columns)
+            request = model.model_validate(fields, context={'columns': columns})
+        STAGE_SECONDS.observe(time.time() - start_time, endpoint=route_path(http_request), stage="parse")
+        return request
+    except ValidationError as e:
+        raise body_error(e)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} body: {str(e)}")
+
+async def parse_candles(http_request: Request) -> Columns:
+    """Candles-only body (ColumnarOHLCV as JSON, or Arrow / MessagePack) as normalized columns"""
     start_time = time.time()
-    logging.info(f"Received chart request with {len(request.data)} data points")
-
+    name = request_transport(http_request)
+    body = await http_request.body()
     try:
-        # Add cleanup to background tasks to ensure resources are released
-        background_tasks.add_task(cleanup_resources)
-
-        # Limit data points to prevent performance issues
-        if len(request.data) > 400:  # Increased cap to 400 candles for better analysis
-            logging.warning(f"Limiting request from {len(request.data)} to 400 data points")
-            request.data = request.data[-400:]  # Use most recent 400 points
+        if name == 'json':
+            candles = ColumnarOHLCV.model_validate_json(body)
+            columns = to_columns(candles.t, candles.o, candles.h, candles.l, candles.c, candles.v)
+        else:
+            columns = transport.decode_candles(body, name)
+            check_candle_count(columns)
+        STAGE_SECONDS.observe(time.time() - start_time, endpoint=route_path(http_request), stage="parse")
+        return columns
+    except ValidationError as e:
+        raise body_error(e)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} body: {str(e)}")
+
+def body_schema(model) -> Dict[str, Any]:
+    """OpenAPI request body for endpoints that parse their own body: the JSON schema plus the binary types"""
+    binary = {"schema": {"type": "string", "format": "binary"}}
+    return {"requestBody": {"required": True, "content": {
+        transport.JSON: {"schema": model.model_json_schema()}, transport.ARROW: binary, transport.MSGPACK: binary}}}
+
+@app.post("/generate-chart", openapi_extra=body_schema(ChartRequest))
+async def generate_chart(http_request: Request, format: Optional[str] = None):
+    start_time = time.time()
+    request = await parse_body(http_request, ChartRequest)
+    logging.info(f"Received chart request with {request.describe()}")
+    image_response = wants_image(http_request, format)
 
-        # Convert data to pandas DataFrame
-        df = convert_to_dataframe(request.data)
-
-        # Check if DataFrame is not empty
-        if df.empty:
-            raise HTTPException(status_code=400, detail="Empty data provided")
-
-        logging.info(f"Data processing completed in {time.time() - start_time:.2f} seconds")
-
-        # Set up matplotlib figure with controlled dimensions
-        width = min(request.width, 1600)  # Cap width
-        height = min(request.height, 1200)  # Cap height
-        plt.figure(figsize=(width/100, height/100), dpi=100)
-
-        # Prepare chart style and kwargs
-        chart_style = 'yahoo'
-        chart_type = request.chart_type
-        volume = True
-
-        # Ensure supported chart type
-        if chart_type not in ['candle', 'line', 'ohlc', 'hollow_and_filled']:
-            chart_type = 'candle'
-
-        # Measure indicator processing time
-        indicator_start = time.time()
-
-        # Add technical indicators if specified
-        addplots = add_indicators(df, request.indicators) if request.indicators else []
-
-        # Process oscillator panels to ensure they're in separate panels
-        if request.indicators and request.separate_oscillators:
-            # First, identify all unique oscillator types in the addplots
-            oscillator_types = ['macd', 'rsi', 'atr', 'stochastic']
-            oscillator_groups = {}
-
-            # Group plots by oscillator type
-            for i, plot in enumerate(addplots):
-                plot_name = getattr(plot, 'name', '').lower()
-
-                # Skip plots that already have panel assignments
-                if hasattr(plot, 'panel') and plot.panel is not None:
-                    continue
-
-                # Find which oscillator type this plot belongs to
-                for osc_type in oscillator_types:
-                    if osc_type in plot_name:
-                        if osc_type not in oscillator_groups:
-                            oscillator_groups[osc_type] = []
-                        oscillator_groups[osc_type].append(i)
-                        break
-
-            # Now assign panels, starting from panel 2 (after volume panel)
-            panel_count = 2  # Start after volume panel (which is 1)
-
-            # Assign each oscillator type to its own panel
-            for osc_type, plot_indices in oscillator_groups.items():
-                for idx in plot_indices:
-                    addplots[idx].panel = panel_count
-                panel_count += 1  # Move to next panel for next oscillator type
-
-        logging.info(f"Indicator processing completed in {time.time() - indicator_start:.2f} seconds")
-
-        # Create a BytesIO object to save the figure
-        buf = BytesIO()
-
-        # Measure chart rendering time
-        plot_start = time.time()
-
-        # Determine if we need multi-panel display (for oscillators)
-        has_secondary_panels = False
-        oscillator_panels = 0
-        if request.indicators and addplots:
-            # Check for oscillator indicators that need separate panels
-            oscillator_indicators = ['macd', 'rsi', 'atr', 'stochastic']
-            present_oscillators = [k.lower() for k in request.indicators.keys() if k.lower() in oscillator_indicators]
-            has_secondary_panels = len(present_oscillators) > 0 or volume
-            oscillator_panels = len(present_oscillators)
-            logging.info(f"Chart has {oscillator_panels} oscillator panels: {present_oscillators}")
-
-        # Set up plot kwargs
-        plot_kwargs = {
-            'type': chart_type,
-            'style': chart_style,
-            'volume': volume,
-            'addplot': addplots,
-            'savefig': dict(fname=buf, dpi=100, bbox_inches='tight'),
-            'tight_layout': True,  # Optimize layout
-            'figsize': (width/100, height/100),
+    try:
+        profiling_spec = profiling_flag(http_request)
+        # A profiling report only fits the JSON shape
+        image_response = image_response and profiling_spec is None
+        chart, cached = await produce_chart(request, with_base64=not image_response, profiling_spec=profiling_spec)
+    except Exception as e:
+        status_code, content = error_body(e)
+        return JSONResponse(status_code=status_code, content=content)
+
+    # Return the result
+    total_time = time.time() - start_time
+    STAGE_SECONDS.observe(total_time, endpoint="/generate-chart", stage="total")
+    logging.info(f"Total chart generation completed in {total_time:.2f} seconds (cached: {cached})")
+
+    if image_response:
+        # Raw image bytes, metadata moves to response headers
+        headers = {
+            "X-Chart-Type": chart["chart_type"],
+            "X-Chart-Width": str(chart["width"]),
+            "X-Chart-Height": str(chart["height"]),
+            "X-Processing-Time": f"{total_time:.4f}",
+            "X-Chart-Cached": "true" if cached else "false",
+            "X-Image-Bytes": str(len(chart["image"])),
         }
+        if chart["encode_time"] is not None:
+            headers["X-Encode-Time"] = f"{chart['encode_time']:.4f}"
+        return Response(
+            content=chart["image"],
+            media_type=MEDIA_TYPES[chart["image_format"]],
+            headers=headers
+        )
 
-        # Always place volume in panel 1 when separate_oscillators is true
-        if volume and request.separate_oscillators:
-            plot_kwargs['volume_panel'] = 1  # Place volume in panel 1 (separate from main panel 0)
-
-        # Configure panel ratios based on number of oscillator panels
-        if request.separate_oscillators:
-            # Count how many panels we need in total
-            # Start with main price panel
-            panels_needed = 1
-
-            # Add volume panel if enabled
-            if volume:
-                panels_needed += 1
-
-            # Find the highest panel number used in addplots
-            max_panel = 0
-            for plot in addplots:
-                if hasattr(plot, 'panel') and plot.panel is not None:
-                    max_panel = max(max_panel, plot.panel)
-
-            # Total panels needed is the maximum of:
-            # 1. panels_needed calculated above
-            # 2. max_panel + 1 (since panels are 0-indexed)
-            total_panels = max(panels_needed, max_panel + 1)
-
-            # Create panel ratios array
-            # Main panel gets 4x height, other panels get 1x each
-            panel_ratios = [4]  # Main price panel
+    return chart_body(chart, cached, total_time)
 
-            # Add ratios for all other panels
-            for _ in range(1, total_panels):
-                panel_ratios.append(1)
+@app.post("/generate-charts")
+async def generate_charts(batch: BatchRequest):
+    """Render many charts in one call, streamed back as NDJSON as each one finishes.
 
-            plot_kwargs['panel_ratios'] = tuple(panel_ratios)
+    Jobs fan out across the render pool. Every job gets one line with its
+    index (and id, if given), its status code and timing, in completion
+    order; a failed job only fails its own line. A final line summarises
+    the batch.
+    """
+    start_time = time.time()
+    logging.info(f"Received batch of {len(batch.jobs)} chart requests")
 
-        # Generate the chart with controlled parameters
-        mpf.plot(df, **plot_kwargs)
+    # Keep at most one job per worker in flight, so a large batch keeps the
+    # whole pool busy without filling the render queue for other requests
+    slots = asyncio.Semaphore(render_pool.size)
 
-        logging.info(f"Chart rendering completed in {time.time() - plot_start:.2f} seconds")
+    async def run_job(index: int, raw_job: Dict[str, Any]) -> Dict[str, Any]:
+        job_start = time.time()
+        try:
+            request = BatchChartRequest.model_validate(raw_job)
+        except ValidationError as e:
+            return {"index": index, "id": raw_job.get("id"), "status": 422, "success": False,
+                    "error": e.errors(include_url=False, include_context=False, include_input=False), "detail": "Invalid chart request",
+                    "processing_time": 0.0}
+        async with slots:
+            try:
+                chart, cached = await produce_chart(request, with_base64=True, endpoint="/generate-charts")
+                body = chart_body(chart, cached, time.time() - job_start)
+                status_code = 200
+                STAGE_SECONDS.observe(time.time() - job_start, endpoint="/generate-charts", stage="total")
+            except Exception as e:
+                status_code, body = error_body(e)
+                body["processing_time"] = round(time.time() - job_start, 2)
+        return {"index": index, "id": request.id, "status": status_code, **body}
+
+    async def lines():
+        failed = 0
+        tasks = [asyncio.ensure_future(run_job(index, raw_job)) for index, raw_job in enumerate(batch.jobs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                failed += not line["success"]
+                yield json.dumps(line) + "\n"
+        finally:
+            # Client went away: don't leave renders queued for nobody. The
+            # cancel reaches each job's render unless another request shares
+            # it; one already on a worker finishes there, but every job is
+            # cancelled at once, so the batch starts no more renders
+            for task in tasks:
+                task.cancel()
+        total_time = time.time() - start_time
+        logging.info(f"Batch of {len(tasks)} charts completed in {total_time:.2f} seconds ({failed} failed)")
+        yield json.dumps({"done": True, "jobs": len(tasks), "failed": failed,
+                          "processing_time": round(total_time, 2)}) + "\n"
+
+    stream = lines()
+
+    async def close_stream():
+        # On a disconnect the stream is abandoned mid-yield; closing it runs the
+        # cleanup above now instead of whenever the generator is collected.
+        # (aclose itself isn't a coroutine function, so BackgroundTask would
+        # call it on a thread and never await it.)
+        await stream.aclose()
+
+    return StreamingResponse(stream, media_type="application/x-ndjson", background=BackgroundTask(close_stream))
+
+def indicator_format(http_request: Request, format: Optional[str]) -> Optional[str]:
+    """Output format for /indicators from ?format= or the Accept header (JSON by default); None if unsupported"""
+    if format:
+        format = format.lower()
+        return format if format in indicator_values.MEDIA_TYPES else None
+    accept = http_request.headers.get('accept', '')
+    for name, media_type in indicator_values.MEDIA_TYPES.items():
+        if media_type in accept:
+            return name
+    return 'json'
+
+@app.post("/indicators", openapi_extra=body_schema(IndicatorRequest))
+async def indicators(http_request: Request, format: Optional[str] = None):
+    """Indicator values as columnar JSON, MessagePack, an Arrow IPC stream or raw float64 arrays, without drawing a chart"""
+    start_time = time.time()
+    request = await parse_body(http_request, IndicatorRequest)
+    logging.info(f"Received indicator request with {request.describe()}")
+    output_format = indicator_format(http_request, format)
+    unavailable = indicator_values.unavailable(output_format) if output_format else f"Unsupported format: {format}"
+    if unavailable:
+        return JSONResponse(status_code=406, content={"success": False, "error": unavailable,
+                                                      "formats": list(indicator_values.MEDIA_TYPES)})
 
-        # Convert the plot to a base64 string
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode()
+    try:
+        columns = request.columns()
+        # No matplotlib involved, so this runs in a thread rather than a render worker
+        body, names, timings = await asyncio.to_thread(indicator_values.indicator_output, columns,
+                                                       request.indicators, output_format)
+    except Exception as e:
+        status_code, content = error_body(e)
+        return JSONResponse(status_code=status_code, content=content)
+
+    total_time = time.time() - start_time
+    INDICATOR_REQUESTS.inc(indicators=indicator_set(request.indicators), format=output_format)
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, endpoint="/indicators", stage=stage)
+    STAGE_SECONDS.observe(total_time, endpoint="/indicators", stage="total")
+    logging.info(f"Computed {len(names) - 1} indicator columns for {len(columns['t'])} candles in {total_time:.3f} seconds")
+    return Response(content=body, media_type=indicator_values.MEDIA_TYPES[output_format], headers={
+        "X-Columns": ",".join(names),
+        "X-Rows": str(len(columns['t'])),
+        "X-Processing-Time": f"{total_time:.4f}",
+    })
+
+@app.post("/series", openapi_extra=body_schema(ColumnarOHLCV))
+async def upload_series(http_request: Request):
+    """Store a fine-grained OHLCV series once; charts then request any coarser timeframe of it"""
+    columns = await parse_candles(http_request)
+    try:
+        stored_id = series_store.put(columns)
+    except (ResampleError, ValueError) as e:
+        return JSONResponse(status_code=400, content={"success": False, "error": str(e)})
+    step = interval(columns)
+    return {
+        "success": True,
+        "series_id": stored_id,
+        "candles": len(columns['t']),
+        "interval_ms": step,
+        "start": int(columns['t'][0]) if len(columns['t']) else None,
+        "end": int(columns['t'][-1]) if len(columns['t']) else None,
+    }
 
-        # Close plot to free memory right away
-        plt.close('all')
+@app.put("/candles/{symbol}/{timeframe}", openapi_extra=body_schema(ColumnarOHLCV))
+async def put_candles(symbol: str, timeframe: str, http_request: Request):
+    """Append new bars to a symbol's stored candles and overwrite bars already stored (e.g. the forming bar)"""
+    try:
+        timeframe_ms(timeframe)
+    except ResampleError as e:
+        return JSONResponse(status_code=400, content={"success": False, "error": str(e)})
+    columns = await parse_candles(http_request)
+    result = candle_store.upsert(symbol, timeframe, columns)
+    return {"success": True, "symbol": symbol, "timeframe": timeframe, **result}
+
+@app.delete("/candles/{symbol}/{timeframe}")
+async def delete_candles(symbol: str, timeframe: str):
+    """Drop a symbol's stored candles"""
+    if not candle_store.delete(symbol, timeframe):
+        return JSONResponse(status_code=404, content={"success": False, "error": f"No candles stored for {symbol} {timeframe}"})
+    return {"success": True}
+
+@app.post("/styles")
+async def register_style(registration: StyleRegistration):
+    """Register a custom theme once; charts then reference it by the returned ID"""
+    definition = registration.definition.model_dump(exclude_none=True)
+    try:
+        style_id = chart_styles.register_style(definition, registration.id)
+    except chart_styles.StyleError as e:
+        return JSONResponse(status_code=400, content={"success": False, "error": str(e)})
+    return {"success": True, "style_id": style_id}
 
-        # Return the result
-        total_time = time.time() - start_time
-        logging.info(f"Total chart generation completed in {total_time:.2f} seconds")
-
-        return {
-            "success": True,
-            "chart_image": img_base64,
-            "chart_type": chart_type,
-            "width": width,
-            "height": height,
-            "processing_time": round(total_time, 2)
-        }
-    except Exception as e:
-        # Log the full exception with traceback
-        logging.error(f"Error generating chart: {str(e)}")
-        logging.error(traceback.format_exc())
-
-        # Always close plots in case of error
-        plt.close('all')
-
-        # Return a proper error response
-        return JSONResponse(
-            status_code=500,
-            content={
-                "success": False,
-                "error": str(e),
-                "detail": "Chart generation failed"
-            }
-        )
+@app.get("/styles")
+async def list_styles():
+    """Builtin theme names and registered theme IDs"""
+    return {"styles": chart_styles.list_styles()}
 
 @app.get("/")
 async def root():
     return {
         "message": "Trade Tracker Chart Engine API",
         "status": "running",
-        "memory_usage": f"{gc.collect()} objects collected"
+        "memory_usage": render_pool.memory.get("api_rss_bytes")
     }
 
 @app.get("/ping")
@@ -449,7 +770,7 @@ async def chart_status():
         "engine": "mplfinance",
         "version": "1.0.0",
         "uptime": time.time() - START_TIME,
-        "memory_collected": gc.collect()
+        "rss_bytes": render_pool.memory.get("api_rss_bytes")
     }
 
 @app.get("/health")
@@ -464,16 +785,25 @@ async def health():
 @app.get("/stats")
 async def stats():
     """Return some basic stats about the chart engine"""
-    gc.collect()  # Run garbage collection
     return {
         "status": "running",
         "uptime": time.time() - START_TIME,
         "python_version": os.sys.version,
         "matplotlib_version": matplotlib.__version__,
         "mplfinance_version": mpf.__version__,
-        "memory_info": "Memory stats collection not available"
+        "memory_info": render_pool.memory,
+        "render_pool": render_pool.stats(),
+        "render_cache": render_cache.stats(),
+        "render_flights": render_flights.stats(),
+        "series_store": series_store.stats(),
+        "candle_store": candle_store.stats()
     }
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 # Track server start time
 START_TIME = time.time()
 
@@ -494,6 +824,6 @@ if __name__ == "__main__":
         host=host,
         port=port,
         reload=False,  # Disable auto-reload for production
-        workers=1,  # Use only 1 worker due to matplotlib limitations
+        workers=1,  # Single API process; rendering is parallelised by the render pool
         timeout_keep_alive=30  # Reduce keep-alive time
     )
@@ -0,0 +1,179 @@
+"""
+Prometheus metrics for the chart engine.
+A small in-process implementation of counters, gauges and histograms,
+rendered in the Prometheus text exposition format (version 0.0.4) by the
+/metrics endpoint; no client library needed.
+
+Metrics are recorded in the API process. Per-stage render timings come back
+from the render workers with each result, and worker memory is read from
+/proc when scraped.
+"""
+import math
+import os
+from abc import ABC, abstractmethod
+import resource
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from a cached response to a slow archive render
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+class Metric(ABC):
+    """A metric family: name, help text and optional label names"""
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterable[Sample]:
+        """(sample name, labels, value) for every series in the family"""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples():
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text
+                         else f"{name} {_format_value(value)}")
+        return lines
+
+class _Value(Metric):
+    """One number per label set, kept here or read from a callback at scrape time.
+
+    The callback returns a number, or for labelled metrics a mapping of label
+    value tuples to numbers; it exports values other components already count.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], object]] = None):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._callback = callback
+
+    def samples(self) -> Iterable[Sample]:
+        if self._callback is not None:
+            value = self._callback()
+            values = value if isinstance(value, dict) else {(): value}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in values.items():
+            if value is not None:
+                yield self.name, dict(zip(self.labelnames, key)), value
+
+class Counter(_Value):
+    """Monotonically increasing count"""
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Value):
+    """Value that goes up and down"""
+    type = 'gauge'
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, plus their sum and count"""
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum)
+        self._values: Dict[Labels, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, 'le': _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+class Registry:
+    """The metrics exposed by /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+def counter(name: str, help: str, labelnames: Sequence[str] = (), callback=None) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames, callback))
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = (), callback=None) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, labelnames, callback))
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+def process_rss(pid: Optional[int] = None) -> Optional[int]:
+    """Resident set size of a process in bytes (this one by default); None if unavailable"""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        if pid is None:
+            # No procfs (e.g. macOS): peak RSS is the best available
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if os.uname().sysname == 'Darwin' else peak * 1024
+        return None
@@ -0,0 +1,84 @@
+"""
+Named output profiles for rendered charts.
+A profile fixes the pixel budget, the DPI the chart is drawn at, palette
+quantization, PNG compression and the image format. Charts rendered with a
+profile are drawn to an RGBA buffer first and encoded afterwards, so
+encoding is measured on its own and never holds a figure.
+"""
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, features
+
+MEDIA_TYPES = {'png': 'image/png', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+@dataclass(frozen=True)
+class OutputProfile:
+    """How a chart is sized and encoded.
+
+    Requested sizes are layout pixels at 100 dpi; the output is that size
+    scaled by dpi / 100 (larger fonts and lines, same layout), then fitted
+    into the pixel budget keeping the aspect ratio.
+    """
+    name: str
+    max_width: int
+    max_height: int
+    max_pixels: Optional[int] = None
+    dpi: int = 100
+    colors: Optional[int] = None  # quantize PNGs to an indexed palette of this many colours
+    compress_level: int = 6  # zlib level for PNG
+    format: str = 'png'
+    quality: int = 90  # JPEG quality, and WebP quality when not lossless
+    lossless: bool = True  # WebP
+
+    def size(self, width: int, height: int) -> Tuple[int, int]:
+        """Output pixel size for a requested (100 dpi) size"""
+        width, height = width * self.dpi / 100, height * self.dpi / 100
+        scale = min(1.0, self.max_width / width, self.max_height / height)
+        if self.max_pixels:
+            scale = min(scale, (self.max_pixels / (width * height)) ** 0.5)
+        return max(int(width * scale), 1), max(int(height * scale), 1)
+
+PROFILES: Dict[str, OutputProfile] = {
+    # Small indexed PNGs sized for vision models, which downscale larger images anyway
+    'llm-compact': OutputProfile('llm-compact', 1568, 1568, max_pixels=1_150_000, colors=64, compress_level=6),
+    # Full colour, fast to encode, for interactive dashboards
+    'dashboard': OutputProfile('dashboard', 1600, 1200, compress_level=1),
+    # Double resolution, smallest lossless PNG
+    'archive': OutputProfile('archive', 4000, 4000, dpi=200, compress_level=9),
+}
+
+def get_profile(name: str) -> OutputProfile:
+    """Look up a profile by name, raising ValueError for unknown names"""
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown output profile: {name}") from None
+
+def encode(image: Image.Image, profile: OutputProfile, image_format: Optional[str] = None) -> bytes:
+    """Encode a drawn chart (RGB, RGBA or palette image) as the profile says.
+
+    image_format overrides the profile's format.
+    """
+    image_format = image_format or profile.format
+    if image_format not in MEDIA_TYPES:
+        raise ValueError(f"Unsupported image format: {image_format}")
+    if image_format == 'webp' and not features.check('webp'):
+        raise ValueError("WebP output needs Pillow built with libwebp")
+
+    # Charts are opaque, so drop the alpha channel before anything else
+    if image.mode == 'RGBA':
+        image = image.convert('RGB')
+
+    buf = BytesIO()
+    if image_format == 'png':
+        if profile.colors and image.mode != 'P':
+            # No dithering: charts are flat colours, and dither noise only costs bytes
+            image = image.quantize(profile.colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        image.save(buf, format='PNG', compress_level=profile.compress_level)
+    elif image_format == 'webp':
+        image.convert('RGB').save(buf, format='WEBP', lossless=profile.lossless, quality=profile.quality)
+    else:
+        image.convert('RGB').save(buf, format='JPEG', quality=profile.quality)
+    return buf.getvalue()
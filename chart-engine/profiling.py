@@ -0,0 +1,138 @@
+"""
+Opt-in per-request render profiling.
+With CHART_ENGINE_PROFILING=1, a chart request carrying ?profiling=top or
+?profiling=collapsed (or an X-Chart-Profiling header) is rendered under a
+profiler in its worker, and the response includes the breakdown:
+
+- top: cProfile of the whole render (DataFrame conversion, indicators,
+  panel assignment, mpf.plot and encoding), the N functions with the most
+  self time.
+- collapsed: a stack sampler's output in collapsed-stack format
+  ("outer;inner;leaf count" per line), ready for flamegraph.pl or speedscope.
+
+Requests without the flag take the normal path; the renderer only checks
+the job for a profiling spec.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+ENABLED = os.getenv("CHART_ENGINE_PROFILING", "").lower() in ("1", "true", "yes")
+MODES = ("top", "collapsed")
+DEFAULT_TOP = 30
+MAX_TOP = 500
+SAMPLE_INTERVAL = 0.001  # seconds between stack samples
+
+class ProfilingError(ValueError):
+    """Raised for a profiling flag that can't be honoured"""
+    pass
+
+def profiling_spec(mode: Optional[str], top: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Profiling settings for a request's flag, or None for an unprofiled request"""
+    if not mode:
+        return None
+    if not ENABLED:
+        raise ProfilingError("Profiling is disabled; set CHART_ENGINE_PROFILING=1 to enable it")
+    if mode not in MODES:
+        raise ProfilingError(f"Unknown profiling mode: {mode}. Use one of: {', '.join(MODES)}")
+    try:
+        top_n = int(top) if top else DEFAULT_TOP
+    except ValueError:
+        raise ProfilingError(f"Invalid profiling_top: {top}")
+    return {"mode": mode, "top": max(1, min(top_n, MAX_TOP))}
+
+def _short_path(filename: str) -> str:
+    # Short but unambiguous: relative to site-packages, else the file name
+    head, sep, tail = filename.rpartition('site-packages' + os.sep)
+    return tail if sep else os.path.basename(filename)
+
+def _location(filename: str, line: int, name: str) -> str:
+    if filename == '~':
+        return name  # builtins, e.g. <method 'sort' of 'list' objects>
+    return f"{_short_path(filename)}:{line}({name})"
+
+def top_functions(profiler: cProfile.Profile, top: int) -> Dict[str, Any]:
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+    return {
+        "mode": "top",
+        "sort": "self_time",
+        "total_calls": stats.total_calls,
+        "total_time": round(stats.total_tt, 6),
+        "functions": [
+            {
+                "function": _location(*func),
+                "calls": calls,
+                "primitive_calls": primitive_calls,
+                "self_time": round(self_time, 6),
+                "cumulative_time": round(cumulative_time, 6),
+            }
+            for func, (primitive_calls, calls, self_time, cumulative_time, _) in rows
+        ],
+    }
+
+class StackSampler:
+    """Samples the calling thread's Python stack from a background thread"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def __enter__(self) -> 'StackSampler':
+        # The sampler needs the GIL to take a sample; a shorter switch interval
+        # lets it in about as often as it asks
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(self.interval)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def collapsed(self) -> str:
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+def profile_call(fn: Callable[[], Any], mode: str, top: int = DEFAULT_TOP) -> Tuple[Any, Dict[str, Any]]:
+    """Call fn() under the profiler for mode; returns its result and the profile"""
+    if mode == "collapsed":
+        start = time.perf_counter()
+        with StackSampler() as sampler:
+            result = fn()
+        return result, {
+            "mode": "collapsed",
+            "interval_ms": sampler.interval * 1000,
+            "samples": sampler.samples,
+            "wall_time": round(time.perf_counter() - start, 6),
+            "collapsed": sampler.collapsed(),
+        }
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn()
+    finally:
+        profiler.disable()
+    return result, top_functions(profiler, top)
@@ -0,0 +1,321 @@
+"""
+Direct raster chart renderer.
+Draws candles, volume, indicator lines and oscillator panels straight onto a
+palette image instead of going through mplfinance, whose per-call figure, axes,
+style and addplot setup dominates render time for typical 400-candle charts.
+Axis-aligned shapes (panels, grid, candles, bars) are filled into a NumPy
+pixel array with pixel coordinates computed for all candles at once; indicator
+lines and text are then drawn with Pillow, one call per line segment run.
+Layout follows the mplfinance path: price panel on top, then volume, then one
+panel per oscillator, with height ratios 4:1:1...
+"""
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from indicator_registry import IndicatorSpec, assign_panels
+
+# Colours of the mplfinance 'yahoo' style used by the default renderer
+BACKGROUND = '#ffffff'
+PANEL_FACE = '#fafafa'
+GRID = '#e4e4e4'
+AXIS = '#a0a0a0'
+TEXT = '#404040'
+UP = '#00b060'
+DOWN = '#fe3032'
+WICK = '#606060'
+VOLUME_UP = '#4dc790'
+VOLUME_DOWN = '#fd6b6c'
+
+RIGHT_MARGIN = 64  # price labels
+BOTTOM_MARGIN = 22  # time labels
+OUTER_MARGIN = 8
+PANEL_GAP = 6
+
+_FONT = None
+
+def _font() -> ImageFont.ImageFont:
+    global _FONT
+    if _FONT is None:
+        _FONT = ImageFont.load_default()
+    return _FONT
+
+class Canvas:
+    """8-bit palette pixels plus the colour -> palette index mapping"""
+
+    def __init__(self, width: int, height: int, background: str):
+        self.width = width
+        self.height = height
+        self._inks: Dict[str, int] = {}
+        self._rgb: List[int] = []
+        self.pixels = np.full((height, width), self.ink(background), dtype=np.uint8)
+
+    def ink(self, color: str) -> int:
+        """Palette index of a colour, allocating it on first use"""
+        index = self._inks.get(color)
+        if index is None:
+            index = len(self._inks)
+            if index > 255:
+                raise ValueError("Too many distinct colours for a palette image")
+            self._inks[color] = index
+            self._rgb.extend(ImageColor.getrgb(color)[:3])
+        return index
+
+    def palette(self) -> List[int]:
+        return list(self._rgb)
+
+    def fill_rects(self, x0, y0, x1, y1, inks):
+        """Fill inclusive pixel rectangles, clipped to the canvas"""
+        x0 = np.clip(np.floor(x0), 0, self.width - 1).astype(np.intp)
+        x1 = np.clip(np.floor(x1), 0, self.width - 1).astype(np.intp) + 1
+        y0 = np.clip(np.floor(y0), 0, self.height - 1).astype(np.intp)
+        y1 = np.clip(np.floor(y1), 0, self.height - 1).astype(np.intp) + 1
+        inks = np.broadcast_to(np.asarray(inks, dtype=np.uint8), x0.shape)
+        pixels = self.pixels
+        for a, b, c, d, ink in zip(y0.tolist(), y1.tolist(), x0.tolist(), x1.tolist(), inks.tolist()):
+            pixels[a:b, c:d] = ink
+
+class Panel:
+    """A horizontal strip of the chart with its own vertical value scale"""
+
+    def __init__(self, top: int, bottom: int, low: float, high: float):
+        self.top = top
+        self.bottom = bottom
+        if not np.isfinite(low) or not np.isfinite(high):
+            low, high = 0.0, 1.0
+        if high <= low:
+            pad = abs(high) * 0.01 or 1.0
+            low, high = low - pad, high + pad
+        # A little headroom so extremes do not touch the panel edges
+        pad = (high - low) * 0.05
+        self.low = low - pad
+        self.high = high + pad
+
+    def y(self, values) -> np.ndarray:
+        """Pixel rows for values (NaN stays NaN)"""
+        scale = (self.bottom - self.top) / (self.high - self.low)
+        return self.bottom - (np.asarray(values, dtype=np.float64) - self.low) * scale
+
+def _nice_ticks(low: float, high: float, count: int = 5) -> np.ndarray:
+    """Round tick values covering [low, high]"""
+    span = high - low
+    if span <= 0 or not np.isfinite(span):
+        return np.array([])
+    raw = span / count
+    magnitude = 10 ** np.floor(np.log10(raw))
+    step = magnitude * min((m for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw), default=10)
+    # + 0.0 turns -0.0 into 0.0 so it is not labelled "-0"
+    return np.arange(np.ceil(low / step) * step, high, step) + 0.0
+
+def _format_value(value: float, step: float) -> str:
+    if abs(value) >= 1e6:
+        return f"{value / 1e6:.1f}M"
+    if abs(value) >= 1e4:
+        return f"{value / 1e3:.0f}k"
+    decimals = max(0, int(-np.floor(np.log10(step))) + 1) if step < 1 else 0
+    return f"{value:.{decimals}f}"
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """[start, end) index ranges where mask is True"""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+def _polyline(draw: ImageDraw.ImageDraw, x: np.ndarray, y: np.ndarray, ink: int, width: float, linestyle: str = '-'):
+    """Draw a line through the finite points, breaking it at NaN gaps"""
+    width = max(1, int(round(width)))
+    for start, end in _runs(np.isfinite(y)):
+        points = np.column_stack((x[start:end], y[start:end]))
+        if linestyle == '-':
+            if len(points) > 1:
+                draw.line(points.ravel().tolist(), fill=ink, width=width, joint='curve' if width > 1 else None)
+            else:
+                draw.point(points.ravel().tolist(), fill=ink)
+            continue
+        # Dashed: alternate drawn and skipped segments
+        for i in range(0, len(points) - 1, 2):
+            draw.line(points[i:i + 2].ravel().tolist(), fill=ink, width=width)
+
+def _draw_panel_frame(canvas: Canvas, panel: Panel, left: int, right: int, ticks: np.ndarray):
+    canvas.fill_rects(np.array([left]), np.array([panel.top]), np.array([right]), np.array([panel.bottom]),
+                      canvas.ink(AXIS))
+    canvas.fill_rects(np.array([left + 1]), np.array([panel.top + 1]), np.array([right - 1]),
+                      np.array([panel.bottom - 1]), canvas.ink(PANEL_FACE))
+    rows = panel.y(ticks)
+    canvas.fill_rects(np.full(len(rows), left + 1), rows, np.full(len(rows), right - 1), rows, canvas.ink(GRID))
+
+def _draw_panel_labels(draw: ImageDraw.ImageDraw, ink: int, panel: Panel, left: int, right: int,
+                       ticks: np.ndarray, label: Optional[str]):
+    step = ticks[1] - ticks[0] if len(ticks) > 1 else 1.0
+    font = _font()
+    for value, row in zip(ticks.tolist(), panel.y(ticks).tolist()):
+        draw.text((right + 4, row - 5), _format_value(value, step), fill=ink, font=font)
+    if label:
+        draw.text((left + 4, panel.top + 2), label, fill=ink, font=font)
+
+def _time_labels(index: pd.Index) -> Tuple[np.ndarray, List[str]]:
+    """Positions and texts of up to six evenly spaced time labels"""
+    n = len(index)
+    if n == 0:
+        return np.array([], dtype=int), []
+    positions = np.linspace(0, n - 1, min(6, n)).round().astype(int)
+    is_dates = isinstance(index, pd.DatetimeIndex)
+    fmt = '%b %d' if is_dates and (index[-1] - index[0]) > pd.Timedelta(days=10) else '%b %d %H:%M'
+    texts = [index[i].strftime(fmt) if is_dates else str(index[i]) for i in positions]
+    return positions, texts
+
+def _draw_candles(canvas: Canvas, x: np.ndarray, half: float, panel: Panel, df: pd.DataFrame, chart_type: str):
+    open_, high, low, close = (df[c].to_numpy(dtype=np.float64) for c in ('open', 'high', 'low', 'close'))
+    up = close >= open_
+    inks = np.where(up, canvas.ink(UP), canvas.ink(DOWN)).astype(np.uint8)
+    y_open, y_high, y_low, y_close = panel.y(open_), panel.y(high), panel.y(low), panel.y(close)
+
+    if chart_type == 'ohlc':
+        canvas.fill_rects(x, y_high, x, y_low, inks)
+        canvas.fill_rects(x - half, y_open, x, y_open, inks)
+        canvas.fill_rects(x, y_close, x + half, y_close, inks)
+        return
+
+    canvas.fill_rects(x, y_high, x, y_low, canvas.ink(WICK))
+    body_top = np.minimum(y_open, y_close)
+    body_bottom = np.maximum(y_open, y_close)
+    canvas.fill_rects(x - half, body_top, x + half, body_bottom, inks)
+    if chart_type == 'hollow_and_filled' and half >= 1.5:
+        # Hollow rising candles: clear the inside of their bodies
+        hollow = up & (body_bottom - body_top >= 2)
+        canvas.fill_rects(x[hollow] - half + 1, body_top[hollow] + 1, x[hollow] + half - 1,
+                          body_bottom[hollow] - 1, canvas.ink(PANEL_FACE))
+
+def _draw_bars(canvas: Canvas, x: np.ndarray, half: float, panel: Panel, values: np.ndarray, inks: np.ndarray):
+    zero = panel.y(0.0)
+    rows = panel.y(values)
+    finite = np.isfinite(rows)
+    rows = rows[finite]
+    canvas.fill_rects(x[finite] - half, np.minimum(rows, zero), x[finite] + half, np.maximum(rows, zero),
+                      np.asarray(inks)[finite])
+
+def _value_range(arrays: List[np.ndarray]) -> Tuple[float, float]:
+    finite = [a[np.isfinite(a)] for a in arrays]
+    finite = [a for a in finite if a.size]
+    if not finite:
+        return 0.0, 1.0
+    return min(a.min() for a in finite), max(a.max() for a in finite)
+
+def draw_raster(df: pd.DataFrame, computed: List[Tuple[IndicatorSpec, Dict[str, str], Dict[str, Any]]],
+                width: int, height: int, chart_type: str = 'candle', volume: bool = True,
+                separate_oscillators: bool = True) -> Image.Image:
+    """Draw the chart into a palette image.
+
+    computed holds (spec, columns, raw request params) per indicator, with the
+    columns already present in df, as for indicator_plots.build_addplots.
+    """
+    n = len(df)
+    specs = [spec for spec, _, _ in computed]
+    first_oscillator = 2 if volume else 1
+    oscillator_panel_numbers = assign_panels(specs, first_oscillator, separate_oscillators)
+    panel_count = max(list(oscillator_panel_numbers.values()) + [first_oscillator - 1]) + 1
+
+    # Panel geometry: price 4x, every other panel 1x
+    left = OUTER_MARGIN
+    right = width - RIGHT_MARGIN
+    ratios = np.array([4] + [1] * (panel_count - 1), dtype=np.float64)
+    usable = height - OUTER_MARGIN - BOTTOM_MARGIN - PANEL_GAP * (panel_count - 1)
+    edges = OUTER_MARGIN + np.concatenate(([0], np.cumsum(ratios / ratios.sum() * usable)))
+    bounds = [(int(edges[i]) + PANEL_GAP * i, int(edges[i + 1]) + PANEL_GAP * i) for i in range(panel_count)]
+
+    # Candle slots across the plot width
+    slot = (right - left) / max(n, 1)
+    x = left + (np.arange(n) + 0.5) * slot
+    half = slot * 0.35
+
+    # Collect what goes on each panel
+    lines_by_panel: Dict[int, List[Tuple[Any, np.ndarray, str]]] = {i: [] for i in range(panel_count)}
+    levels_by_panel: Dict[int, List[Tuple[float, str]]] = {i: [] for i in range(panel_count)}
+    labels: Dict[int, str] = {1: 'Volume'} if volume else {}
+    for spec, columns, raw_params in computed:
+        number = 0 if spec.is_overlay else oscillator_panel_numbers[spec.panel]
+        for position, line in enumerate(spec.plots):
+            values = df[columns[line.output]].to_numpy(dtype=np.float64)
+            color = raw_params.get('color', line.color) if position == 0 else line.color
+            lines_by_panel[number].append((line, values, color))
+            if line.ylabel and number not in labels and not spec.is_overlay:
+                labels[number] = line.ylabel
+        levels_by_panel[number].extend(spec.levels)
+
+    # Scale every panel to its content
+    prices = [df['high'].to_numpy(dtype=np.float64), df['low'].to_numpy(dtype=np.float64)]
+    panels = {0: Panel(*bounds[0], *_value_range(prices + [v for _, v, _ in lines_by_panel[0]]))}
+    volumes = df['volume'].to_numpy(dtype=np.float64)
+    if volume:
+        panels[1] = Panel(*bounds[1], 0.0, float(np.nanmax(volumes)) if n else 1.0)
+    for number in range(first_oscillator, panel_count):
+        levels = np.array([level for level, _ in levels_by_panel[number]], dtype=np.float64)
+        panels[number] = Panel(*bounds[number], *_value_range([v for _, v, _ in lines_by_panel[number]] + [levels]))
+    ticks = {number: _nice_ticks(panel.low, panel.high, 4 if panel.bottom - panel.top > 120 else 2)
+             for number, panel in panels.items()}
+    positions, time_texts = _time_labels(df.index)
+
+    # Axis-aligned layer: panels, grid, volume, histograms, candles
+    canvas = Canvas(width, height, BACKGROUND)
+    for number, panel in panels.items():
+        _draw_panel_frame(canvas, panel, left, right, ticks[number])
+        grid_x = x[positions]
+        canvas.fill_rects(grid_x, np.full(len(grid_x), panel.top + 1), grid_x,
+                          np.full(len(grid_x), panel.bottom - 1), canvas.ink(GRID))
+
+    up = df['close'].to_numpy() >= df['open'].to_numpy()
+    if volume:
+        _draw_bars(canvas, x, half, panels[1], volumes,
+                   np.where(up, canvas.ink(VOLUME_UP), canvas.ink(VOLUME_DOWN)).astype(np.uint8))
+    for number, panel in panels.items():
+        for line, values, _ in lines_by_panel[number]:
+            if line.kind == 'histogram':
+                _draw_bars(canvas, x, half, panel, values,
+                           np.where(values > 0, canvas.ink(VOLUME_UP), canvas.ink(VOLUME_DOWN)).astype(np.uint8))
+    if chart_type != 'line':
+        _draw_candles(canvas, x, half, panels[0], df, chart_type)
+
+    # Line layer: price line, indicator lines, reference levels and text
+    image = Image.fromarray(canvas.pixels, mode='P')
+    draw = ImageDraw.Draw(image)
+    if chart_type == 'line':
+        _polyline(draw, x, panels[0].y(df['close'].to_numpy(dtype=np.float64)), canvas.ink(UP), 1.5)
+    text_ink = canvas.ink(TEXT)
+    for number, panel in panels.items():
+        for level, color in levels_by_panel[number]:
+            xs = np.arange(left + 1, right - 1, 4, dtype=np.float64)
+            _polyline(draw, xs, panel.y(np.full(len(xs), level)), canvas.ink(color), 1, '--')
+        for line, values, color in lines_by_panel[number]:
+            rows = panel.y(values)
+            ink = canvas.ink(color)
+            if line.kind == 'scatter':
+                for i in np.flatnonzero(np.isfinite(rows)).tolist():
+                    draw.ellipse((x[i] - 1.5, rows[i] - 1.5, x[i] + 1.5, rows[i] + 1.5), fill=ink)
+            elif line.kind != 'histogram':
+                _polyline(draw, x, rows, ink, line.width, line.linestyle)
+        _draw_panel_labels(draw, text_ink, panel, left, right, ticks[number], labels.get(number))
+
+    font = _font()
+    bottom = bounds[-1][1]
+    for i, text in zip(positions.tolist(), time_texts):
+        text_width = draw.textlength(text, font=font)
+        draw.text((min(max(x[i] - text_width / 2, 0), width - text_width), bottom + 5), text, fill=text_ink, font=font)
+
+    # Set the palette last: line and text colours may have been allocated above
+    image.putpalette(canvas.palette())
+    return image
+
+def render_raster(df: pd.DataFrame, computed: List[Tuple[IndicatorSpec, Dict[str, str], Dict[str, Any]]],
+                  width: int, height: int, chart_type: str = 'candle', volume: bool = True,
+                  separate_oscillators: bool = True) -> bytes:
+    """Render the chart to PNG bytes (see draw_raster)"""
+    return encode_raster(draw_raster(df, computed, width, height, chart_type, volume, separate_oscillators))
+
+def encode_raster(image: Image.Image) -> bytes:
+    """Encode a drawn raster chart as a palette PNG"""
+    buf = BytesIO()
+    image.save(buf, format='PNG', compress_level=1)
+    return buf.getvalue()
@@ -0,0 +1,96 @@
+"""
+Content-addressed cache for rendered charts.
+Identical chart requests (same candles, indicators and size) hash to the same
+key, so repeat requests within the TTL are served without re-rendering.
+Entries are evicted least-recently-used once the byte budget is exceeded.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+def request_key(job: Dict[str, Any]) -> str:
+    """Hash a normalized chart request.
+
+    The job is the validated request model dumped to a dict, so defaults are
+    filled in and numbers are already parsed. Keys are sorted, so field and
+    option order don't change the key; only the order of the indicators is
+    kept, because it decides panel order in the rendered chart.
+    """
+    if isinstance(job.get('indicators'), dict):
+        job = {**job, 'indicators': list(job['indicators'].items())}
+    payload = json.dumps(job, separators=(',', ':'), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class RenderCache:
+    """LRU cache of rendered charts with byte-size and TTL limits"""
+
+    def __init__(self, max_bytes: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("CHART_ENGINE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+        self.ttl = ttl if ttl is not None else float(os.getenv("CHART_ENGINE_CACHE_TTL", 60))
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl > 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if time.monotonic() - entry["stored_at"] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["value"]
+
+    def put(self, key: str, value: Dict[str, Any], size: int):
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {"value": value, "size": size, "stored_at": time.monotonic()}
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,277 @@
+"""
+Managed pool of chart render worker processes.
+Each worker is a separate process with its own matplotlib state, so renders run
+in parallel and never block the API event loop. Jobs wait in a bounded queue
+until a worker is free; once the queue is full new jobs are rejected.
+
+Workers are recycled (replaced by a fresh process) after a number of jobs, or
+once their RSS or live matplotlib figure count passes a limit, so leaks in
+the rendering stack cannot grow without bound. A worker is only checked, and
+recycled, after its job has finished and before it takes another one; one
+worker is recycled at a time so the rest keep serving. A watchdog task
+samples the RSS of the API process and every worker for the health endpoints.
+"""
+import os
+import asyncio
+import logging
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+from chart_renderer import init_worker, warm_up
+
+MIB = 1024 * 1024
+
+class RenderQueueFull(Exception):
+    """Raised when the render queue is at capacity"""
+    pass
+
+class RenderWorker:
+    """A single render process. Runs one job at a time."""
+
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.jobs_completed = 0
+        self.figures: Optional[int] = None  # live figures after the latest render
+        self.rss: Optional[int] = None  # bytes, as last sampled
+        # Reported by the process itself (warm-up and every render), so it is
+        # None from a restart until the new process has run a job
+        self.pid: Optional[int] = None
+        self._executor = self._create_executor()
+
+    @staticmethod
+    def _create_executor() -> ProcessPoolExecutor:
+        # Spawn (not fork) so no pyplot state is inherited from the API process
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+        )
+
+    async def warm_up(self):
+        """Start the process and import its rendering stack"""
+        self.pid = await self.run(warm_up)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        restarted = False
+        try:
+            result = await asyncio.wrap_future(self._executor.submit(fn, *args))
+        except BrokenProcessPool:
+            logging.error(f"Render worker {self.worker_id} died, restarting it")
+            self.restart()
+            restarted = True
+            raise
+        finally:
+            # A failing job counts too: leaks on an error path are what
+            # recycling after max_jobs is for
+            if not restarted:
+                self.jobs_completed += 1
+        if isinstance(result, dict) and "worker" in result:
+            self.pid = result["worker"]["pid"]
+            self.figures = result["worker"]["figures"]
+        return result
+
+    def sample_rss(self) -> Optional[int]:
+        pid = self.pid
+        self.rss = metrics.process_rss(pid) if pid is not None else None
+        return self.rss
+
+    async def recycle(self):
+        """Replace the process with a fresh, warmed-up one.
+
+        Only called for a worker with no job running, so nothing is cancelled.
+        """
+        old_executor = self._executor
+        self._executor = self._create_executor()
+        self.jobs_completed = 0
+        self.figures = None
+        self.rss = None
+        self.pid = None
+        await asyncio.to_thread(old_executor.shutdown, wait=True)
+        await self.warm_up()
+
+    def restart(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._create_executor()
+        self.jobs_completed = 0
+        self.figures = None
+        self.rss = None
+        self.pid = None
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+class RenderPool:
+    """Dispatches render jobs to a fixed set of worker processes"""
+
+    def __init__(self, size: Optional[int] = None, queue_size: Optional[int] = None):
+        self.size = size if size is not None else int(os.getenv("CHART_ENGINE_WORKERS", os.cpu_count() or 1))
+        # Jobs allowed to wait for a busy pool; 0 rejects any job no worker is free for
+        self.queue_size = queue_size if queue_size is not None else int(os.getenv("CHART_ENGINE_QUEUE_SIZE", 32))
+        if self.size < 1 or self.queue_size < 0:
+            raise ValueError(f"Invalid render pool size {self.size} / queue size {self.queue_size}")
+        self._workers: List[RenderWorker] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._waiting = 0
+        self._in_flight = 0
+        # Recycling limits; 0 disables one
+        self.max_jobs = int(os.getenv("CHART_ENGINE_WORKER_MAX_JOBS", 1000))
+        self.max_rss = int(os.getenv("CHART_ENGINE_WORKER_MAX_RSS_MB", 1024)) * MIB
+        self.max_figures = int(os.getenv("CHART_ENGINE_WORKER_MAX_FIGURES", 32))
+        self.watchdog_interval = float(os.getenv("CHART_ENGINE_WATCHDOG_INTERVAL", 5))
+        self.recycled = 0
+        self._recycling: Optional[asyncio.Task] = None
+        self._watchdog: Optional[asyncio.Task] = None
+        # Latest watchdog sample, served as-is by the health endpoints
+        self.memory: dict = {}
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a free worker"""
+        return self._waiting
+
+    @property
+    def in_flight(self) -> int:
+        """Number of jobs currently rendering"""
+        return self._in_flight
+
+    async def start(self):
+        logging.info(f"Starting render pool with {self.size} workers (queue size {self.queue_size})")
+        self._idle = asyncio.Queue()
+        self._workers = [RenderWorker(i) for i in range(self.size)]
+
+        # Import the rendering stack in every worker up front so the first
+        # real chart does not pay for interpreter and matplotlib startup
+        await asyncio.gather(*(worker.warm_up() for worker in self._workers))
+        for worker in self._workers:
+            self._idle.put_nowait(worker)
+        self.sample_memory()
+        self._watchdog = asyncio.ensure_future(self._watch())
+
+    async def submit(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) on the next free worker and return its result.
+
+        A job already handed to a worker process can't be stopped, so a
+        caller that goes away (a closed connection, a timeout) doesn't end
+        it: the job runs as its own task, and the worker is only released
+        (and the job only stops counting as in flight) once it has finished.
+        """
+        if self._idle is None:
+            raise RuntimeError("Render pool is not started")
+        if self._idle.empty() and self._waiting >= self.queue_size:
+            raise RenderQueueFull(f"Render queue is full ({self.queue_size} jobs waiting)")
+
+        self._waiting += 1
+        try:
+            worker = await self._idle.get()
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        job = asyncio.ensure_future(worker.run(fn, *args))
+        job.add_done_callback(lambda done: self._finish(worker, done))
+        return await asyncio.shield(job)
+
+    def _finish(self, worker: RenderWorker, job: asyncio.Task):
+        self._in_flight -= 1
+        if not job.cancelled():
+            # Mark the exception retrieved even if the caller went away
+            job.exception()
+        self._release(worker)
+
+    def recycle_reason(self, worker: RenderWorker) -> Optional[str]:
+        """Why the worker should be recycled now, or None to keep it"""
+        if self.max_jobs and worker.jobs_completed >= self.max_jobs:
+            return f"{worker.jobs_completed} jobs"
+        if self.max_figures and worker.figures is not None and worker.figures > self.max_figures:
+            return f"{worker.figures} live figures"
+        if self.max_rss:
+            rss = worker.sample_rss()
+            if rss is not None and rss > self.max_rss:
+                return f"RSS of {rss // MIB} MiB"
+        return None
+
+    def _release(self, worker: RenderWorker):
+        """Return a worker whose job has finished to the idle queue, recycling it first if due"""
+        if self._idle is None:
+            return  # shut down
+        reason = self.recycle_reason(worker)
+        if reason is None or self._recycling is not None:
+            # Still due after its next job if another worker is being recycled
+            self._idle.put_nowait(worker)
+            return
+        self._recycling = asyncio.ensure_future(self._recycle(worker, reason))
+
+    async def _recycle(self, worker: RenderWorker, reason: str):
+        logging.info(f"Recycling render worker {worker.worker_id} (pid {worker.pid}) after {reason}")
+        try:
+            await worker.recycle()
+            self.recycled += 1
+        except Exception as e:
+            # A failed warm-up leaves a broken executor that run() restarts on the next job
+            logging.error(f"Recycling render worker {worker.worker_id} failed: {e}")
+        finally:
+            self._recycling = None
+            if self._idle is not None:
+                self._idle.put_nowait(worker)
+
+    def sample_memory(self) -> dict:
+        """Sample the RSS of the API process and every worker"""
+        self.memory = {
+            "api_rss_bytes": metrics.process_rss(),
+            "workers": [
+                {"worker": worker.worker_id, "pid": worker.pid, "rss_bytes": worker.sample_rss(),
+                 "figures": worker.figures, "jobs": worker.jobs_completed}
+                for worker in self._workers
+            ],
+            "sampled_at": time.time(),
+        }
+        return self.memory
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.watchdog_interval)
+            try:
+                self.sample_memory()
+            except Exception as e:
+                logging.error(f"Memory watchdog sample failed: {e}")
+
+    def worker_pids(self) -> List[int]:
+        return [worker.pid for worker in self._workers if worker.pid is not None]
+
+    def worker_figures(self) -> Dict[int, int]:
+        """Live figures in each worker after its latest render, by pid"""
+        return {worker.pid: worker.figures for worker in self._workers
+                if worker.pid is not None and worker.figures is not None}
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.size,
+            "queue_size": self.queue_size,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "recycled": self.recycled,
+            "recycling": self._recycling is not None,
+            "limits": {
+                "max_jobs": self.max_jobs,
+                "max_rss_bytes": self.max_rss,
+                "max_figures": self.max_figures,
+            },
+            "memory": self.memory,
+        }
+
+    def shutdown(self):
+        logging.info("Shutting down render pool")
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+        if self._recycling is not None:
+            self._recycling.cancel()
+            self._recycling = None
+        for worker in self._workers:
+            worker.shutdown()
+        self._workers = []
+        self._idle = None
@@ -0,0 +1,178 @@
+"""
+Server-side timeframe resampling.
+Clients upload one fine-grained OHLCV series (e.g. 1-minute bars) once and
+chart any coarser timeframe from it. Resampling is vectorized: candles are
+bucketed by their floored timestamp and each bucket is reduced with
+np.*.reduceat, without pandas or per-candle Python.
+
+Uploaded series and the frames resampled from them are kept in one
+byte-bounded LRU store keyed by (series hash, timeframe), so one upload
+serves every chart request for that symbol.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MINUTE_MS = 60_000
+
+# Supported timeframes in milliseconds; buckets are aligned to the Unix epoch (UTC)
+TIMEFRAMES = {
+    '1m': MINUTE_MS, '3m': 3 * MINUTE_MS, '5m': 5 * MINUTE_MS, '15m': 15 * MINUTE_MS, '30m': 30 * MINUTE_MS,
+    '1h': 60 * MINUTE_MS, '2h': 120 * MINUTE_MS, '4h': 240 * MINUTE_MS, '6h': 360 * MINUTE_MS,
+    '12h': 720 * MINUTE_MS, '1d': 1440 * MINUTE_MS,
+}
+
+Columns = Dict[str, np.ndarray]
+
+class ResampleError(ValueError):
+    """Unknown timeframe, or one the uploaded series can't be resampled to"""
+
+class UnknownSeries(LookupError):
+    """The series ID was never uploaded, or has been evicted since"""
+
+def to_columns(t, o, h, l, c, v) -> Columns:
+    """Normalize uploaded arrays: int64 epoch-ms timestamps, float64 prices, sorted by time.
+
+    Duplicate timestamps keep the last candle, as a re-sent bar replaces the
+    earlier one.
+    """
+    t = np.asarray(t)
+    if t.dtype.kind in 'iuf':
+        t = t.astype(np.int64, copy=False)
+    else:
+        # ISO strings; as epoch milliseconds like numeric uploads
+        t = pd.to_datetime(t).as_unit('ms').asi8
+    columns = {'t': t}
+    for key, values in zip('ohlcv', (o, h, l, c, v)):
+        columns[key] = np.asarray(values, dtype=np.float64)
+
+    if len(t) > 1 and not (np.diff(t) > 0).all():
+        # Stable sort, then keep the last candle of each timestamp
+        order = np.argsort(t, kind='stable')
+        last = np.append(t[order][1:] != t[order][:-1], True)
+        keep = order[last]
+        columns = {key: values[keep] for key, values in columns.items()}
+    return columns
+
+def series_id(columns: Columns) -> str:
+    """Content hash of a normalized series"""
+    digest = hashlib.sha256()
+    for key in 'tohlcv':
+        digest.update(columns[key].tobytes())
+    return digest.hexdigest()[:32]
+
+def interval(columns: Columns) -> Optional[int]:
+    """Bar interval of a series in milliseconds (its smallest timestamp step)"""
+    if len(columns['t']) < 2:
+        return None
+    return int(np.diff(columns['t']).min())
+
+def resample(columns: Columns, timeframe_ms: int) -> Columns:
+    """Aggregate candles into timeframe_ms buckets: first open, max high, min low, last close, summed volume.
+
+    Each bucket is stamped with its start time. Columns must be sorted by
+    time (see to_columns).
+    """
+    t = columns['t']
+    if len(t) == 0:
+        return {key: values.copy() for key, values in columns.items()}
+    buckets = t - t % timeframe_ms
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.append(starts[1:], len(t)) - 1
+    return {
+        't': buckets[starts],
+        'o': columns['o'][starts],
+        'h': np.maximum.reduceat(columns['h'], starts),
+        'l': np.minimum.reduceat(columns['l'], starts),
+        'c': columns['c'][ends],
+        'v': np.add.reduceat(columns['v'], starts),
+    }
+
+def timeframe_ms(timeframe: str) -> int:
+    try:
+        return TIMEFRAMES[timeframe]
+    except KeyError:
+        raise ResampleError(f"Unknown timeframe: {timeframe} (supported: {', '.join(TIMEFRAMES)})") from None
+
+def _nbytes(columns: Columns) -> int:
+    return sum(values.nbytes for values in columns.values())
+
+class SeriesStore:
+    """LRU store of uploaded series and their resampled frames, bounded by bytes"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("CHART_ENGINE_SERIES_MAX_BYTES", 256 * 1024 * 1024))
+        # (series id, timeframe or None for the upload) -> columns
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], Columns]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.resamples = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def put(self, columns: Columns) -> str:
+        """Store an uploaded series (see to_columns) and return its ID"""
+        key = (series_id(columns), None)
+        if _nbytes(columns) > self.max_bytes:
+            raise ResampleError(f"Series too large for the series store ({self.max_bytes} bytes)")
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                self._insert(key, columns)
+        return key[0]
+
+    def get(self, series: str, timeframe: Optional[str] = None) -> Columns:
+        """The uploaded series, or its resampled frame for timeframe (computed once, then cached)"""
+        with self._lock:
+            frame = self._lookup((series, timeframe))
+            if frame is not None:
+                self.hits += 1
+                return frame
+            base = self._lookup((series, None))
+        if base is None:
+            raise UnknownSeries(f"Unknown or expired series: {series}")
+
+        target = timeframe_ms(timeframe)
+        step = interval(base)
+        if step is not None and (target < step or target % step):
+            raise ResampleError(f"Can't resample a {step // 1000}s series to {timeframe}")
+        if target == step:
+            return base
+        frame = resample(base, target)
+        with self._lock:
+            self.resamples += 1
+            if (series, timeframe) not in self._entries:
+                self._insert((series, timeframe), frame)
+        return frame
+
+    def _lookup(self, key) -> Optional[Columns]:
+        frame = self._entries.get(key)
+        if frame is not None:
+            self._entries.move_to_end(key)
+        return frame
+
+    def _insert(self, key, columns: Columns):
+        self._entries[key] = columns
+        self._bytes += _nbytes(columns)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= _nbytes(evicted)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "series": sum(1 for _, timeframe in self._entries if timeframe is None),
+                "frames": sum(1 for _, timeframe in self._entries if timeframe is not None),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "resamples": self.resamples,
+                "evictions": self.evictions,
+            }
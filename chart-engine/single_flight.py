@@ -0,0 +1,65 @@
+"""
+Single-flight deduplication of concurrent identical work.
+When a candle closes, many clients ask for the same chart within a few
+hundred milliseconds, before the first render has reached the render cache.
+Calls sharing a key while one is in flight await that one call instead of
+starting their own; its result (or exception) goes to every caller. Once
+every caller has gone away the call is cancelled, so nobody's work is left
+holding a render worker.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}  # callers still awaiting each call
+        self.leaders = 0  # calls that did the work
+        self.coalesced = 0  # calls that awaited another call's work
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run fn() unless a call with this key is already in flight.
+
+        Returns the result and whether it came from another caller's call.
+        The work runs as its own task, so a caller that goes away (a closed
+        connection) doesn't cancel it for the others; when the last caller
+        goes away before it finishes, it is cancelled.
+        """
+        task = self._calls.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.leaders += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task), coalesced
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    # Nobody wants the result any more; a later call with this
+                    # key starts afresh instead of joining the cancelled one
+                    if self._calls.get(key) is task:
+                        del self._calls[key]
+                    task.cancel()
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,587 @@
+"""
+Incremental (streaming) versions of the indicators in utils.py.
+Each indicator keeps its own running state and takes one candle at a time, so
+a long-running process can keep per-symbol indicators warm instead of
+recomputing the whole history for every new candle.
+
+update(candle) returns the value the batch function in utils.py gives for the
+last bar of the history seen so far. For every indicator except RSI that is the
+same as the batch value at that index; utils.calculate_rsi uses the next bar's
+price change, so a bar's RSI is final once the following candle arrives.
+
+Candles are mappings with 'open', 'high', 'low', 'close' and 'volume' keys.
+State can be saved with snapshot() and brought back with restore_indicator().
+"""
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+class _RollingSum:
+    """Fixed-window sum with Kahan-compensated adds and removes (as pandas rolling sums)"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque()
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def _add(self, value: float):
+        y = value - self.compensation
+        t = self.total + y
+        self.compensation = t - self.total - y
+        self.total = t
+
+    def push(self, value: float):
+        if len(self.values) == self.window:
+            self._add(-self.values.popleft())
+        self.values.append(value)
+        self._add(value)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window
+
+    def state(self) -> Dict[str, Any]:
+        return {'values': list(self.values), 'total': self.total, 'compensation': self.compensation}
+
+    def load(self, state: Dict[str, Any]):
+        self.values = deque(state['values'])
+        self.total = state['total']
+        self.compensation = state['compensation']
+
+class _RollingExtreme:
+    """Fixed-window max (or min) over a monotonic deque, amortized O(1) per update"""
+
+    def __init__(self, window: int, find_max: bool):
+        self.window = window
+        self.find_max = find_max
+        self.count = 0
+        self.candidates: deque = deque()  # (index, value), values monotonic
+
+    def push(self, value: float) -> float:
+        if self.find_max:
+            while self.candidates and self.candidates[-1][1] <= value:
+                self.candidates.pop()
+        else:
+            while self.candidates and self.candidates[-1][1] >= value:
+                self.candidates.pop()
+        self.candidates.append((self.count, value))
+        self.count += 1
+        if self.candidates[0][0] <= self.count - 1 - self.window:
+            self.candidates.popleft()
+        return self.candidates[0][1]
+
+    def state(self) -> Dict[str, Any]:
+        return {'count': self.count, 'candidates': [list(c) for c in self.candidates]}
+
+    def load(self, state: Dict[str, Any]):
+        self.count = state['count']
+        self.candidates = deque(tuple(c) for c in state['candidates'])
+
+class StreamingIndicator(ABC):
+    """Base class: subclasses define update(), and list their state in _state_fields"""
+
+    kind = ''
+    _state_fields: List[str] = []
+
+    @abstractmethod
+    def params(self) -> Dict[str, Any]:
+        """Constructor arguments, as saved in snapshot()"""
+
+    @abstractmethod
+    def update(self, candle: Mapping[str, float]) -> Any:
+        """Take the next candle and return the indicator value for it"""
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable copy of the parameters and running state"""
+        state = {}
+        for field in self._state_fields:
+            value = getattr(self, field)
+            if isinstance(value, (_RollingSum, _RollingExtreme)):
+                value = value.state()
+            elif isinstance(value, deque):
+                value = list(value)
+            elif isinstance(value, StreamingIndicator):
+                value = value.snapshot()
+            state[field] = value
+        return {'type': self.kind, 'params': self.params(), 'state': state}
+
+    def _load(self, state: Dict[str, Any]):
+        for field in self._state_fields:
+            current = getattr(self, field)
+            value = state[field]
+            if isinstance(current, (_RollingSum, _RollingExtreme)):
+                current.load(value)
+            elif isinstance(current, deque):
+                setattr(self, field, deque(value, maxlen=current.maxlen))
+            elif isinstance(current, StreamingIndicator):
+                setattr(self, field, restore_indicator(value))
+            else:
+                setattr(self, field, value)
+
+class SMAState(StreamingIndicator):
+    """Simple moving average (utils.calculate_sma); NaN until the window is full"""
+
+    kind = 'sma'
+    _state_fields = ['window']
+
+    def __init__(self, period: int = 20):
+        self.period = period
+        self.window = _RollingSum(period)
+
+    def params(self):
+        return {'period': self.period}
+
+    def update(self, candle):
+        return self.push(candle['close'])
+
+    def push(self, value: float) -> float:
+        self.window.push(value)
+        if not self.window.full:
+            return math.nan
+        return self.window.total / self.period
+
+class EMAState(StreamingIndicator):
+    """Exponential moving average (utils.calculate_ema, pandas ewm with adjust=False)"""
+
+    kind = 'ema'
+    _state_fields = ['value']
+
+    def __init__(self, period: int = 20):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.value: Optional[float] = None
+
+    def params(self):
+        return {'period': self.period}
+
+    def update(self, candle):
+        return self.push(candle['close'])
+
+    def push(self, value: float) -> float:
+        if self.value is None:
+            self.value = value
+        elif self.value != value:
+            # Same arithmetic as pandas' ewm so results match the batch version
+            old_weight = 1.0 - self.alpha
+            self.value = (old_weight * self.value + self.alpha * value) / (old_weight + self.alpha)
+        return self.value
+
+class RSIState(StreamingIndicator):
+    """Wilder RSI (utils.calculate_rsi); 0 until period + 1 candles have been seen"""
+
+    kind = 'rsi'
+    _state_fields = ['count', 'prev_close', 'warmup_gains', 'warmup_losses', 'avg_gain', 'avg_loss']
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.prev_close: Optional[float] = None
+        self.warmup_gains: List[float] = []
+        self.warmup_losses: List[float] = []
+        # Wilder averages through the previous candle
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def params(self):
+        return {'period': self.period}
+
+    def update(self, candle):
+        close = candle['close']
+        period = self.period
+        if self.prev_close is not None:
+            # The change into this candle completes the previous candle's gain/loss
+            delta = close - self.prev_close
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            settled = self.count - 1  # index whose gain/loss is now known
+            if settled < period:
+                self.warmup_gains.append(gain)
+                self.warmup_losses.append(loss)
+            elif settled == period:
+                # The batch version seeds this index with the first period average
+                # and never uses its own change
+                self.avg_gain = float(np.mean(self.warmup_gains))
+                self.avg_loss = float(np.mean(self.warmup_losses))
+                self.warmup_gains, self.warmup_losses = [], []
+            else:
+                self.avg_gain = (self.avg_gain * (period-1) + gain) / period
+                self.avg_loss = (self.avg_loss * (period-1) + loss) / period
+        self.prev_close = close
+        self.count += 1
+
+        last = self.count - 1
+        if last < period:
+            return 0.0
+        if last == period:
+            avg_gain = float(np.mean(self.warmup_gains))
+            avg_loss = float(np.mean(self.warmup_losses))
+        else:
+            # The newest candle has no following change yet, so it contributes 0
+            avg_gain = (self.avg_gain * (period-1) + 0.0) / period
+            avg_loss = (self.avg_loss * (period-1) + 0.0) / period
+        if avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+def _true_range(candle, prev_close: Optional[float]) -> float:
+    high_low = candle['high'] - candle['low']
+    if prev_close is None:
+        return max(high_low, 0.0)
+    return max(high_low, abs(candle['high'] - prev_close), abs(candle['low'] - prev_close))
+
+class ATRState(StreamingIndicator):
+    """Wilder ATR (utils.calculate_atr); 0 until period candles have been seen"""
+
+    kind = 'atr'
+    _state_fields = ['count', 'prev_close', 'warmup', 'value']
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.prev_close: Optional[float] = None
+        self.warmup: List[float] = []
+        self.value = 0.0
+
+    def params(self):
+        return {'period': self.period}
+
+    def update(self, candle):
+        tr = _true_range(candle, self.prev_close)
+        self.prev_close = candle['close']
+        self.count += 1
+        if self.count < self.period:
+            self.warmup.append(tr)
+        elif self.count == self.period:
+            self.warmup.append(tr)
+            self.value = float(np.mean(self.warmup))
+            self.warmup = []
+        else:
+            self.value = (self.value * (self.period-1) + tr) / self.period
+        return self.value
+
+class MACDState(StreamingIndicator):
+    """MACD line, signal and histogram (utils.calculate_macd)"""
+
+    kind = 'macd'
+    _state_fields = ['fast', 'slow', 'signal']
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.signal_period = signal_period
+        self.fast = EMAState(fast_period)
+        self.slow = EMAState(slow_period)
+        self.signal = EMAState(signal_period)
+
+    def params(self):
+        return {'fast_period': self.fast_period, 'slow_period': self.slow_period,
+                'signal_period': self.signal_period}
+
+    def update(self, candle):
+        close = candle['close']
+        macd = self.fast.push(close) - self.slow.push(close)
+        signal = self.signal.push(macd)
+        return {'macd': macd, 'signal': signal, 'histogram': macd - signal}
+
+class BollingerState(StreamingIndicator):
+    """Bollinger Bands (utils.calculate_bollinger_bands); NaN until the window is full"""
+
+    kind = 'bollinger'
+    _state_fields = ['values', 'mean', 'ssqdm']
+
+    def __init__(self, period: int = 20, std_dev: float = 2.0):
+        self.period = period
+        self.std_dev = std_dev
+        self.values: deque = deque()
+        # Running window mean and sum of squared deviations (Welford with removal)
+        self.mean = 0.0
+        self.ssqdm = 0.0
+
+    def params(self):
+        return {'period': self.period, 'std_dev': self.std_dev}
+
+    def update(self, candle):
+        value = candle['close']
+        if len(self.values) == self.period:
+            old = self.values.popleft()
+            count = len(self.values)
+            if count:
+                prev_mean = self.mean
+                self.mean -= (old - self.mean) / count
+                self.ssqdm -= (old - prev_mean) * (old - self.mean)
+            else:
+                self.mean, self.ssqdm = 0.0, 0.0
+        self.values.append(value)
+        count = len(self.values)
+        prev_mean = self.mean
+        self.mean += (value - self.mean) / count
+        self.ssqdm += (value - prev_mean) * (value - self.mean)
+
+        if count < self.period:
+            return {'middle': math.nan, 'upper': math.nan, 'lower': math.nan}
+        # Sample standard deviation, as pandas rolling std
+        std = math.sqrt(max(self.ssqdm, 0.0) / (count - 1)) if count > 1 else math.nan
+        middle = self.mean
+        return {'middle': middle, 'upper': middle + std * self.std_dev, 'lower': middle - std * self.std_dev}
+
+class StochasticState(StreamingIndicator):
+    """Stochastic %K / %D (utils.calculate_stochastic)"""
+
+    kind = 'stochastic'
+    _state_fields = ['count', 'highest', 'lowest', 'raw_k', 'd_window']
+
+    def __init__(self, k_period: int = 14, d_period: int = 3, slowing: int = 1):
+        self.k_period = k_period
+        self.d_period = d_period
+        self.slowing = slowing
+        self.count = 0
+        self.highest = _RollingExtreme(k_period, find_max=True)
+        self.lowest = _RollingExtreme(k_period, find_max=False)
+        self.raw_k = _RollingSum(slowing)
+        self.d_window = _RollingSum(d_period)
+
+    def params(self):
+        return {'k_period': self.k_period, 'd_period': self.d_period, 'slowing': self.slowing}
+
+    def update(self, candle):
+        index = self.count
+        self.count += 1
+        highest_high = self.highest.push(candle['high'])
+        lowest_low = self.lowest.push(candle['low'])
+
+        raw_k = 0.0
+        if index >= self.k_period - 1:
+            if highest_high != lowest_low:
+                raw_k = (candle['close'] - lowest_low) / (highest_high - lowest_low) * 100
+            else:
+                raw_k = 50.0  # Default to middle if range is zero
+
+        if self.slowing > 1:
+            self.raw_k.push(raw_k)
+            k = 0.0
+            if index >= self.k_period + self.slowing - 2:
+                k = self.raw_k.total / self.slowing
+        else:
+            k = raw_k
+
+        self.d_window.push(k)
+        d = self.d_window.total / self.d_period if self.d_window.full else math.nan
+        return {'k': k, 'd': d}
+
+class OBVState(StreamingIndicator):
+    """On-Balance Volume (utils.calculate_obv)"""
+
+    kind = 'obv'
+    _state_fields = ['prev_close', 'value']
+
+    def __init__(self):
+        self.prev_close: Optional[float] = None
+        self.value = 0.0
+
+    def params(self):
+        return {}
+
+    def update(self, candle):
+        close = candle['close']
+        if self.prev_close is not None:
+            if close > self.prev_close:
+                self.value += candle['volume']
+            elif close < self.prev_close:
+                self.value -= candle['volume']
+        self.prev_close = close
+        return self.value
+
+class VWAPState(StreamingIndicator):
+    """Cumulative or rolling VWAP (utils.calculate_vwap)"""
+
+    kind = 'vwap'
+    _state_fields = ['count', 'cumulative_pv', 'cumulative_volume', 'window_pv', 'window_volume']
+
+    def __init__(self, period: Optional[int] = None):
+        self.period = period
+        self.count = 0
+        self.cumulative_pv = 0.0
+        self.cumulative_volume = 0.0
+        self.window_pv = _RollingSum(period or 1)
+        self.window_volume = _RollingSum(period or 1)
+
+    def params(self):
+        return {'period': self.period}
+
+    def update(self, candle):
+        price, volume = candle['close'], candle['volume']
+        self.count += 1
+        if self.period is None:
+            self.cumulative_pv += price * volume
+            self.cumulative_volume += volume
+            return self.cumulative_pv / (self.cumulative_volume if self.cumulative_volume > 0 else 1)
+
+        self.window_pv.push(price * volume)
+        self.window_volume.push(volume)
+        if self.count < self.period:
+            return 0.0
+        if self.window_volume.total > 0:
+            return self.window_pv.total / self.window_volume.total
+        return price  # Default to price if no volume
+
+class ADXState(StreamingIndicator):
+    """ADX with +DI / -DI (utils.calculate_adx); 0 during warm-up"""
+
+    kind = 'adx'
+    _state_fields = ['count', 'prev', 'warmup_tr', 'warmup_plus_dm', 'warmup_minus_dm',
+                     'smoothed_tr', 'smoothed_plus_dm', 'smoothed_minus_dm', 'warmup_dx', 'adx']
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.prev: Optional[List[float]] = None  # previous [high, low, close]
+        self.warmup_tr: List[float] = []
+        self.warmup_plus_dm: List[float] = []
+        self.warmup_minus_dm: List[float] = []
+        self.smoothed_tr = 0.0
+        self.smoothed_plus_dm = 0.0
+        self.smoothed_minus_dm = 0.0
+        self.warmup_dx: List[float] = []
+        self.adx = 0.0
+
+    def params(self):
+        return {'period': self.period}
+
+    def update(self, candle):
+        period = self.period
+        index = self.count
+        self.count += 1
+        high, low, close = candle['high'], candle['low'], candle['close']
+        if self.prev is None:
+            self.prev = [high, low, close]
+            return {'adx': 0.0, 'plus_di': 0.0, 'minus_di': 0.0}
+
+        prev_high, prev_low, prev_close = self.prev
+        self.prev = [high, low, close]
+        high_diff = high - prev_high
+        low_diff = prev_low - low
+        plus_dm = high_diff if (high_diff > low_diff and high_diff > 0) else 0.0
+        minus_dm = low_diff if (low_diff > high_diff and low_diff > 0) else 0.0
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+        # Wilder smoothed sums, seeded with the sum of the first period values
+        if index < period:
+            self.warmup_tr.append(tr)
+            self.warmup_plus_dm.append(plus_dm)
+            self.warmup_minus_dm.append(minus_dm)
+            return {'adx': 0.0, 'plus_di': 0.0, 'minus_di': 0.0}
+        if index == period:
+            self.smoothed_tr = float(np.sum(self.warmup_tr + [tr]))
+            self.smoothed_plus_dm = float(np.sum(self.warmup_plus_dm + [plus_dm]))
+            self.smoothed_minus_dm = float(np.sum(self.warmup_minus_dm + [minus_dm]))
+            self.warmup_tr, self.warmup_plus_dm, self.warmup_minus_dm = [], [], []
+        else:
+            self.smoothed_tr = self.smoothed_tr - (self.smoothed_tr / period) + tr
+            self.smoothed_plus_dm = self.smoothed_plus_dm - (self.smoothed_plus_dm / period) + plus_dm
+            self.smoothed_minus_dm = self.smoothed_minus_dm - (self.smoothed_minus_dm / period) + minus_dm
+
+        if self.smoothed_tr == 0:
+            plus_di = minus_di = 0.0
+        else:
+            plus_di = 100 * self.smoothed_plus_dm / self.smoothed_tr
+            minus_di = 100 * self.smoothed_minus_dm / self.smoothed_tr
+        di_sum = plus_di + minus_di
+        dx = 0.0 if di_sum == 0 else 100 * abs(plus_di - minus_di) / di_sum
+
+        # ADX is seeded with the mean of the first period DX values
+        if index < 2*period - 1:
+            self.warmup_dx.append(dx)
+        elif index == 2*period - 1:
+            self.warmup_dx.append(dx)
+            self.adx = float(np.mean(self.warmup_dx))
+            self.warmup_dx = []
+        else:
+            self.adx = ((period - 1) * self.adx + dx) / period
+        return {'adx': self.adx, 'plus_di': plus_di, 'minus_di': minus_di}
+
+class PSARState(StreamingIndicator):
+    """Parabolic SAR (utils.calculate_parabolic_sar)"""
+
+    kind = 'psar'
+    _state_fields = ['count', 'sar', 'trend', 'extreme_point', 'af', 'prev_highs', 'prev_lows']
+
+    def __init__(self, af_start: float = 0.02, af_increment: float = 0.02, af_max: float = 0.2):
+        self.af_start = af_start
+        self.af_increment = af_increment
+        self.af_max = af_max
+        self.count = 0
+        self.sar = 0.0
+        self.trend = 1  # 1 for uptrend, -1 for downtrend
+        self.extreme_point = 0.0
+        self.af = af_start
+        # Last two highs and lows, most recent last
+        self.prev_highs: deque = deque(maxlen=2)
+        self.prev_lows: deque = deque(maxlen=2)
+
+    def params(self):
+        return {'af_start': self.af_start, 'af_increment': self.af_increment, 'af_max': self.af_max}
+
+    def update(self, candle):
+        high, low = candle['high'], candle['low']
+        self.count += 1
+        if self.count == 1:
+            self.extreme_point = high
+            self.sar = low
+        else:
+            sar = self.sar + self.af * (self.extreme_point - self.sar)
+            if self.trend == 1:
+                sar = min(sar, min(self.prev_lows))
+                if low < sar:
+                    self.trend = -1
+                    sar = self.extreme_point
+                    self.extreme_point = low
+                    self.af = self.af_start
+                elif high > self.extreme_point:
+                    self.extreme_point = high
+                    self.af = min(self.af + self.af_increment, self.af_max)
+            else:
+                sar = max(sar, max(self.prev_highs))
+                if high > sar:
+                    self.trend = 1
+                    sar = self.extreme_point
+                    self.extreme_point = high
+                    self.af = self.af_start
+                elif low < self.extreme_point:
+                    self.extreme_point = low
+                    self.af = min(self.af + self.af_increment, self.af_max)
+            self.sar = sar
+        self.prev_highs.append(high)
+        self.prev_lows.append(low)
+        # A single bar has no SAR yet in the batch version
+        return self.sar if self.count > 1 else 0.0
+
+STREAMING_INDICATORS = {
+    cls.kind: cls for cls in (SMAState, EMAState, RSIState, ATRState, MACDState, BollingerState,
+                              StochasticState, OBVState, VWAPState, ADXState, PSARState)
+}
+
+def restore_indicator(snapshot: Dict[str, Any]) -> StreamingIndicator:
+    """Rebuild an indicator from StreamingIndicator.snapshot()"""
+    indicator = STREAMING_INDICATORS[snapshot['type']](**snapshot['params'])
+    indicator._load(snapshot['state'])
+    return indicator
+
+class IndicatorSet:
+    """A named group of streaming indicators for one symbol/timeframe"""
+
+    def __init__(self, indicators: Dict[str, StreamingIndicator]):
+        self.indicators = dict(indicators)
+
+    def update(self, candle: Mapping[str, float]) -> Dict[str, Any]:
+        return {name: indicator.update(candle) for name, indicator in self.indicators.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: indicator.snapshot() for name, indicator in self.indicators.items()}
+
+    @classmethod
+    def restore(cls, snapshot: Dict[str, Any]) -> "IndicatorSet":
+        return cls({name: restore_indicator(state) for name, state in snapshot.items()})
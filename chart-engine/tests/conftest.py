@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Make the chart engine modules importable as top-level modules, as they are
+# at runtime, and the shared test helpers (tests/helpers.py) as `helpers`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
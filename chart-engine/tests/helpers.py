@@ -0,0 +1,57 @@
+"""
+Shared test data and assertions: seeded OHLCV series in the shapes the
+modules under test take (arrays, DataFrames, normalized columns).
+"""
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from resampling import to_columns
+
+def make_ohlcv(n: int, seed: int = 7, flat: bool = False, zero_volume: bool = False):
+    """high, low, close, volume arrays of a seeded random walk"""
+    rng = np.random.default_rng(seed)
+    if flat:
+        close = np.full(n, 100.0)
+    else:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = 0.0 if flat else np.abs(rng.normal(0, 0.005, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = np.zeros(n) if zero_volume else rng.integers(0, 5_000, n).astype(float)
+    return high, low, close, volume
+
+def assert_same(actual, expected):
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+def make_frame(n: int) -> pd.DataFrame:
+    """OHLCV DataFrame of 15-minute bars, indexed by datetime"""
+    high, low, close, volume = make_ohlcv(n)
+    index = pd.date_range('2024-01-01', periods=n, freq='15min', name='datetime')
+    return pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+def chart_job(n: int = 60, **fields):
+    """A /generate-chart request body with n candles as JSON records"""
+    df = make_frame(n).reset_index()
+    df['datetime'] = df['datetime'].astype(str)
+    return {'data': df.to_dict('records'), 'width': 400, 'height': 300, **fields}
+
+def image_size(png: bytes):
+    image = Image.open(BytesIO(png))
+    assert image.format == 'PNG'
+    return image.size
+
+def minute_series(n: int, gaps: bool = False):
+    """Normalized 1-minute columns (see resampling.to_columns), optionally with gaps"""
+    high, low, close, volume = make_ohlcv(n)
+    t = 1_704_067_200_000 + np.arange(n, dtype=np.int64) * 60_000
+    if gaps:
+        # Drop a few stretches, as for a market that closes
+        keep = np.ones(n, dtype=bool)
+        keep[100:400] = keep[1000:1013] = False
+        t, high, low, close, volume = t[keep], high[keep], low[keep], close[keep], volume[keep]
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    return to_columns(t, open_, high, low, close, volume)
@@ -0,0 +1,95 @@
+"""
+Candle store tests: ring buffers append, overwrite and merge bars like a
+full re-sort of everything sent would, and the store evicts cold symbols.
+"""
+import numpy as np
+import pytest
+
+from candle_store import CandleRing, CandleStore, UnknownCandles
+from render_cache import request_key
+from resampling import to_columns
+from helpers import minute_series
+
+def bars(columns, start, stop):
+    return {key: values[start:stop] for key, values in columns.items()}
+
+def assert_columns_equal(result, expected):
+    for key in 'tohlcv':
+        np.testing.assert_array_equal(result[key], expected[key])
+
+def test_append_wraps_and_keeps_the_newest():
+    columns = minute_series(250)
+    ring = CandleRing(100)
+    for start in range(0, 250, 7):
+        ring.upsert(bars(columns, start, start + 7))
+    assert ring.size == 100
+    assert_columns_equal(ring.window(), bars(columns, 150, 250))
+    assert_columns_equal(ring.window(30), bars(columns, 220, 250))
+    assert_columns_equal(ring.window(500), bars(columns, 150, 250))
+
+def test_overwrites_the_forming_bar():
+    columns = minute_series(50)
+    ring = CandleRing(40)
+    ring.upsert(bars(columns, 0, 45))
+    revision = ring.revision
+    update = bars(columns, 44, 46)
+    update['c'] = update['c'] + 1.0
+    assert ring.upsert(update) == (1, 1)
+    assert ring.revision > revision
+    window = ring.window()
+    np.testing.assert_array_equal(window['t'], columns['t'][6:46])
+    np.testing.assert_array_equal(window['c'][-2:], update['c'])
+
+def test_older_bars_are_merged():
+    columns = minute_series(60)
+    ring = CandleRing(100)
+    keep = np.ones(60, dtype=bool)
+    keep[10:20] = False
+    ring.upsert({key: values[keep] for key, values in columns.items()})
+    patch = bars(columns, 5, 20)
+    patch['v'] = patch['v'] * 2
+    assert ring.upsert(patch) == (10, 5)
+    expected = to_columns(*(np.concatenate((columns[key][keep], patch[key])) for key in 'tohlcv'))
+    assert_columns_equal(ring.window(), expected)
+
+def test_store_lookup_and_eviction():
+    ring_bytes = CandleRing(50).nbytes
+    store = CandleStore(max_bytes=2 * ring_bytes, capacity=50)
+    columns = minute_series(30)
+    store.upsert('BTCUSD', '1m', columns)
+    store.upsert('ETHUSD', '1m', columns)
+    store.window('BTCUSD', '1m')  # touched, so ETHUSD is the coldest
+    store.upsert('SOLUSD', '1m', columns)
+    with pytest.raises(UnknownCandles):
+        store.revision('ETHUSD', '1m')
+    assert_columns_equal(store.window('BTCUSD', '1m', 10), bars(columns, 20, 30))
+    stats = store.stats()
+    assert stats['series'] == 2 and stats['evictions'] == 1 and stats['bytes'] <= stats['max_bytes']
+    assert store.delete('SOLUSD', '1m') and not store.delete('SOLUSD', '1m')
+
+def test_revisions_never_repeat_after_delete_or_eviction():
+    ring_bytes = CandleRing(50).nbytes
+    store = CandleStore(max_bytes=ring_bytes, capacity=50)
+    columns = minute_series(30)
+
+    def cache_key():
+        # How /generate-chart keys a chart of stored candles
+        return request_key({'symbol': 'BTCUSD', 'timeframe': '1m', 'revision': store.revision('BTCUSD', '1m')})
+
+    store.upsert('BTCUSD', '1m', columns)
+    first = cache_key()
+    store.delete('BTCUSD', '1m')
+    store.upsert('BTCUSD', '1m', {**columns, 'c': columns['c'] + 1.0})
+    second = cache_key()
+    assert second != first
+
+    store.upsert('ETHUSD', '1m', columns)  # evicts BTCUSD
+    store.upsert('BTCUSD', '1m', columns)
+    assert cache_key() not in (first, second)
+
+def test_explicit_capacity_is_honoured(monkeypatch):
+    monkeypatch.setenv('CHART_ENGINE_CANDLE_CAPACITY', '7')
+    assert CandleStore().capacity == 7
+    assert CandleStore(capacity=3).capacity == 3
+    with pytest.raises(ValueError):
+        CandleStore(capacity=0)
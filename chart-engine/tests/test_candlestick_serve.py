@@ -0,0 +1,47 @@
+"""
+Persistent mode tests for generate_candlestick.py: --serve reads NDJSON jobs
+from stdin and writes one length-prefixed frame per job, in job order even
+when the jobs render in parallel, with an empty frame for a failed job.
+"""
+import json
+import os
+import struct
+import subprocess
+import sys
+
+from helpers import image_size, make_ohlcv
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'generate_candlestick.py')
+
+def job(width, height, n=50):
+    high, low, close, volume = make_ohlcv(n)
+    candles = [{'time': 1_704_067_200_000 + i * 60_000, 'open': float(close[i]), 'high': float(high[i]),
+                'low': float(low[i]), 'close': float(close[i]), 'volume': float(volume[i])} for i in range(n)]
+    return json.dumps({'candles': candles, 'layout': 'fixed', 'width': width, 'height': height,
+                       'indicators': [{'type': 'sma'}, {'type': 'rsi'}]})
+
+def read_frames(stream: bytes):
+    frames, offset = [], 0
+    while offset < len(stream):
+        (length,) = struct.unpack_from('>I', stream, offset)
+        offset += 4
+        frames.append(stream[offset:offset + length])
+        offset += length
+    assert offset == len(stream)
+    return frames
+
+def test_serve_keeps_job_order_across_workers():
+    # Sizes differ per job, so each frame shows which job it came from
+    sizes = [(640, 480), (320, 240), (500, 300), (400, 400), (360, 200)]
+    lines = [job(*size) for size in sizes]
+    lines.insert(2, '{"candles": not json')
+    stdin = '\n'.join(lines) + '\n'
+
+    completed = subprocess.run([sys.executable, SCRIPT, '--serve', '--workers', '2'], input=stdin.encode(),
+                               capture_output=True, cwd=os.path.dirname(SCRIPT), timeout=300)
+    assert completed.returncode == 0, completed.stderr.decode()[-2000:]
+
+    frames = read_frames(completed.stdout)
+    assert len(frames) == len(lines)
+    assert frames[2] == b''  # the failed job keeps its place
+    assert [image_size(frame) for frame in frames[:2] + frames[3:]] == sizes
@@ -0,0 +1,74 @@
+"""
+Fixed-layout tests: panels tile the plot area in ratio order, the saved
+PNG is exactly the requested size, pooled figures draw like fresh ones, and
+drawing and encoding apart gives the same PNG as savefig does in one step.
+"""
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+import mplfinance as mpf
+import pytest
+
+import chart_layout
+from chart_layout import panel_rects
+from chart_renderer import render_chart
+from helpers import image_size, make_frame
+
+@pytest.mark.parametrize('dpi', [100, 200])
+def test_panel_rects_stack_by_ratio(dpi):
+    rects = panel_rects((4, 1, 1), 1200, 800, dpi=dpi)
+    heights = [rect[3] for rect in rects]
+    assert heights[0] == pytest.approx(4 * heights[1])
+    for upper, lower in zip(rects, rects[1:]):
+        assert lower[1] + lower[3] == pytest.approx(upper[1])
+    assert all(0 < rect[0] and rect[0] + rect[2] < 1 for rect in rects)
+
+@pytest.mark.parametrize('volume', [True, False])
+def test_fixed_layout_is_exact_size(volume):
+    df = make_frame(120).reset_index()
+    df['datetime'] = df['datetime'].astype(str)
+    result = render_chart({'data': df.to_dict('records'), 'indicators': {'sma': {}, 'rsi': {}, 'macd': {}},
+                           'width': 1000, 'height': 700, 'chart_type': 'candle', 'volume': volume,
+                           'layout': 'fixed'})
+    assert image_size(result['image']) == (1000, 700)
+
+def test_reused_template_matches_fresh_figure():
+    chart_layout._templates.clear()
+    first, second = make_frame(150).reset_index(), make_frame(200).reset_index()
+    second[['open', 'high', 'low', 'close']] += 5
+    jobs = []
+    for df in (first, second):
+        df['datetime'] = df['datetime'].astype(str)
+        jobs.append({'data': df.to_dict('records'), 'indicators': {'sma': {}, 'macd': {}}, 'width': 800,
+                     'height': 600, 'layout': 'fixed'})
+
+    render_chart(jobs[0])
+    reused = render_chart(jobs[1])['image']
+    assert len(chart_layout._templates) == 1
+    chart_layout._templates.clear()
+    assert reused == render_chart(jobs[1])['image']
+
+@pytest.mark.parametrize('style', ['yahoo', 'nightclouds', 'light'])
+def test_reused_template_restores_its_style(style):
+    # Another style's render in between leaves its rcParams behind
+    chart_layout._templates.clear()
+    df = make_frame(120).reset_index()
+    df['datetime'] = df['datetime'].astype(str)
+    job = {'data': df.to_dict('records'), 'indicators': {'rsi': {}}, 'width': 640, 'height': 480,
+           'layout': 'fixed', 'style': style}
+    fresh = render_chart(job)['image']
+    render_chart({**job, 'style': 'dark', 'width': 600})
+    assert render_chart(job)['image'] == fresh
+
+@pytest.mark.parametrize('figsize, volume', [((12, 8), True), ((4, 3), False)])
+def test_tight_draw_then_encode_matches_savefig(figsize, volume):
+    df = make_frame(120)
+    kwargs = dict(type='candle', style='yahoo', volume=volume, figsize=figsize, tight_layout=True)
+    buf = BytesIO()
+    mpf.plot(df, savefig=dict(fname=buf, dpi=100, bbox_inches='tight'), **kwargs)
+    fig, _ = mpf.plot(df, returnfig=True, **kwargs)
+    try:
+        drawn = chart_layout.draw_tight(fig, 100)
+    finally:
+        plt.close(fig)
+    assert chart_layout.png_bytes(drawn, 100) == buf.getvalue()
@@ -0,0 +1,53 @@
+"""
+Style registry tests: themes are built once per process and shared
+read-only, and custom themes keep meaning the same thing under their ID.
+"""
+import copy
+import pickle
+
+import pytest
+
+import chart_styles
+from chart_styles import StyleError, get_style, register_style
+
+NEON = {'base_mpf_style': 'nightclouds', 'marketcolors': {'up': 'cyan', 'down': 'magenta'}, 'gridstyle': '--'}
+
+@pytest.mark.parametrize('name', ['yahoo', 'dark', 'light', 'charles'])
+def test_builtin_styles_are_built_once(name):
+    assert get_style(name) is get_style(name)
+
+def test_styles_are_read_only():
+    style = get_style('dark')
+    with pytest.raises(TypeError):
+        style['gridstyle'] = '-'
+    with pytest.raises(TypeError):
+        style['marketcolors']['candle'] = {}
+    # Copies and pickles (what render workers receive) are plain dicts
+    assert type(copy.deepcopy(style)) is dict
+    assert pickle.loads(pickle.dumps(style)) == style
+
+def test_register_is_idempotent_and_ids_are_immutable():
+    style_id = register_style(NEON)
+    assert register_style(dict(NEON)) == style_id
+    assert chart_styles.get_definition(style_id) == NEON
+    with pytest.raises(StyleError):
+        register_style({'base_mpf_style': 'yahoo'}, style_id)
+    with pytest.raises(StyleError):
+        register_style(NEON, 'yahoo')
+
+def test_worker_learns_style_from_definition():
+    chart_styles._styles.pop('test-neon', None)
+    chart_styles._definitions.pop('test-neon', None)
+    style = get_style('test-neon', NEON)
+    assert style is get_style('test-neon')
+    assert style['gridstyle'] == '--'
+
+@pytest.mark.parametrize('definition', [{'base_mpf_style': 'nope'}, {'colour': 'red'},
+                                        {'marketcolors': {'up': 'g', 'sideways': 'b'}}])
+def test_invalid_definitions(definition):
+    with pytest.raises(StyleError):
+        register_style(definition)
+
+def test_unknown_style():
+    with pytest.raises(StyleError):
+        get_style('no-such-style')
@@ -0,0 +1,100 @@
+"""
+Columnar request tests: ChartRequest.data takes either a list of candles or
+parallel t/o/h/l/c/v arrays. Both shapes are validated, capped at 400 candles
+and turned into the same DataFrame, so they render the same chart and are
+cached the same way.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+TestClient = pytest.importorskip('fastapi.testclient').TestClient
+
+import main
+from chart_renderer import columns_to_dataframe, convert_to_dataframe
+from helpers import chart_job, make_frame
+from main import ChartRequest, ColumnarOHLCV
+from render_cache import RenderCache
+from render_pool import RenderPool
+
+def columnar_job(n=60, **fields):
+    """chart_job's candles as columnar arrays"""
+    rows = chart_job(n, **fields)
+    data = rows.pop('data')
+    return {'data': {key: [row[name] for row in data] for key, name in
+                     zip('tohlcv', ('datetime', 'open', 'high', 'low', 'close', 'volume'))}, **rows}
+
+@pytest.fixture(scope='module')
+def client():
+    # One real render worker; each test picks its own render cache
+    pool, cache = main.render_pool, main.render_cache
+    main.render_pool = RenderPool(size=1, queue_size=4)
+    try:
+        with TestClient(main.app) as client:
+            yield client
+    finally:
+        main.render_pool, main.render_cache = pool, cache
+
+def test_length_mismatch_is_rejected(client):
+    job = columnar_job()
+    job['data']['v'] = job['data']['v'][:-1]
+    with pytest.raises(ValueError, match='same length'):
+        ChartRequest.model_validate(job)
+    response = client.post('/generate-chart', json=job)
+    assert response.status_code == 422
+
+def test_tail_keeps_the_newest_candles():
+    data = ColumnarOHLCV.model_validate(columnar_job(450)['data'])
+    tail = data.tail(400)
+    assert len(tail) == 400
+    assert tail.t == data.t[-400:] and tail.c == data.c[-400:] and tail.v == data.v[-400:]
+
+def test_columns_to_dataframe_timestamps():
+    expected = make_frame(30)
+    columns = {key: expected[name].to_numpy() for key, name in
+               zip('ohlcv', ('open', 'high', 'low', 'close', 'volume'))}
+    epoch_ms = ((expected.index - pd.Timestamp(0)) // pd.Timedelta(1, 'ms')).to_numpy()
+    iso = [str(stamp) for stamp in expected.index]
+
+    for t in (epoch_ms, epoch_ms.astype(np.float64), iso):
+        df = columns_to_dataframe({**columns, 't': t})
+        pd.testing.assert_frame_equal(df, expected, check_freq=False, check_index_type=False)
+        assert df.index.name == 'datetime'
+
+def test_columnar_and_rows_render_the_same_chart(client, monkeypatch):
+    monkeypatch.setattr(main, 'render_cache', RenderCache(max_bytes=0))
+    jobs = []
+    submit = main.render_pool.submit
+
+    async def recording_submit(fn, job):
+        jobs.append(job)
+        return await submit(fn, job)
+
+    monkeypatch.setattr(main.render_pool, 'submit', recording_submit)
+    # More candles than the 400 rendered, so both shapes are cut the same way
+    rows = client.post('/generate-chart', json=chart_job(450), headers={'Accept': 'image/png'})
+    columnar = client.post('/generate-chart', json=columnar_job(450), headers={'Accept': 'image/png'})
+    assert rows.status_code == columnar.status_code == 200
+
+    row_frame, columnar_frame = (convert_to_dataframe(job['data']) for job in jobs)
+    assert len(row_frame) == 400
+    pd.testing.assert_frame_equal(columnar_frame, row_frame)
+    assert columnar.content == rows.content
+
+@pytest.mark.parametrize('make_job', [chart_job, columnar_job])
+def test_cache_keys(client, monkeypatch, make_job):
+    monkeypatch.setattr(main, 'render_cache', RenderCache())
+
+    def cached(job):
+        return client.post('/generate-chart', json=job).json()['cached']
+
+    job = make_job()
+    assert not cached(job)
+    # Same candles with the fields in another order: same key
+    assert cached(dict(reversed(list(job.items()))))
+    changed = make_job()
+    if isinstance(changed['data'], dict):
+        changed['data']['c'][-1] += 1
+    else:
+        changed['data'][-1]['close'] += 1
+    assert not cached(changed)
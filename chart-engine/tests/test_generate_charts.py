@@ -0,0 +1,117 @@
+"""
+Batch endpoint tests: /generate-charts streams one NDJSON line per job and a
+final summary line, a failing job only fails its own line, at most one job
+per render worker is in flight, and a client going away cancels the rest.
+"""
+import asyncio
+import json
+
+import pytest
+
+TestClient = pytest.importorskip('fastapi.testclient').TestClient
+
+import main
+from helpers import chart_job
+from render_cache import RenderCache
+from render_pool import RenderPool
+
+def ndjson(response):
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert response.text.endswith('\n')
+    return [json.loads(line) for line in response.text.splitlines()]
+
+@pytest.fixture(scope='module')
+def client():
+    # One real render worker; nothing served from the cache
+    pool, cache = main.render_pool, main.render_cache
+    main.render_pool, main.render_cache = RenderPool(size=1, queue_size=4), RenderCache(max_bytes=0)
+    try:
+        with TestClient(main.app) as client:
+            yield client
+    finally:
+        main.render_pool, main.render_cache = pool, cache
+
+def test_mixed_batch(client):
+    jobs = [
+        chart_job(id='ok'),
+        {'id': 'invalid', 'data': [{'datetime': '2024-01-01', 'open': 'not a number'}]},
+        chart_job(id='bad-style', style='no-such-style'),
+        chart_job(id='bad-dates', data=[{'datetime': 'not a date', 'open': 1, 'high': 2, 'low': 0.5,
+                                         'close': 1.5, 'volume': 10}] * 5),
+    ]
+    lines = ndjson(client.post('/generate-charts', json={'jobs': jobs}))
+
+    *results, done = lines
+    assert done == {'done': True, 'jobs': 4, 'failed': 3, 'processing_time': done['processing_time']}
+    by_id = {line['id']: line for line in results}
+    assert sorted(line['index'] for line in results) == [0, 1, 2, 3]
+    assert {key: line['status'] for key, line in by_id.items()} == {'ok': 200, 'invalid': 422, 'bad-style': 400,
+                                                                     'bad-dates': 500}
+    assert by_id['ok']['success'] and by_id['ok']['chart_image'] and by_id['ok']['width'] == 400
+    assert not any(line['success'] for key, line in by_id.items() if key != 'ok')
+    assert by_id['invalid']['detail'] == 'Invalid chart request'
+    assert by_id['bad-style']['detail'] == 'Invalid chart style'
+
+def test_one_job_per_worker(client, monkeypatch):
+    pool = main.render_pool
+    busy = []
+    submit = pool.submit
+
+    async def counting_submit(fn, *args):
+        busy.append(pool.in_flight + pool.queue_depth)  # jobs ahead of this one
+        return await submit(fn, *args)
+
+    monkeypatch.setattr(pool, 'submit', counting_submit)
+    lines = ndjson(client.post('/generate-charts', json={'jobs': [chart_job(40 + i) for i in range(3)]}))
+    assert [line['status'] for line in lines[:-1]] == [200] * 3
+    assert busy == [0, 0, 0]
+
+def test_disconnect_cancels_the_remaining_jobs(monkeypatch):
+    started, cancelled = [], []
+
+    async def submit(fn, job):
+        started.append(job['width'])
+        if job['width'] == 100:
+            return {'image': b'png', 'image_format': 'png', 'chart_type': 'candle', 'width': 100, 'height': 100,
+                    'timings': {'render': 0.0, 'encode': None}, 'worker': {'pid': 1, 'figures': 0}}
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(job['width'])
+            raise
+
+    monkeypatch.setattr(main, 'render_pool', RenderPool(size=3, queue_size=4))
+    monkeypatch.setattr(main, 'render_cache', RenderCache(max_bytes=0))
+    monkeypatch.setattr(main.render_pool, 'submit', submit)
+    body = json.dumps({'jobs': [chart_job(width=width) for width in (100, 200, 300)]}).encode()
+
+    async def post_then_disconnect():
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+                 'scheme': 'http', 'path': '/generate-charts', 'raw_path': b'/generate-charts', 'root_path': '',
+                 'query_string': b'', 'headers': [(b'content-type', b'application/json')],
+                 'client': ('127.0.0.1', 0), 'server': ('127.0.0.1', 80)}
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        first_line = asyncio.Event()
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await first_line.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if message['type'] == 'http.response.body' and message.get('body'):
+                first_line.set()  # the client leaves after the first result
+
+        await main.app(scope, receive, send)
+        await asyncio.sleep(0.1)
+        # Checked before asyncio.run cancels whatever is left over on its own
+        assert sorted(cancelled) == [200, 300]
+        return [json.loads(message['body']) for message in sent
+                if message['type'] == 'http.response.body' and message.get('body')]
+
+    lines = asyncio.run(post_then_disconnect())
+    assert lines[0]['status'] == 200 and lines[0]['width'] == 100
+    assert sorted(started) == [100, 200, 300]
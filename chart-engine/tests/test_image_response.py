@@ -0,0 +1,72 @@
+"""
+Response shape tests for /generate-chart: ?format= and the Accept header
+pick raw image bytes or the default JSON, and the Accept header is weighed
+by q-value and specificity, not by substring.
+"""
+import base64
+
+import pytest
+
+TestClient = pytest.importorskip('fastapi.testclient').TestClient
+from starlette.requests import Request
+
+import main
+from helpers import chart_job, image_size
+from render_cache import RenderCache
+from render_pool import RenderPool
+
+def request_with(accept=None):
+    headers = [(b'accept', accept.encode())] if accept is not None else []
+    return Request({'type': 'http', 'method': 'POST', 'path': '/generate-chart', 'query_string': b'',
+                    'headers': headers})
+
+@pytest.mark.parametrize('accept, image', [
+    (None, False),
+    ('', False),
+    ('*/*', False),
+    ('application/json', False),
+    ('image/png', True),
+    ('image/*', True),
+    ('image/webp', True),
+    ('application/json, image/png', False),  # a tie keeps the default
+    ('application/json, image/png;q=0.1', False),
+    ('application/json;q=0.5, image/png', True),
+    ('image/png;q=0, */*', False),
+    ('image/*;q=0.9, application/*;q=0.5', True),
+    ('image/png;q=0.8, */*;q=0.9', False),
+    ('IMAGE/PNG; Q=1, application/json; q=0.2', True),
+    ('image/png;q=bogus, application/json;q=0.1', False),
+    ('text/html', False),
+])
+def test_accept_negotiation(accept, image):
+    assert main.wants_image(request_with(accept), None) is image
+
+@pytest.mark.parametrize('format, image', [
+    ('png', True), ('PNG', True), ('image/webp', True), ('json', False), ('gif', False),
+])
+def test_format_overrides_accept(format, image):
+    assert main.wants_image(request_with('application/json' if image else 'image/png'), format) is image
+
+@pytest.fixture(scope='module')
+def client():
+    # One real render worker; nothing served from the cache
+    pool, cache = main.render_pool, main.render_cache
+    main.render_pool, main.render_cache = RenderPool(size=1, queue_size=4), RenderCache(max_bytes=0)
+    try:
+        with TestClient(main.app) as client:
+            yield client
+    finally:
+        main.render_pool, main.render_cache = pool, cache
+
+def test_image_and_json_responses(client):
+    raw = client.post('/generate-chart', json=chart_job(), headers={'Accept': 'image/png'})
+    assert raw.status_code == 200
+    assert raw.headers['content-type'] == 'image/png'
+    assert raw.headers['x-chart-width'] == '400' and raw.headers['x-image-bytes'] == str(len(raw.content))
+    image_size(raw.content)  # a PNG
+
+    body = client.post('/generate-chart', json=chart_job(),
+                       headers={'Accept': 'application/json, image/png;q=0.1'}).json()
+    assert body['success'] and base64.b64decode(body['chart_image']) == raw.content
+
+    assert client.post('/generate-chart?format=png', json=chart_job()).headers['content-type'] == 'image/png'
@@ -0,0 +1,115 @@
+"""
+Parity tests: the vectorized indicators in utils.py must match the original
+loop implementations (tests/reference_indicators.py) to floating-point tolerance.
+"""
+import pytest
+
+import indicator_kernels
+import utils
+import reference_indicators as reference
+from helpers import assert_same, make_ohlcv
+
+SIZES = [1, 5, 30, 400, 2_000]
+
+@pytest.fixture(params=[
+    pytest.param({}, id='random-walk'),
+    pytest.param({'flat': True}, id='flat'),
+    pytest.param({'zero_volume': True}, id='zero-volume'),
+])
+def series(request):
+    return {n: make_ohlcv(n, **request.param) for n in SIZES}
+
+@pytest.mark.parametrize('n', SIZES)
+@pytest.mark.parametrize('k_period,d_period,slowing', [(14, 3, 1), (14, 3, 3), (5, 3, 5)])
+def test_stochastic(series, n, k_period, d_period, slowing):
+    high, low, close, _ = series[n]
+    actual = utils.calculate_stochastic(high, low, close, k_period, d_period, slowing)
+    expected = reference.calculate_stochastic(high, low, close, k_period, d_period, slowing)
+    assert_same(actual['k'], expected['k'])
+    assert_same(actual['d'], expected['d'])
+
+@pytest.mark.parametrize('n', SIZES)
+@pytest.mark.parametrize('period', [1, 14, 50])
+def test_williams_r(series, n, period):
+    high, low, close, _ = series[n]
+    assert_same(utils.calculate_williams_r(high, low, close, period),
+                reference.calculate_williams_r(high, low, close, period))
+
+@pytest.mark.parametrize('n', SIZES)
+@pytest.mark.parametrize('period', [2, 20])
+def test_cci(series, n, period):
+    high, low, close, _ = series[n]
+    assert_same(utils.calculate_cci(high, low, close, period),
+                reference.calculate_cci(high, low, close, period))
+
+@pytest.mark.parametrize('n', SIZES)
+@pytest.mark.parametrize('period', [1, 14])
+def test_mfi(series, n, period):
+    high, low, close, volume = series[n]
+    assert_same(utils.calculate_mfi(high, low, close, volume, period),
+                reference.calculate_mfi(high, low, close, volume, period))
+
+@pytest.mark.parametrize('n', SIZES)
+@pytest.mark.parametrize('period', [1, 9, 20])
+def test_wma(series, n, period):
+    _, _, close, _ = series[n]
+    assert_same(utils.calculate_wma(close, period), reference.calculate_wma(close, period))
+
+@pytest.mark.parametrize('n', SIZES)
+def test_obv(series, n):
+    _, _, close, volume = series[n]
+    assert_same(utils.calculate_obv(close, volume), reference.calculate_obv(close, volume))
+
+@pytest.mark.parametrize('n', SIZES)
+@pytest.mark.parametrize('period', [None, 1, 20])
+def test_vwap(series, n, period):
+    _, _, close, volume = series[n]
+    assert_same(utils.calculate_vwap(close, volume, period),
+                reference.calculate_vwap(close, volume, period))
+
+@pytest.mark.parametrize('n', [30, 400, 2_000])
+@pytest.mark.parametrize('period', [2, 14])
+def test_rsi(series, n, period):
+    _, _, close, _ = series[n]
+    assert_same(utils.calculate_rsi(close, period), reference.calculate_rsi(close, period))
+
+@pytest.mark.parametrize('n', [30, 400, 2_000])
+@pytest.mark.parametrize('period', [1, 14])
+def test_atr(series, n, period):
+    high, low, close, _ = series[n]
+    assert_same(utils.calculate_atr(high, low, close, period),
+                reference.calculate_atr(high, low, close, period))
+
+@pytest.mark.parametrize('n', [30, 400, 2_000])
+@pytest.mark.parametrize('period', [5, 14])
+def test_adx(series, n, period):
+    high, low, close, _ = series[n]
+    actual = utils.calculate_adx(high, low, close, period)
+    expected = reference.calculate_adx(high, low, close, period)
+    for key in ('adx', 'plus_di', 'minus_di'):
+        assert_same(actual[key], expected[key])
+
+@pytest.mark.parametrize('n', SIZES)
+@pytest.mark.parametrize('af_start,af_increment,af_max', [(0.02, 0.02, 0.2), (0.01, 0.05, 0.5)])
+def test_parabolic_sar(series, n, af_start, af_increment, af_max):
+    high, low, close, _ = series[n]
+    assert_same(utils.calculate_parabolic_sar(high, low, close, af_start, af_increment, af_max),
+                reference.calculate_parabolic_sar(high, low, close, af_start, af_increment, af_max))
+
+@pytest.mark.parametrize('n', [5, 14])
+def test_recursive_indicators_reject_short_series(n):
+    high, low, close, _ = make_ohlcv(n)
+    with pytest.raises(IndexError):
+        utils.calculate_rsi(close, 14)
+    with pytest.raises(IndexError):
+        utils.calculate_adx(high, low, close, 14)
+
+def test_compiled_kernels_match_python_fallback():
+    # With Numba installed, compare the compiled kernels to their Python source
+    high, low, close, _ = make_ohlcv(2_000)
+    for kernel, args in [
+        (indicator_kernels.wilder_average, (close, 14, 13, 1.0)),
+        (indicator_kernels.wilder_sum, (close, 14, 14, 1.0)),
+        (indicator_kernels.parabolic_sar, (high, low, 0.02, 0.02, 0.2)),
+    ]:
+        assert_same(kernel(*args), kernel.py_func(*args))
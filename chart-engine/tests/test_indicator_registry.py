@@ -0,0 +1,154 @@
+"""
+Registry tests: names, aliases and parameter defaults resolve the same way
+for every caller, indicators without enough bars are skipped, oscillator
+panels stack in registry order, and the API renderer, utils.add_indicators
+and generate_candlestick.py compute the same values. Computing a request's
+indicators through one shared ComputeContext must give the same values as
+computing each one standalone, while building every shared intermediate only
+once.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import generate_candlestick
+import utils
+from chart_renderer import compute_indicators
+from indicator_registry import (INDICATORS, ComputeContext, assign_panels, compute_indicator, get_indicator,
+                                oscillator_panels)
+from helpers import assert_same, make_frame, make_ohlcv
+from reference_indicators import calculate_atr, calculate_rsi
+
+def columns(n: int = 400):
+    high, low, close, volume = make_ohlcv(n)
+    return {'open': close, 'high': high, 'low': low, 'close': close, 'volume': volume}
+
+def test_shared_context_matches_standalone():
+    data = columns()
+    context = ComputeContext(data)
+    for spec in INDICATORS.values():
+        params = spec.resolve_params({})
+        shared = compute_indicator(spec, context, params)
+        standalone = compute_indicator(spec, ComputeContext(data), params)
+        assert shared.keys() == standalone.keys()
+        for column in shared:
+            assert_same(shared[column], standalone[column])
+
+def test_intermediates_are_computed_once():
+    context = ComputeContext(columns())
+    for name, params in [('ema', {'period': 12}), ('ema', {'period': 26}), ('macd', {}),
+                         ('sma', {}), ('bb', {}), ('atr', {}), ('adx', {}), ('cci', {}), ('mfi', {})]:
+        spec = get_indicator(name)
+        compute_indicator(spec, context, spec.resolve_params(params))
+
+    stats = context.stats()
+    assert stats['ema'] == {'computed': 2, 'reused': 2}
+    assert stats['sma'] == {'computed': 1, 'reused': 1}
+    assert stats['true_range'] == {'computed': 1, 'reused': 1}
+    assert stats['typical_price'] == {'computed': 1, 'reused': 1}
+
+def test_shared_true_range_matches_adx_and_atr():
+    high, low, close, _ = make_ohlcv(300)
+    tr = utils.true_range(high, low, close)
+    assert_same(utils.calculate_atr(high, low, close, 14, tr=tr), utils.calculate_atr(high, low, close, 14))
+    shared, own = utils.calculate_adx(high, low, close, 14, tr=tr), utils.calculate_adx(high, low, close, 14)
+    for key in own:
+        assert_same(shared[key], own[key])
+
+def test_memoized_arrays_are_not_mutated():
+    context = ComputeContext(columns())
+    before = context.sma('close', 20).copy()
+    compute_indicator(get_indicator('bb'), context, {'period': 20, 'std_dev': 2.0})
+    np.testing.assert_array_equal(context.sma('close', 20), before)
+
+def test_alias_lookup():
+    assert get_indicator('MA') is INDICATORS['sma']
+    assert get_indicator('Bollinger') is INDICATORS['bb']
+    assert get_indicator('williams%r') is get_indicator('williams_r') is INDICATORS['williamsr']
+    assert get_indicator('macdSignal') is INDICATORS['macd']
+    assert get_indicator('nope') is None
+
+def test_resolve_params():
+    bb, macd = get_indicator('bb'), get_indicator('macd')
+    assert bb.resolve_params(None) == {'period': 20, 'std_dev': 2.0}
+    assert bb.resolve_params({'stdDev': 3, 'color': 'red'}) == {'period': 20, 'std_dev': 3}
+    # The canonical name wins over an alias
+    assert bb.resolve_params({'std_dev': 1.5, 'stdDev': 3})['std_dev'] == 1.5
+    assert macd.resolve_params({'fast': 5, 'slowPeriod': 30}) == {'fast_period': 5, 'slow_period': 30,
+                                                                  'signal_period': 9}
+    assert get_indicator('ema').columns(get_indicator('ema').resolve_params({})) == {'ema': 'ema_20'}
+
+def test_too_few_bars_are_skipped():
+    requested = {'sma': {'period': 50}, 'adx': {}, 'rsi': {}}
+    df = make_frame(20)
+    computed = compute_indicators(df, requested)
+    assert [spec.name for spec, _, _ in computed] == ['rsi']
+    assert 'rsi' in df and 'sma_50' not in df and 'adx' not in df
+
+    script_df = utils.add_indicators(make_frame(20), [{'type': name, 'params': params}
+                                                      for name, params in requested.items()])
+    assert 'rsi' in script_df and 'sma_50' not in script_df and 'adx' not in script_df
+
+@pytest.mark.parametrize('separate, expected', [(True, {'macd': 2, 'rsi': 3, 'adx': 4}),
+                                                (False, {'macd': 2, 'rsi': 2, 'adx': 2})])
+def test_assign_panels(separate, expected):
+    specs = [get_indicator(name) for name in ('adx', 'sma', 'rsi', 'macd', 'bb')]
+    assert assign_panels(specs, 2, separate) == expected
+    assert oscillator_panels().index('macd') < oscillator_panels().index('rsi') < oscillator_panels().index('adx')
+
+# Two requests, as the API computes at most 8 indicators per request
+REQUESTS = [
+    {'sma': {}, 'ema': {}, 'bb': {'stdDev': 2.5}, 'psar': {}, 'macd': {'fast': 8}, 'rsi': {}, 'atr': {}, 'adx': {}},
+    {'stochastic': {}, 'williamsr': {}, 'cci': {}, 'mfi': {}, 'obv': {}, 'vwap': {}, 'wma': {'period': 10}},
+]
+
+class Plotted(Exception):
+    """Stops generate_candlestick.render_job once its indicators are ready to plot"""
+
+def script_indicators(df, requested, monkeypatch):
+    """What generate_candlestick.render_job computes and picks for plotting, without drawing"""
+    captured = {}
+
+    def build_addplots(frame, computed, first_panel):
+        captured['df'], captured['computed'] = frame, computed
+        raise Plotted
+
+    monkeypatch.setattr(generate_candlestick, 'build_addplots', build_addplots)
+    candles = [{'time': int(stamp.value // 1_000_000), **row} for stamp, row in zip(df.index, df.to_dict('records'))]
+    with pytest.raises(Plotted):
+        generate_candlestick.render_job({'candles': candles, 'indicators': [{'type': name, 'params': params}
+                                                                              for name, params in requested.items()]})
+    return captured['df'], captured['computed']
+
+@pytest.mark.parametrize('requested', REQUESTS)
+def test_entry_points_agree(requested, monkeypatch):
+    api_df = make_frame(200)
+    api = compute_indicators(api_df, requested)
+    utils_df = utils.add_indicators(make_frame(200), [{'type': name, 'params': params}
+                                                      for name, params in requested.items()])
+    script_df, script = script_indicators(make_frame(200), requested, monkeypatch)
+
+    assert [spec.name for spec, _, _ in api] == [spec.name for spec, _, _ in script] == list(requested)
+    for spec, columns, raw_params in api:
+        # The API hides warm-up bars; past them every caller has the same numbers
+        warmup = spec.warmup(spec.resolve_params(raw_params))
+        for column in columns.values():
+            assert_same(api_df[column].to_numpy()[warmup:], utils_df[column].to_numpy()[warmup:])
+            assert_same(script_df[column].to_numpy(), utils_df[column].to_numpy())
+
+def test_script_plots_the_default_ema(monkeypatch):
+    # It used to look for ema_12 while utils computed ema_20, and never drew it
+    script_df, script = script_indicators(make_frame(60), {'ema': {}}, monkeypatch)
+    assert [columns for _, columns, _ in script] == [{'ema': 'ema_20'}]
+    assert script_df['ema_20'].notna().all()
+
+def test_api_rsi_and_atr_use_wilder_smoothing():
+    df = make_frame(200)
+    compute_indicators(df, {'rsi': {}, 'atr': {}})
+    high, low, close = (df[column].to_numpy() for column in ('high', 'low', 'close'))
+    assert_same(df['rsi'].to_numpy()[14:], calculate_rsi(close, 14)[14:])
+    assert_same(df['atr'].to_numpy()[13:], calculate_atr(high, low, close, 14)[13:])
+    # Not the simple rolling mean of true range the API used before
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - np.roll(close, 1)), np.abs(low - np.roll(close, 1))))
+    rolling = pd.Series(true_range).rolling(14).mean().to_numpy()
+    assert not np.allclose(df['atr'].to_numpy()[20:], rolling[20:])
@@ -0,0 +1,45 @@
+"""
+Indicator value tests: the chartless path returns exactly the columns the
+renderer plots, and every output encoding round-trips.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from chart_renderer import compute_indicators
+from indicator_values import encode_raw, indicator_output, pa
+from helpers import make_frame
+
+INDICATORS = {'sma': {'period': 10}, 'bb': {}, 'macd': {}, 'rsi': {}, 'psar': {}, 'adx': {}, 'unknown': {}}
+
+def frame_columns(df):
+    return {'t': df.index.as_unit('ms').asi8, 'o': df['open'].to_numpy(), 'h': df['high'].to_numpy(),
+            'l': df['low'].to_numpy(), 'c': df['close'].to_numpy(), 'v': df['volume'].to_numpy()}
+
+def test_json_matches_the_rendered_columns():
+    df = make_frame(150)
+    body, names, _ = indicator_output(frame_columns(df), INDICATORS)
+    compute_indicators(df, INDICATORS)
+    result = json.loads(body)
+    assert names == ['t'] + list(result['columns'])
+    assert result['t'] == df.index.as_unit('ms').asi8.tolist()
+    assert [entry['name'] for entry in result['indicators']] == ['sma', 'bb', 'macd', 'rsi', 'psar', 'adx']
+    for name, values in result['columns'].items():
+        expected = df[name].to_numpy()
+        assert [value is None for value in values] == np.isnan(expected).tolist()
+        np.testing.assert_array_equal(np.array(values, dtype=np.float64), expected)
+
+def test_raw_layout():
+    t = np.array([1_000, 2_000, 3_000], dtype=np.int64)
+    values = {'a': np.array([np.nan, 1.0, 2.0]), 'b': np.array([3.0, 4.0, 5.0])}
+    block = np.frombuffer(encode_raw(t, values), dtype='<f8').reshape(3, 3)
+    np.testing.assert_array_equal(block[0], t)
+    np.testing.assert_array_equal(block[1:], [values['a'], values['b']])
+
+@pytest.mark.skipif(pa is None, reason="pyarrow not installed")
+def test_arrow_round_trip():
+    df = make_frame(60)
+    body, names, _ = indicator_output(frame_columns(df), {'ema': {'period': 5}}, 'arrow')
+    table = pa.ipc.open_stream(body).read_all()
+    assert table.column_names == names
@@ -0,0 +1,77 @@
+"""
+Metrics tests: counters, gauges and histograms render in the Prometheus
+text exposition format.
+"""
+import pytest
+
+from metrics import Counter, Gauge, Histogram, Metric, Registry, process_rss
+
+def test_text_format():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests", ("chart_type",)))
+    requests.inc(chart_type="candle")
+    requests.inc(2, chart_type='li"ne')
+    registry.register(Gauge("queue_depth", "Waiting jobs", callback=lambda: 3))
+    registry.register(Gauge("rss_bytes", "RSS", ("process",), callback=lambda: {("api",): 1024, ("gone",): None}))
+    stages = registry.register(Histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0)))
+    for seconds in (0.05, 0.5, 2.0):
+        stages.observe(seconds, stage="render")
+
+    assert registry.render().splitlines() == [
+        '# HELP requests_total Requests',
+        '# TYPE requests_total counter',
+        'requests_total{chart_type="candle"} 1',
+        'requests_total{chart_type="li\\"ne"} 2',
+        '# HELP queue_depth Waiting jobs',
+        '# TYPE queue_depth gauge',
+        'queue_depth 3',
+        '# HELP rss_bytes RSS',
+        '# TYPE rss_bytes gauge',
+        'rss_bytes{process="api"} 1024',
+        '# HELP stage_seconds Stage time',
+        '# TYPE stage_seconds histogram',
+        'stage_seconds_bucket{stage="render",le="0.1"} 1',
+        'stage_seconds_bucket{stage="render",le="1"} 2',
+        'stage_seconds_bucket{stage="render",le="+Inf"} 3',
+        'stage_seconds_sum{stage="render"} 2.55',
+        'stage_seconds_count{stage="render"} 3',
+    ]
+
+def test_label_names_are_checked():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests", ("chart_type",)))
+    with pytest.raises(ValueError):
+        requests.inc(style="dark")
+    with pytest.raises(ValueError):
+        registry.register(Counter("requests_total", "Requests again"))
+
+def test_metric_types_must_define_samples():
+    class Summary(Metric):
+        type = 'summary'
+
+    with pytest.raises(TypeError):
+        Summary("latency", "Latency")
+
+def test_default_chart_observes_encode(monkeypatch):
+    TestClient = pytest.importorskip('fastapi.testclient').TestClient
+    import main
+    from helpers import chart_job
+    from render_cache import RenderCache
+    from render_pool import RenderPool
+
+    def encodes():
+        return sum(value for name, labels, value in main.STAGE_SECONDS.samples()
+                   if name.endswith('_count') and labels == {'endpoint': '/generate-chart', 'stage': 'encode'})
+
+    monkeypatch.setattr(main, 'render_pool', RenderPool(size=1, queue_size=4))
+    monkeypatch.setattr(main, 'render_cache', RenderCache(max_bytes=0))
+    with TestClient(main.app) as client:
+        before = encodes()
+        assert client.post('/generate-chart', json=chart_job(), headers={'Accept': 'image/png'}).status_code == 200
+        assert encodes() == before + 1  # the PNG, encoded apart from the render
+        body = client.post('/generate-chart', json=chart_job()).json()
+        assert body['encode_time'] is not None
+        assert encodes() == before + 3  # the PNG and its base64
+
+def test_process_rss():
+    assert process_rss() > 0
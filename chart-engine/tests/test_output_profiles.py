@@ -0,0 +1,45 @@
+"""
+Output profile tests: sizes fit the profile's pixel budget, every format
+encodes, and profiled renders come back at the reported size and format.
+"""
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from chart_renderer import render_chart
+from output_profiles import PROFILES, encode, get_profile
+from helpers import make_frame
+
+def test_sizes_fit_the_budget():
+    for profile in PROFILES.values():
+        width, height = profile.size(2400, 1600)
+        assert width <= profile.max_width and height <= profile.max_height
+        assert not profile.max_pixels or width * height <= profile.max_pixels
+        assert abs(width / height - 1.5) < 0.01
+    assert get_profile('archive').size(1200, 800) == (2400, 1600)
+    assert get_profile('dashboard').size(1200, 800) == (1200, 800)
+    with pytest.raises(ValueError):
+        get_profile('poster')
+
+@pytest.mark.parametrize('image_format,mode', [('png', 'P'), ('webp', 'RGB'), ('jpeg', 'RGB')])
+def test_encode_formats(image_format, mode):
+    pixels = np.zeros((60, 80, 4), dtype=np.uint8)
+    pixels[..., 3] = 255
+    pixels[10:30, 20:40, 0] = 200
+    image = Image.open(BytesIO(encode(Image.fromarray(pixels, mode='RGBA'), get_profile('llm-compact'),
+                                      image_format)))
+    assert image.format == image_format.upper() and image.size == (80, 60) and image.mode == mode
+
+@pytest.mark.parametrize('renderer', ['mplfinance', 'raster'])
+def test_profiled_render(renderer):
+    df = make_frame(120).reset_index()
+    df['datetime'] = df['datetime'].astype(str)
+    result = render_chart({'data': df.to_dict('records'), 'indicators': {'sma': {}, 'rsi': {}}, 'width': 1600,
+                           'height': 1200, 'renderer': renderer, 'profile': 'llm-compact', 'image_format': 'webp'})
+    image = Image.open(BytesIO(result['image']))
+    assert image.format == 'WEBP' and result['image_format'] == 'webp'
+    assert image.size == (result['width'], result['height'])
+    assert result['width'] * result['height'] <= get_profile('llm-compact').max_pixels
+    assert result['timings']['encode'] is not None
@@ -0,0 +1,44 @@
+"""
+Profiling tests: both report modes name the profiled code, and the flag is
+checked before anything is rendered.
+"""
+import time
+
+import pytest
+
+import profiling
+from profiling import ProfilingError, profile_call, profiling_spec
+
+def busy(seconds=0.05):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+    return 'chart'
+
+def test_top_functions():
+    result, report = profile_call(busy, 'top', top=3)
+    assert result == 'chart'
+    assert len(report['functions']) == 3
+    assert any('test_profiling.py' in entry['function'] and '(busy)' in entry['function']
+               for entry in profile_call(busy, 'top', top=50)[1]['functions'])
+    self_times = [entry['self_time'] for entry in report['functions']]
+    assert self_times == sorted(self_times, reverse=True)
+
+def test_collapsed_stacks():
+    result, report = profile_call(busy, 'collapsed')
+    assert result == 'chart'
+    assert report['samples'] > 0
+    stacks = [line.rsplit(' ', 1) for line in report['collapsed'].splitlines()]
+    assert sum(int(count) for _, count in stacks) == report['samples']
+    assert any('busy (test_profiling.py:' in stack for stack, _ in stacks)
+
+def test_spec(monkeypatch):
+    monkeypatch.setattr(profiling, 'ENABLED', False)
+    assert profiling_spec(None) is None
+    with pytest.raises(ProfilingError):
+        profiling_spec('top')  # disabled
+    monkeypatch.setattr(profiling, 'ENABLED', True)
+    assert profiling_spec('collapsed', '10') == {'mode': 'collapsed', 'top': 10}
+    for mode, top in (('flame', None), ('top', 'many')):
+        with pytest.raises(ProfilingError):
+            profiling_spec(mode, top)
@@ -0,0 +1,33 @@
+"""
+Raster renderer tests: every chart type renders to a PNG of exactly the
+requested size, with and without indicators.
+"""
+import pytest
+
+from chart_renderer import compute_indicators, render_chart
+from raster_renderer import render_raster
+from helpers import image_size, make_frame
+
+@pytest.mark.parametrize('chart_type', ['candle', 'ohlc', 'line', 'hollow_and_filled'])
+def test_chart_types(chart_type):
+    df = make_frame(400)
+    computed = compute_indicators(df, {'sma': {}, 'bb': {}, 'psar': {}, 'macd': {}, 'rsi': {}, 'adx': {}})
+    assert image_size(render_raster(df, computed, 1200, 800, chart_type)) == (1200, 800)
+
+@pytest.mark.parametrize('n', [1, 5, 60])
+def test_short_series(n):
+    df = make_frame(n)
+    computed = compute_indicators(df, {'rsi': {}, 'ema': {}})
+    assert image_size(render_raster(df, computed, 640, 480)) == (640, 480)
+
+def test_shared_oscillator_panel():
+    df = make_frame(200)
+    computed = compute_indicators(df, {'rsi': {}, 'stochastic': {}})
+    assert image_size(render_raster(df, computed, 800, 600, separate_oscillators=False)) == (800, 600)
+
+def test_render_chart_job():
+    df = make_frame(100).reset_index()
+    df['datetime'] = df['datetime'].astype(str)
+    result = render_chart({'data': df.to_dict('records'), 'indicators': {'sma': {}}, 'width': 900,
+                           'height': 500, 'chart_type': 'candle', 'renderer': 'raster'})
+    assert image_size(result['image']) == (900, 500)
@@ -0,0 +1,73 @@
+"""
+Render cache tests: least-recently-used eviction within the byte budget,
+TTL expiry, disabled settings, and request keys that ignore key order but
+not indicator order.
+"""
+import pytest
+
+import render_cache
+from render_cache import RenderCache, request_key
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(render_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_lru_eviction_within_the_byte_budget():
+    cache = RenderCache(max_bytes=30, ttl=60)
+    for key in 'abc':
+        cache.put(key, {'image': key}, 10)
+    assert cache.get('a') == {'image': 'a'}  # b is now the least recently used
+    cache.put('d', {'image': 'd'}, 10)
+    assert cache.get('b') is None
+    assert [key for key in 'acd' if cache.get(key)] == ['a', 'c', 'd']
+
+    cache.put('e', {'image': 'e'}, 25)  # evicts until it fits
+    assert cache.get('e') is not None and cache.get('d') is None
+    cache.put('huge', {'image': 'huge'}, 31)  # larger than the whole budget: not cached
+    assert cache.get('huge') is None and cache.get('e') is not None
+
+    stats = cache.stats()
+    assert stats['entries'] == 1 and stats['bytes'] == 25 and stats['evictions'] == 4
+
+def test_replacing_an_entry_keeps_the_byte_count():
+    cache = RenderCache(max_bytes=100, ttl=60)
+    cache.put('a', {'image': 1}, 40)
+    cache.put('a', {'image': 2}, 30)
+    assert cache.get('a') == {'image': 2}
+    assert cache.stats()['bytes'] == 30
+
+def test_ttl_expiry(clock):
+    cache = RenderCache(max_bytes=100, ttl=60)
+    cache.put('a', {'image': 'a'}, 10)
+    clock[0] += 60
+    assert cache.get('a') is not None
+    clock[0] += 1
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert stats['expirations'] == 1 and stats['entries'] == 0 and stats['bytes'] == 0
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+@pytest.mark.parametrize('max_bytes,ttl', [(0, 60), (100, 0)])
+def test_disabled(max_bytes, ttl):
+    cache = RenderCache(max_bytes=max_bytes, ttl=ttl)
+    assert not cache.enabled
+    cache.put('a', {'image': 'a'}, 1)
+    assert cache.get('a') is None and cache.stats()['entries'] == 0
+
+def test_disabled_from_the_environment(monkeypatch):
+    monkeypatch.setenv('CHART_ENGINE_CACHE_MAX_BYTES', '0')
+    assert not RenderCache().enabled
+
+def test_request_key_ignores_key_order_but_not_indicator_order():
+    job = {'chart_type': 'candle', 'width': 1200, 'data': [{'datetime': '2024-01-01', 'open': 1.0, 'close': 2.0}],
+           'indicators': {'sma': {'period': 20, 'color': 'blue'}, 'rsi': {'period': 14}}}
+    reordered = {'indicators': {'sma': {'color': 'blue', 'period': 20}, 'rsi': {'period': 14}},
+                 'data': [{'close': 2.0, 'datetime': '2024-01-01', 'open': 1.0}], 'width': 1200, 'chart_type': 'candle'}
+    assert request_key(reordered) == request_key(job)
+    assert request_key(dict(job)) == request_key(job)  # stable across calls
+
+    swapped = {**job, 'indicators': {'rsi': {'period': 14}, 'sma': {'period': 20, 'color': 'blue'}}}
+    assert request_key(swapped) != request_key(job)
+    assert request_key({**job, 'width': 800}) != request_key(job)
@@ -0,0 +1,133 @@
+"""
+Render pool tests: one job per worker, a bounded queue, a worker stays busy
+until its job ends even if the caller goes away, failed jobs count towards
+recycling, and when a worker is due for recycling.
+"""
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from render_pool import RenderPool, RenderQueueFull, RenderWorker
+
+class SlowWorker:
+    """Stands in for a worker process: a job runs until released"""
+    jobs_completed = 0
+    figures = None
+    pid = None
+
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    async def run(self, fn, *args):
+        await self.release.wait()
+        return fn(*args)
+
+def stub_pool(queue_size, workers=1):
+    """A started pool of SlowWorkers that are never recycled (call from a running loop)"""
+    pool = RenderPool(size=workers, queue_size=queue_size)
+    pool.max_jobs = pool.max_rss = pool.max_figures = 0
+    pool._workers = [SlowWorker() for _ in range(workers)]
+    pool._idle = asyncio.Queue()
+    for worker in pool._workers:
+        pool._idle.put_nowait(worker)
+    return pool
+
+def test_one_job_per_worker_and_a_bounded_queue():
+    async def main():
+        pool = stub_pool(queue_size=2, workers=2)
+        jobs = [asyncio.ensure_future(pool.submit(lambda i=i: i)) for i in range(4)]
+        await asyncio.sleep(0)
+        assert pool.in_flight == 2 and pool.queue_depth == 2
+        with pytest.raises(RenderQueueFull):
+            await pool.submit(lambda: 'rejected')
+
+        for worker in pool._workers:
+            worker.release.set()
+        assert await asyncio.gather(*jobs) == [0, 1, 2, 3]
+        assert pool.in_flight == pool.queue_depth == 0 and pool._idle.qsize() == 2
+
+    asyncio.run(main())
+
+def test_queue_size_zero_only_runs_on_a_free_worker():
+    async def main():
+        pool = stub_pool(queue_size=0)
+        assert pool.queue_size == 0
+        job = asyncio.ensure_future(pool.submit(lambda: 'ran'))
+        await asyncio.sleep(0)
+        with pytest.raises(RenderQueueFull):
+            await pool.submit(lambda: 'rejected')
+        pool._workers[0].release.set()
+        assert await job == 'ran'
+
+    asyncio.run(main())
+    with pytest.raises(ValueError):
+        RenderPool(size=0)
+
+def test_worker_reports_its_pid():
+    worker = RenderWorker(0)
+    try:
+        assert worker.pid is None
+        asyncio.run(worker.warm_up())
+        assert worker.pid is not None and worker.pid != os.getpid()
+    finally:
+        worker.shutdown()
+
+def test_failed_jobs_count_towards_recycling():
+    worker = RenderWorker(0)
+
+    async def main():
+        await worker.warm_up()
+        assert worker.jobs_completed == 1
+        with pytest.raises(ValueError):
+            await worker.run(int, 'not a number')
+        assert worker.jobs_completed == 2
+        # A dead process is restarted instead, starting the count afresh
+        with pytest.raises(BrokenProcessPool):
+            await worker.run(os._exit, 1)
+        assert worker.jobs_completed == 0
+
+    try:
+        asyncio.run(main())
+    finally:
+        worker.shutdown()
+
+def test_recycle_reason(monkeypatch):
+    monkeypatch.setenv("CHART_ENGINE_WORKER_MAX_JOBS", "3")
+    monkeypatch.setenv("CHART_ENGINE_WORKER_MAX_FIGURES", "2")
+    pool = RenderPool(size=1)
+    worker = RenderWorker(0)  # no process until its first job
+    try:
+        assert pool.recycle_reason(worker) is None
+        worker.figures = 3
+        assert pool.recycle_reason(worker) == "3 live figures"
+        worker.jobs_completed = 3
+        assert pool.recycle_reason(worker) == "3 jobs"
+
+        pool.max_jobs = pool.max_figures = 0
+        assert pool.recycle_reason(worker) is None
+    finally:
+        worker.shutdown()
+
+def test_cancelled_caller_keeps_the_worker_busy():
+    async def main():
+        pool = stub_pool(queue_size=1)
+        worker = pool._workers[0]
+
+        caller = asyncio.ensure_future(pool.submit(lambda: 'first'))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.sleep(0)
+        assert pool.in_flight == 1 and pool._idle.empty()
+
+        waiter = asyncio.ensure_future(pool.submit(lambda: 'second'))
+        await asyncio.sleep(0)
+        with pytest.raises(RenderQueueFull):
+            await pool.submit(lambda: 'third')
+
+        worker.release.set()
+        assert await waiter == 'second'
+        assert pool.in_flight == 0 and pool._idle.qsize() == 1
+
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""
+Resampling tests: the vectorized resampler must match pandas' OHLCV
+resample (including gaps), and the series store must resample each
+(series, timeframe) once.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from resampling import ResampleError, SeriesStore, UnknownSeries, resample, to_columns, TIMEFRAMES
+from helpers import minute_series
+
+def pandas_resample(columns, timeframe: str):
+    df = pd.DataFrame({key: columns[key] for key in 'ohlcv'},
+                      index=pd.to_datetime(columns['t'], unit='ms'))
+    rule = timeframe[:-1] + {'m': 'min', 'h': 'h', 'd': 'D'}[timeframe[-1]]
+    out = df.resample(rule).agg({'o': 'first', 'h': 'max', 'l': 'min', 'c': 'last', 'v': 'sum'}).dropna()
+    return out.index.as_unit('ms').asi8, out
+
+@pytest.mark.parametrize('timeframe', ['5m', '15m', '1h', '4h', '1d'])
+@pytest.mark.parametrize('gaps', [False, True])
+def test_matches_pandas(timeframe, gaps):
+    columns = minute_series(3000, gaps)
+    expected_t, expected = pandas_resample(columns, timeframe)
+    result = resample(columns, TIMEFRAMES[timeframe])
+    np.testing.assert_array_equal(result['t'], expected_t)
+    for key in 'ohlcv':
+        np.testing.assert_allclose(result[key], expected[key].to_numpy())
+
+def test_to_columns_sorts_and_drops_duplicates():
+    columns = to_columns([3000, 1000, 2000, 1000], [3, 1, 2, 9], [3, 1, 2, 9], [3, 1, 2, 9], [3, 1, 2, 9],
+                         [1, 1, 1, 1])
+    np.testing.assert_array_equal(columns['t'], [1000, 2000, 3000])
+    np.testing.assert_array_equal(columns['c'], [9, 2, 3])
+    iso = to_columns(['2024-01-01T00:00:00Z', '2024-01-01T00:01:00Z'], [1, 2], [1, 2], [1, 2], [1, 2], [1, 1])
+    np.testing.assert_array_equal(iso['t'], [1_704_067_200_000, 1_704_067_260_000])
+
+def test_store_resamples_each_timeframe_once():
+    store = SeriesStore()
+    series = store.put(minute_series(2000))
+    assert store.put(minute_series(2000)) == series
+    first = store.get(series, '15m')
+    assert store.get(series, '15m') is first
+    assert store.get(series, '1m') is store.get(series)
+    assert store.stats()['resamples'] == 1
+
+def test_store_errors():
+    store = SeriesStore()
+    series = store.put(resample(minute_series(600), TIMEFRAMES['5m']))
+    with pytest.raises(ResampleError):
+        store.get(series, '1m')  # finer than the upload
+    with pytest.raises(ResampleError):
+        store.get(series, '7m')
+    with pytest.raises(UnknownSeries):
+        store.get('missing', '1h')
+
+def test_store_evicts_least_recently_used():
+    base = minute_series(1000)
+    store = SeriesStore(max_bytes=3 * sum(values.nbytes for values in base.values()) // 2)
+    first = store.put(base)
+    store.get(first, '5m')
+    second = store.put(minute_series(1000, gaps=True))
+    with pytest.raises(UnknownSeries):
+        store.get(first, '1h')
+    store.get(second, '1h')
+    assert store.stats()['evictions'] >= 1
@@ -0,0 +1,113 @@
+"""
+Single-flight tests: concurrent calls with one key share one execution and
+its result or exception; a caller going away doesn't cancel the others, but
+the last one going away cancels the call.
+"""
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    runs = []
+
+    async def work(key):
+        runs.append(key)
+        await asyncio.sleep(0.01)
+        return f"chart {key}"
+
+    async def main():
+        return await asyncio.gather(*(flights.do(key, lambda key=key: work(key)) for key in 'aaab'))
+
+    results = asyncio.run(main())
+    assert runs == ['a', 'b']
+    assert [chart for chart, _ in results] == ['chart a'] * 3 + ['chart b']
+    assert [coalesced for _, coalesced in results] == [False, True, True, False]
+    assert flights.stats() == {'in_flight': 0, 'leaders': 2, 'coalesced': 2}
+
+def test_exceptions_reach_every_caller():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("render failed")
+
+    async def main():
+        return await asyncio.gather(flights.do('a', fail), flights.do('a', fail), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(main())] == [ValueError, ValueError]
+    assert flights.stats()['in_flight'] == 0
+
+def test_leader_cancellation_spares_waiters():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return 'chart'
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do('a', work))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flights.do('a', work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == ('chart', True)
+
+def test_waiter_cancellation_spares_leader():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return 'chart'
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do('a', work))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flights.do('a', work))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(main()) == ('chart', False)
+
+def test_last_caller_going_away_cancels_the_call():
+    flights = SingleFlight()
+    runs, cancelled = [], []
+
+    async def work():
+        runs.append('a')
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append('a')
+            raise
+        return 'chart'
+
+    async def main():
+        callers = [asyncio.ensure_future(flights.do('a', work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        callers[0].cancel()
+        await asyncio.sleep(0)
+        assert cancelled == []  # the other caller still wants it
+        callers[1].cancel()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert [type(result) for result in results] == [asyncio.CancelledError] * 2
+        assert cancelled == ['a']
+        assert flights.stats()['in_flight'] == 0
+        # A later call with the key runs the work again
+        retry = asyncio.ensure_future(flights.do('a', work))
+        await asyncio.sleep(0)
+        retry.cancel()
+        await asyncio.gather(retry, return_exceptions=True)
+
+    asyncio.run(main())
+    assert runs == ['a', 'a']
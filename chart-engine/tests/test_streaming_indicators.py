@@ -0,0 +1,118 @@
+"""
+Streaming indicators must reproduce the batch functions in utils.py, and
+survive a snapshot/restore round trip mid-stream.
+"""
+import json
+
+import numpy as np
+import pytest
+
+import utils
+import streaming_indicators as streaming
+from helpers import assert_same, make_ohlcv
+
+N = 300
+
+def candles(high, low, close, volume):
+    return [{'open': c, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for h, l, c, v in zip(high.tolist(), low.tolist(), close.tolist(), volume.tolist())]
+
+def run(indicator, bars, restore_at=None):
+    """Feed bars one by one, optionally snapshotting/restoring (through JSON) part way"""
+    outputs = []
+    for i, bar in enumerate(bars):
+        if i == restore_at:
+            indicator = streaming.restore_indicator(json.loads(json.dumps(indicator.snapshot())))
+        outputs.append(indicator.update(bar))
+    return outputs
+
+def column(outputs, key=None):
+    return np.array([o[key] if key else o for o in outputs], dtype=float)
+
+@pytest.fixture(params=[{}, {'flat': True}, {'zero_volume': True}], ids=['random-walk', 'flat', 'zero-volume'])
+def series(request):
+    high, low, close, volume = make_ohlcv(N, **request.param)
+    return high, low, close, volume, candles(high, low, close, volume)
+
+@pytest.mark.parametrize('restore_at', [None, 7, 150])
+def test_sma_ema(series, restore_at):
+    _, _, close, _, bars = series
+    assert_same(column(run(streaming.SMAState(20), bars, restore_at)), utils.calculate_sma(close, 20))
+    assert_same(column(run(streaming.EMAState(12), bars, restore_at)), utils.calculate_ema(close, 12))
+
+@pytest.mark.parametrize('restore_at', [None, 5, 150])
+def test_rsi_matches_batch_on_history_so_far(series, restore_at):
+    _, _, close, _, bars = series
+    outputs = column(run(streaming.RSIState(14), bars, restore_at))
+    # utils.calculate_rsi looks one bar ahead, so compare with the batch value for
+    # the last bar of each prefix
+    expected = [0.0] * 14 + [utils.calculate_rsi(close[:i + 1], 14)[-1] for i in range(14, N)]
+    assert_same(outputs, expected)
+
+@pytest.mark.parametrize('restore_at', [None, 3, 150])
+def test_atr_adx(series, restore_at):
+    high, low, close, _, bars = series
+    assert_same(column(run(streaming.ATRState(14), bars, restore_at)), utils.calculate_atr(high, low, close, 14))
+    adx = run(streaming.ADXState(14), bars, restore_at)
+    expected = utils.calculate_adx(high, low, close, 14)
+    for key in ('adx', 'plus_di', 'minus_di'):
+        assert_same(column(adx, key), expected[key])
+
+@pytest.mark.parametrize('restore_at', [None, 10, 150])
+def test_macd_bollinger(series, restore_at):
+    _, _, close, _, bars = series
+    macd = run(streaming.MACDState(12, 26, 9), bars, restore_at)
+    expected = utils.calculate_macd(close, 12, 26, 9)
+    assert_same(column(macd, 'macd'), expected['macd'])
+    assert_same(column(macd, 'signal'), expected['signal'])
+    assert_same(column(macd, 'histogram'), expected['histogram'])
+
+    bands = run(streaming.BollingerState(20, 2.0), bars, restore_at)
+    expected = utils.calculate_bollinger_bands(close, 20, 2.0)
+    for key in ('middle', 'upper', 'lower'):
+        np.testing.assert_allclose(column(bands, key), expected[key], rtol=1e-9, atol=1e-7, equal_nan=True)
+
+@pytest.mark.parametrize('slowing', [1, 3])
+@pytest.mark.parametrize('restore_at', [None, 12, 150])
+def test_stochastic(series, slowing, restore_at):
+    high, low, close, _, bars = series
+    outputs = run(streaming.StochasticState(14, 3, slowing), bars, restore_at)
+    expected = utils.calculate_stochastic(high, low, close, 14, 3, slowing)
+    assert_same(column(outputs, 'k'), expected['k'])
+    assert_same(column(outputs, 'd'), expected['d'])
+
+@pytest.mark.parametrize('restore_at', [None, 1, 150])
+def test_obv_vwap(series, restore_at):
+    _, _, close, volume, bars = series
+    assert_same(column(run(streaming.OBVState(), bars, restore_at)), utils.calculate_obv(close, volume))
+    for period in (None, 20):
+        assert_same(column(run(streaming.VWAPState(period), bars, restore_at)),
+                    utils.calculate_vwap(close, volume, period))
+
+@pytest.mark.parametrize('restore_at', [None, 2, 150])
+def test_psar(series, restore_at):
+    high, low, close, _, bars = series
+    outputs = column(run(streaming.PSARState(), bars, restore_at))
+    expected = utils.calculate_parabolic_sar(high, low, close)
+    # A one-bar history has no SAR; from the second bar on it matches the full series
+    assert outputs[0] == 0.0
+    assert_same(outputs[1:], expected[1:])
+
+def test_indicator_set_round_trip(series):
+    _, _, _, _, bars = series
+    live = streaming.IndicatorSet({'rsi': streaming.RSIState(), 'macd': streaming.MACDState()})
+    for bar in bars[:100]:
+        live.update(bar)
+    restored = streaming.IndicatorSet.restore(json.loads(json.dumps(live.snapshot())))
+    for bar in bars[100:]:
+        assert live.update(bar) == restored.update(bar)
+
+def test_indicators_must_define_update():
+    class HalfDone(streaming.StreamingIndicator):
+        kind = 'half'
+
+        def params(self):
+            return {}
+
+    with pytest.raises(TypeError):
+        HalfDone()
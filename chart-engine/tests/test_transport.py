@@ -0,0 +1,51 @@
+"""
+Transport tests: binary bodies decode to the same normalized columns as
+their JSON form, and unsupported content types are refused.
+"""
+import json
+
+import numpy as np
+import pytest
+
+import transport
+from resampling import to_columns
+from helpers import minute_series
+
+def assert_columns_equal(result, expected):
+    for key in 'tohlcv':
+        np.testing.assert_array_equal(result[key], expected[key])
+
+def test_content_types():
+    assert transport.transport(None) == 'json'
+    assert transport.transport('application/json; charset=utf-8') == 'json'
+    with pytest.raises(transport.UnsupportedMediaType):
+        transport.transport('text/csv')
+
+@pytest.mark.skipif(transport.msgpack is None, reason="msgpack not installed")
+def test_msgpack_typed_arrays():
+    columns = minute_series(50)
+    data = {key: transport.typed_array(values) for key, values in columns.items()}
+    data['v'] = columns['v'].tolist()  # plain lists still work
+    fields, decoded = transport.decode_request(transport.msgpack.packb({'data': data, 'width': 800}), 'msgpack')
+    assert fields == {'width': 800}
+    assert_columns_equal(decoded, columns)
+    # Candle lists are left for model validation
+    fields, decoded = transport.decode_request(transport.msgpack.packb({'data': [{'open': 1}]}), 'msgpack')
+    assert decoded is None and fields['data'] == [{'open': 1}]
+    with pytest.raises(ValueError):
+        transport.decode_candles(transport.msgpack.packb({**data, 't': {'dtype': '>f8', 'data': b''}}), 'msgpack')
+
+@pytest.mark.skipif(transport.pa is None, reason="pyarrow not installed")
+def test_arrow_stream():
+    pa = transport.pa
+    columns = minute_series(50)
+    shuffled = {key: values[::-1] for key, values in columns.items()}
+    batch = pa.record_batch([pa.array(shuffled['t'], type=pa.timestamp('ms'))] +
+                            [pa.array(shuffled[key]) for key in 'ohlcv'], names=list('tohlcv'))
+    batch = batch.replace_schema_metadata({transport.ARROW_REQUEST_KEY: json.dumps({'indicators': {'rsi': {}}})})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    fields, decoded = transport.decode_request(sink.getvalue().to_pybytes(), 'arrow')
+    assert fields == {'indicators': {'rsi': {}}}
+    assert_columns_equal(decoded, to_columns(*(shuffled[key] for key in 'tohlcv')))
@@ -0,0 +1,128 @@
+"""
+Binary request and response bodies.
+Besides JSON, endpoints that take candles accept
+- Arrow IPC streams (application/vnd.apache.arrow.stream): one record batch
+  with t (timestamp[ms] or epoch-ms integers) and o, h, l, c, v float64
+  columns; the other request fields travel as JSON in the schema metadata
+  under "request".
+- MessagePack (application/msgpack): the JSON request as a map, except that
+  data columns may be typed arrays, i.e. {"dtype": "<f8", "data": <bin>} maps
+  holding the raw little-endian values.
+Both decode onto NumPy buffers without per-candle Python objects: Arrow
+columns and typed arrays are viewed in place rather than parsed.
+
+pyarrow and msgpack are optional; a body needing a missing one is refused
+with UnsupportedMediaType.
+"""
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from resampling import Columns, to_columns
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'application/json'
+ARROW = 'application/vnd.apache.arrow.stream'
+MSGPACK = 'application/msgpack'
+
+# Content-Type -> transport name
+CONTENT_TYPES = {JSON: 'json', ARROW: 'arrow', MSGPACK: 'msgpack', 'application/x-msgpack': 'msgpack'}
+
+# Request metadata key of Arrow bodies
+ARROW_REQUEST_KEY = b'request'
+
+# Typed array dtypes accepted in MessagePack bodies (little-endian only)
+TYPED_DTYPES = {'<f8', '<f4', '<i8', '<i4', '<u8', '<u4'}
+
+class UnsupportedMediaType(ValueError):
+    """Unknown request content type, or one whose optional dependency is missing"""
+
+def transport(content_type: Optional[str]) -> str:
+    """Transport name for a Content-Type header (JSON when absent)"""
+    media_type = (content_type or JSON).split(';')[0].strip().lower()
+    if media_type.endswith('+json'):
+        return 'json'
+    name = CONTENT_TYPES.get(media_type)
+    if name is None:
+        raise UnsupportedMediaType(f"Unsupported content type: {media_type} (supported: {', '.join(CONTENT_TYPES)})")
+    if name == 'arrow' and pa is None:
+        raise UnsupportedMediaType("Arrow bodies need pyarrow installed")
+    if name == 'msgpack' and msgpack is None:
+        raise UnsupportedMediaType("MessagePack bodies need msgpack installed")
+    return name
+
+def typed_array(values: np.ndarray) -> Dict[str, Any]:
+    """MessagePack typed array: dtype plus the raw little-endian buffer"""
+    values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+    return {'dtype': values.dtype.str, 'data': values.tobytes()}
+
+def _array(value) -> np.ndarray:
+    if isinstance(value, dict):
+        dtype = value.get('dtype')
+        if dtype not in TYPED_DTYPES:
+            raise ValueError(f"Unsupported typed array dtype: {dtype} (supported: {', '.join(sorted(TYPED_DTYPES))})")
+        return np.frombuffer(value['data'], dtype=dtype)
+    return np.asarray(value)
+
+def _columns(t, o, h, l, c, v) -> Columns:
+    if len({len(t), len(o), len(h), len(l), len(c), len(v)}) != 1:
+        raise ValueError("Columnar OHLCV arrays must all have the same length")
+    return to_columns(t, o, h, l, c, v)
+
+def _arrow_columns(body: bytes) -> Tuple[Dict[str, Any], Columns]:
+    table = pa.ipc.open_stream(body).read_all().combine_chunks()
+    metadata = table.schema.metadata or {}
+    fields = json.loads(metadata[ARROW_REQUEST_KEY]) if ARROW_REQUEST_KEY in metadata else {}
+    missing = [name for name in 'tohlcv' if name not in table.column_names]
+    if missing:
+        raise ValueError(f"Arrow body is missing columns: {', '.join(missing)}")
+    t = table.column('t')
+    if pa.types.is_timestamp(t.type):
+        t = t.cast(pa.timestamp('ms')).cast(pa.int64())
+    # Single-chunk columns without nulls are viewed, not copied
+    arrays = [t.to_numpy()] + [table.column(name).to_numpy() for name in 'ohlcv']
+    return fields, _columns(*arrays)
+
+def _typed_columns(data: Dict[str, Any]) -> Columns:
+    missing = [name for name in 'tohlcv' if name not in data]
+    if missing:
+        raise ValueError(f"MessagePack data is missing columns: {', '.join(missing)}")
+    return _columns(*(_array(data[name]) for name in 'tohlcv'))
+
+def _msgpack_columns(body: bytes) -> Tuple[Dict[str, Any], Optional[Columns]]:
+    fields = msgpack.unpackb(body)
+    if not isinstance(fields, dict):
+        raise ValueError("MessagePack body must be a map")
+    if not isinstance(fields.get('data'), dict):
+        # Candle lists (or no data) are validated like JSON
+        return fields, None
+    return fields, _typed_columns(fields.pop('data'))
+
+def decode_request(body: bytes, name: str) -> Tuple[Dict[str, Any], Optional[Columns]]:
+    """Split a binary request body into its other fields and its candles as normalized NumPy columns.
+
+    Columns are None when the candles are left in the fields for model
+    validation (candle lists).
+    """
+    if name == 'arrow':
+        return _arrow_columns(body)
+    return _msgpack_columns(body)
+
+def decode_candles(body: bytes, name: str) -> Columns:
+    """Decode a binary body that holds only candles (the ColumnarOHLCV shape)"""
+    if name == 'arrow':
+        return _arrow_columns(body)[1]
+    data = msgpack.unpackb(body)
+    if not isinstance(data, dict):
+        raise ValueError("MessagePack candles must be a map of t, o, h, l, c and v")
+    return _typed_columns(data)